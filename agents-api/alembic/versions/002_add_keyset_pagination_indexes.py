@@ -0,0 +1,34 @@
+"""Add keyset pagination indexes
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Listings are ordered and paged on (created_at, id)
+    op.create_index('ix_model_providers_created_at_id', 'model_providers', ['created_at', 'id'])
+    op.create_index('ix_models_created_at_id', 'models', ['created_at', 'id'])
+
+    # Per-provider model listings; its provider_id prefix also covers the
+    # plain provider_id lookups, so the old single-column index is dropped
+    op.create_index(
+        'ix_models_provider_id_created_at_id', 'models', ['provider_id', 'created_at', 'id']
+    )
+    op.drop_index('ix_models_provider_id', table_name='models')
+
+
+def downgrade():
+    op.create_index('ix_models_provider_id', 'models', ['provider_id'])
+    op.drop_index('ix_models_provider_id_created_at_id', table_name='models')
+    op.drop_index('ix_models_created_at_id', table_name='models')
+    op.drop_index('ix_model_providers_created_at_id', table_name='model_providers')
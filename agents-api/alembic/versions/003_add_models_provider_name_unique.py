@@ -0,0 +1,25 @@
+"""Make model names unique per provider
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Target of the bulk upsert's ON CONFLICT (provider_id, name). Fails if a
+    # provider already has two models with the same name; those have to be
+    # merged by hand first.
+    op.create_unique_constraint('uq_models_provider_id_name', 'models', ['provider_id', 'name'])
+
+
+def downgrade():
+    op.drop_constraint('uq_models_provider_id_name', 'models', type_='unique')
@@ -0,0 +1,42 @@
+"""Add trigram indexes for catalog search
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+# (index, table, column) backing the ILIKE prefix and % / %> similarity
+# filters of /model-providers/search
+TRIGRAM_INDEXES = [
+    ('ix_model_providers_name_trgm', 'model_providers', 'name'),
+    ('ix_model_providers_display_name_trgm', 'model_providers', 'display_name'),
+    ('ix_models_name_trgm', 'models', 'name'),
+    ('ix_models_display_name_trgm', 'models', 'display_name'),
+    ('ix_models_description_trgm', 'models', 'description'),
+]
+
+
+def upgrade():
+    # SQLite searches an in-memory index instead
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        op.create_index(
+            name, table, [column], postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'}
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for name, table, _ in TRIGRAM_INDEXES:
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,48 @@
+"""Add indexes for filtered and sorted listings
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+# (index, table, columns) backing the filter_* and sort parameters of the
+# list endpoints
+INDEXES = [
+    ('ix_model_providers_updated_at_id', 'model_providers', ['updated_at', 'id']),
+    ('ix_models_provider_id_is_active', 'models', ['provider_id', 'is_active']),
+    ('ix_models_model_type_created_at_id', 'models', ['model_type', 'created_at', 'id']),
+    ('ix_models_updated_at_id', 'models', ['updated_at', 'id']),
+]
+
+# Partial indexes over active rows, used by active_only listings
+ACTIVE_INDEXES = [
+    ('ix_model_providers_active_created_at_id', 'model_providers', ['created_at', 'id']),
+    ('ix_models_active_created_at_id', 'models', ['created_at', 'id']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+    for name, table, columns in ACTIVE_INDEXES:
+        op.create_index(
+            name,
+            table,
+            columns,
+            postgresql_where=sa.text('is_active'),
+            sqlite_where=sa.text('is_active = 1')
+        )
+
+
+def downgrade():
+    for name, table, _ in ACTIVE_INDEXES + INDEXES:
+        op.drop_index(name, table_name=table)
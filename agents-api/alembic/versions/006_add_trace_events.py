@@ -0,0 +1,35 @@
+"""Add trace_events table
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Append-only; written in batches by the trace event ingestor
+    op.create_table(
+        'trace_events',
+        sa.Column('id', sa.BigInteger, sa.Identity(), primary_key=True),
+        sa.Column('trace_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('event_id', sa.String(64)),
+        sa.Column('type', sa.String(32), nullable=False),
+        sa.Column('timestamp', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column('data', postgresql.JSONB)
+    )
+    op.create_index('ix_trace_events_trace_id_id', 'trace_events', ['trace_id', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_trace_events_trace_id_id')
+    op.drop_table('trace_events')
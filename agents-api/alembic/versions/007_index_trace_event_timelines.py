@@ -0,0 +1,109 @@
+"""Index trace_events for timeline range queries, optionally partitioned
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17
+
+Set TRACE_EVENTS_PARTITIONED=true when running this migration against
+Postgres to rebuild trace_events as a table range-partitioned by month on
+timestamp, keyed by (trace_id, timestamp, id). Partitions for the coming
+months are created by create_trace_event_partitions(), which the API calls
+on startup; events outside them land in trace_events_default.
+"""
+import os
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+TYPE_INDEX = ('ix_trace_events_trace_id_type_timestamp_id', ['trace_id', 'type', 'timestamp', 'id'])
+TIMELINE_INDEX = ('ix_trace_events_trace_id_timestamp_id', ['trace_id', 'timestamp', 'id'])
+
+CREATE_PARTITIONS_FUNCTION = """
+CREATE OR REPLACE FUNCTION create_trace_event_partitions(months_ahead integer) RETURNS void AS $$
+DECLARE
+    month date;
+BEGIN
+    FOR i IN 0..months_ahead LOOP
+        month := date_trunc('month', now() AT TIME ZONE 'UTC')::date + make_interval(months => i);
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF trace_events FOR VALUES FROM (%L) TO (%L)',
+            'trace_events_' || to_char(month, 'YYYY_MM'),
+            month::timestamp AT TIME ZONE 'UTC',
+            (month + interval '1 month')::timestamp AT TIME ZONE 'UTC'
+        );
+    END LOOP;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def partitioned() -> bool:
+    return (
+        op.get_bind().dialect.name == 'postgresql'
+        and os.getenv('TRACE_EVENTS_PARTITIONED', 'false').lower() in ('true', '1', 'yes')
+    )
+
+
+def table_is_partitioned() -> bool:
+    # Whatever the environment says now, what counts on the way down is how
+    # the table was actually built
+    bind = op.get_bind()
+    return bind.dialect.name == 'postgresql' and bind.execute(
+        sa.text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+            "WHERE partrelid = to_regclass('trace_events'))"
+        )
+    ).scalar()
+
+
+def upgrade():
+    op.drop_index('ix_trace_events_trace_id_id')
+    if not partitioned():
+        op.create_index(TIMELINE_INDEX[0], 'trace_events', TIMELINE_INDEX[1])
+        op.create_index(TYPE_INDEX[0], 'trace_events', TYPE_INDEX[1])
+        return
+
+    # The primary key of a partitioned table has to include the partition
+    # key, and it doubles as the timeline index. Identity columns are not
+    # allowed on partitioned tables before Postgres 17, hence the sequence.
+    op.rename_table('trace_events', 'trace_events_unpartitioned')
+    op.execute("CREATE SEQUENCE trace_events_seq")
+    op.execute(
+        "SELECT setval('trace_events_seq', "
+        "COALESCE((SELECT MAX(id) FROM trace_events_unpartitioned), 0) + 1, false)"
+    )
+    op.execute("""
+        CREATE TABLE trace_events (
+            id BIGINT NOT NULL DEFAULT nextval('trace_events_seq'),
+            trace_id UUID NOT NULL,
+            event_id VARCHAR(64),
+            type VARCHAR(32) NOT NULL,
+            timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
+            data JSONB,
+            PRIMARY KEY (trace_id, timestamp, id)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    op.execute("ALTER SEQUENCE trace_events_seq OWNED BY trace_events.id")
+    op.execute("CREATE TABLE trace_events_default PARTITION OF trace_events DEFAULT")
+    op.execute(CREATE_PARTITIONS_FUNCTION)
+    op.execute("SELECT create_trace_event_partitions(3)")
+    op.execute(
+        "INSERT INTO trace_events (id, trace_id, event_id, type, timestamp, data) "
+        "SELECT id, trace_id, event_id, type, timestamp, data FROM trace_events_unpartitioned"
+    )
+    op.drop_table('trace_events_unpartitioned')
+    op.create_index(TYPE_INDEX[0], 'trace_events', TYPE_INDEX[1])
+
+
+def downgrade():
+    # A partitioned layout is kept; only its indexes change back
+    op.drop_index(TYPE_INDEX[0])
+    if not table_is_partitioned():
+        op.drop_index(TIMELINE_INDEX[0])
+    op.create_index('ix_trace_events_trace_id_id', 'trace_events', ['trace_id', 'id'])
@@ -0,0 +1,84 @@
+"""Add trace metrics and usage rollup tables
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-17
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # One row per completed trace; the history rollups are rebuilt from
+    op.create_table(
+        'trace_metrics',
+        sa.Column('trace_id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('model_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('provider_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('completed_at', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column('duration_ms', sa.Float, nullable=False),
+        sa.Column('prompt_tokens', sa.Integer, nullable=False),
+        sa.Column('completion_tokens', sa.Integer, nullable=False),
+        sa.Column('total_tokens', sa.Integer, nullable=False),
+        sa.Column('cost', sa.Float, nullable=False)
+    )
+    op.create_index('ix_trace_metrics_completed_at', 'trace_metrics', ['completed_at'])
+
+    # Per model and minute/hour/day: exact counters, and the buckets of a
+    # mergeable latency sketch
+    op.create_table(
+        'usage_rollups',
+        sa.Column('model_id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('granularity', sa.String(8), primary_key=True),
+        sa.Column('bucket_start', sa.TIMESTAMP(timezone=True), primary_key=True),
+        sa.Column('provider_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('requests', sa.BigInteger, nullable=False),
+        sa.Column('prompt_tokens', sa.BigInteger, nullable=False),
+        sa.Column('completion_tokens', sa.BigInteger, nullable=False),
+        sa.Column('total_tokens', sa.BigInteger, nullable=False),
+        sa.Column('cost', sa.Float, nullable=False),
+        sa.Column('duration_ms', sa.Float, nullable=False)
+    )
+    op.create_index(
+        'ix_usage_rollups_provider_id_granularity_bucket_start',
+        'usage_rollups',
+        ['provider_id', 'granularity', 'bucket_start']
+    )
+    op.create_index(
+        'ix_usage_rollups_granularity_bucket_start',
+        'usage_rollups',
+        ['granularity', 'bucket_start'],
+    )
+
+    op.create_table(
+        'usage_latency_buckets',
+        sa.Column('model_id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('granularity', sa.String(8), primary_key=True),
+        sa.Column('bucket_start', sa.TIMESTAMP(timezone=True), primary_key=True),
+        sa.Column('bucket', sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column('provider_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('count', sa.BigInteger, nullable=False)
+    )
+    op.create_index(
+        'ix_usage_latency_buckets_provider_id_granularity_bucket_start',
+        'usage_latency_buckets',
+        ['provider_id', 'granularity', 'bucket_start']
+    )
+
+
+def downgrade():
+    op.drop_index('ix_usage_latency_buckets_provider_id_granularity_bucket_start')
+    op.drop_table('usage_latency_buckets')
+    op.drop_index('ix_usage_rollups_granularity_bucket_start')
+    op.drop_index('ix_usage_rollups_provider_id_granularity_bucket_start')
+    op.drop_table('usage_rollups')
+    op.drop_index('ix_trace_metrics_completed_at')
+    op.drop_table('trace_metrics')
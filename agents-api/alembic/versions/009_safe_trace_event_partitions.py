@@ -0,0 +1,89 @@
+"""Create trace_events partitions safely alongside filled default partition
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-17
+
+create_trace_event_partitions() from 007 failed for a month whose events
+had already landed in trace_events_default, and workers starting together
+raced on the same CREATE. It now takes an advisory lock, skips existing
+partitions and moves the month's rows out of the default partition before
+attaching the new one. Only applies to a partitioned trace_events.
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+CREATE_PARTITIONS_FUNCTION = """
+CREATE OR REPLACE FUNCTION create_trace_event_partitions(months_ahead integer) RETURNS void AS $$
+DECLARE
+    month date;
+    partition text;
+    lower_bound timestamptz;
+    upper_bound timestamptz;
+BEGIN
+    -- Held until the end of the caller's transaction
+    PERFORM pg_advisory_xact_lock(hashtext('create_trace_event_partitions'));
+    FOR i IN 0..months_ahead LOOP
+        month := date_trunc('month', now() AT TIME ZONE 'UTC')::date + make_interval(months => i);
+        partition := 'trace_events_' || to_char(month, 'YYYY_MM');
+        CONTINUE WHEN to_regclass(partition) IS NOT NULL;
+        lower_bound := month::timestamp AT TIME ZONE 'UTC';
+        upper_bound := (month + interval '1 month')::timestamp AT TIME ZONE 'UTC';
+        -- Attaching fails while the default partition holds rows of the
+        -- month, so they are moved into the new table first
+        EXECUTE format('CREATE TABLE %I (LIKE trace_events INCLUDING DEFAULTS)', partition);
+        EXECUTE format(
+            'WITH moved AS ('
+            'DELETE FROM trace_events_default WHERE timestamp >= %L AND timestamp < %L RETURNING *'
+            ') INSERT INTO %I SELECT * FROM moved',
+            lower_bound, upper_bound, partition
+        );
+        EXECUTE format(
+            'ALTER TABLE trace_events ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+            partition, lower_bound, upper_bound
+        );
+    END LOOP;
+END
+$$ LANGUAGE plpgsql
+"""
+
+PREVIOUS_CREATE_PARTITIONS_FUNCTION = """
+CREATE OR REPLACE FUNCTION create_trace_event_partitions(months_ahead integer) RETURNS void AS $$
+DECLARE
+    month date;
+BEGIN
+    FOR i IN 0..months_ahead LOOP
+        month := date_trunc('month', now() AT TIME ZONE 'UTC')::date + make_interval(months => i);
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF trace_events FOR VALUES FROM (%L) TO (%L)',
+            'trace_events_' || to_char(month, 'YYYY_MM'),
+            month::timestamp AT TIME ZONE 'UTC',
+            (month + interval '1 month')::timestamp AT TIME ZONE 'UTC'
+        );
+    END LOOP;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def partitioned() -> bool:
+    bind = op.get_bind()
+    return bind.dialect.name == 'postgresql' and bind.execute(
+        sa.text("SELECT to_regprocedure('create_trace_event_partitions(integer)') IS NOT NULL")
+    ).scalar()
+
+
+def upgrade():
+    if partitioned():
+        op.execute(CREATE_PARTITIONS_FUNCTION)
+
+
+def downgrade():
+    if partitioned():
+        op.execute(PREVIOUS_CREATE_PARTITIONS_FUNCTION)
@@ -0,0 +1,26 @@
+from functools import partial
+from typing import AsyncGenerator
+
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.utils.db import AsyncSessionLocal
+
+# Requests that may read from a replica; everything else uses the primary
+READ_METHODS = frozenset({"GET", "HEAD"})
+
+
+async def get_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    session_factory = get_session_factory(request)
+    async with session_factory() as session:
+        # For loads that must not share this session, see session_factory_of
+        session.info["session_factory"] = session_factory
+        yield session
+
+
+def get_session_factory(request: Request) -> async_sessionmaker:
+    """
+    Session factory for handlers whose work outlives the request, such as
+    streaming responses, which must open (and close) their own session.
+    """
+    return partial(AsyncSessionLocal, info={"use_replica": request.method in READ_METHODS})
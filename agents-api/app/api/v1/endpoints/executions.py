@@ -0,0 +1,41 @@
+from typing import Optional
+from uuid import UUID
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.services.execution_stream import execution_hub
+
+router = APIRouter()
+
+
+@router.get("/stream-stats")
+async def get_stream_stats():
+    """
+    Executions, producers and viewers of the execution event hub, with its
+    counters.
+    """
+    return execution_hub.stats()
+
+
+@router.get("/{execution_id}/events")
+async def stream_execution_events(
+    *,
+    execution_id: UUID,
+    last_event_id: Optional[int] = Header(None, alias="Last-Event-ID")
+):
+    """
+    Server-Sent Events of an execution, until it completes. A reconnecting
+    EventSource sends ``Last-Event-ID`` and first gets the buffered events it
+    missed; every viewer shares the execution's single producer. Unknown
+    executions, and finished ones past their retention, answer 404.
+    """
+    if not await execution_hub.exists(str(execution_id)):
+        raise HTTPException(
+            status_code=404,
+            detail="Execution not found"
+        )
+    return StreamingResponse(
+        execution_hub.stream(str(execution_id), last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,212 +1,625 @@
-from typing import List, Optional
+from typing import Any, AsyncIterator, Callable, Dict, List, Mapping, Optional, Sequence
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from app.api import deps
-from app.services.model_provider_service import ModelProviderService, ModelService
+from app.services.model_provider_service import (
+    CatalogBatchService,
+    CatalogSearchService,
+    ModelProviderService,
+    ModelService
+)
 from app.schemas.model_provider import (
+    BulkOperationResult,
+    CatalogBatch,
+    BulkSelection,
     ModelProvider,
+    ModelProviderInDB,
     ModelProviderCreate,
     ModelProviderUpdate,
     Model,
     ModelCreate,
     ModelUpdate,
-    ModelProviderWithModels
+    ModelBulkUpsert,
+    ModelBulkUpsertResult,
+    ModelProviderWithModels,
+    CatalogSearchResult
 )
+from app.schemas.pagination import Page
+from app.utils.cache import catalog_cache
+from app.utils.db import is_foreign_key_violation, is_unique_violation
+from app.utils.export import EXPORT_FORMATS, encode_rows
+from app.utils.filtering import FilterSet, ListQuery
+from app.utils.http import format_http_date, is_not_modified, make_etag
+from app.utils.serialization import json_response
 
 router = APIRouter()
 model_provider_service = ModelProviderService()
 model_service = ModelService()
+catalog_search_service = CatalogSearchService()
+catalog_batch_service = CatalogBatchService()
 
+# Ids per kind a single batch-get may ask for
+BATCH_MAX_IDS = 500
 
-@router.get("/", response_model=List[ModelProvider])
-def get_model_providers(
-    db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
-    active_only: bool = False
+
+async def catalog_conditional_get(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(deps.get_db)
+):
+    """
+    Tag catalog reads with an ETag and Last-Modified derived from the catalog
+    version, and answer 304 before the handler loads or serializes any rows
+    when the client's copy is still current.
+    """
+    version = await model_provider_service.get_catalog_version(db)
+    etag = make_etag(
+        version.provider_count,
+        version.model_count,
+        version.last_modified.isoformat() if version.last_modified else "",
+        request.url.path,
+        request.url.query
+    )
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if version.last_modified is not None:
+        headers["Last-Modified"] = format_http_date(version.last_modified)
+
+    if is_not_modified(request.headers, etag, version.last_modified):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+
+def list_query(filter_set: FilterSet) -> Callable[..., ListQuery]:
+    """
+    Dependency parsing the ``filter_<field>[__<op>]`` parameters and ``sort``
+    of a list endpoint against the whitelist in ``filter_set``.
+    """
+    def dependency(
+        request: Request,
+        sort: Optional[str] = Query(
+            None, description="Field to sort on; prefix with '-' for descending order"
+        ),
+    ) -> ListQuery:
+        return filter_set.parse(request.query_params, sort)
+
+    return dependency
+
+
+def filter_query(filter_set: FilterSet) -> Callable[..., ListQuery]:
+    """
+    Dependency parsing just the ``filter_<field>[__<op>]`` parameters, for
+    bulk operations.
+    """
+    def dependency(request: Request) -> ListQuery:
+        return filter_set.parse(request.query_params)
+
+    return dependency
+
+
+def bulk_selection_or_400(selection: BulkSelection, query: ListQuery):
+    # Refuse to touch the whole catalog because a filter was mistyped away
+    if selection.ids is None and not query.filters:
+        raise HTTPException(
+            status_code=400,
+            detail="Pass ids or at least one filter_* parameter"
+        )
+
+
+@router.get(
+    "/",
+    response_model=Page[ModelProvider],
+    dependencies=[Depends(catalog_conditional_get)]
+)
+async def get_model_providers(
+    response: Response,
+    db: AsyncSession = Depends(deps.get_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    include_total: bool = False,
+    active_only: bool = False,
+    query: ListQuery = Depends(list_query(model_provider_service.filters))
+):
+    """
+    Retrieve a page of model providers.
+
+    Pass the returned ``next_cursor`` as ``cursor`` to fetch the next page.
+    Filter with ``filter_<field>=value`` (or ``filter_<field>__<op>=value``)
+    and order with ``sort=<field>`` or ``sort=-<field>``.
+    """
+    if active_only:
+        page = await model_provider_service.get_active(
+            db, cursor=cursor, limit=limit, include_total=include_total, query=query
+        )
+    else:
+        page = await model_provider_service.get_all(
+            db, cursor=cursor, limit=limit, include_total=include_total, query=query
+        )
+    return json_response(page, Page[ModelProvider], response)
+
+
+@router.get(
+    "/with-models",
+    response_model=Page[ModelProviderWithModels],
+    dependencies=[Depends(catalog_conditional_get)]
+)
+async def get_model_providers_with_models(
+    response: Response,
+    db: AsyncSession = Depends(deps.get_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    include_total: bool = False,
+    query: ListQuery = Depends(list_query(model_provider_service.filters))
+):
+    """
+    Retrieve a page of model providers with their models.
+    """
+    page = await model_provider_service.get_all_with_models(
+        db, cursor=cursor, limit=limit, include_total=include_total, query=query
+    )
+    return json_response(page, Page[ModelProviderWithModels], response)
+
+
+@router.get(
+    "/models",
+    response_model=Page[Model],
+    dependencies=[Depends(catalog_conditional_get)]
+)
+async def get_models(
+    response: Response,
+    db: AsyncSession = Depends(deps.get_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    include_total: bool = False,
+    active_only: bool = False,
+    query: ListQuery = Depends(list_query(model_service.filters))
 ):
     """
-    Retrieve all model providers.
+    Retrieve a page of models across all providers, e.g.
+    ``?filter_provider_name=openai&filter_context_window__gte=100000&sort=-created_at``.
     """
     if active_only:
-        return model_provider_service.get_active(db, skip=skip, limit=limit)
-    return model_provider_service.get_all(db, skip=skip, limit=limit)
+        page = await model_service.get_active(
+            db, cursor=cursor, limit=limit, include_total=include_total, query=query
+        )
+    else:
+        page = await model_service.get_all(
+            db, cursor=cursor, limit=limit, include_total=include_total, query=query
+        )
+    return json_response(page, Page[Model], response)
+
 
+@router.get("/cache-stats", response_model=Dict[str, Any])
+async def get_catalog_cache_stats():
+    """
+    Hit, miss and eviction counters of the model catalog cache.
+    """
+    return catalog_cache.stats()
+
+
+def export_response(
+    session_factory: async_sessionmaker,
+    export: Callable[[AsyncSession], AsyncIterator[Sequence[Mapping]]],
+    fieldnames: Sequence[str],
+    format: str,
+    filename: str
+) -> StreamingResponse:
+    # The body is produced after the handler returns, so it runs on its own
+    # session rather than the request-scoped one
+    async def body():
+        async with session_factory() as db:
+            async for chunk in encode_rows(export(db), format, fieldnames):
+                yield chunk
+
+    return StreamingResponse(
+        body(),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'}
+    )
 
-@router.get("/with-models", response_model=List[ModelProviderWithModels])
-def get_model_providers_with_models(
-    db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100
+
+@router.get("/export/providers", response_class=StreamingResponse)
+async def export_model_providers(
+    session_factory: async_sessionmaker = Depends(deps.get_session_factory),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    active_only: bool = False
+):
+    """
+    Stream every model provider as NDJSON or CSV.
+    """
+    return export_response(
+        session_factory,
+        lambda db: model_provider_service.export(db, active_only=active_only),
+        model_provider_service.export_fields,
+        format,
+        "model-providers"
+    )
+
+
+@router.get("/export/models", response_class=StreamingResponse)
+async def export_models(
+    session_factory: async_sessionmaker = Depends(deps.get_session_factory),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    provider_id: Optional[UUID] = None,
+    active_only: bool = False
 ):
     """
-    Retrieve all model providers with their models.
+    Stream every model, with its provider's name, as NDJSON or CSV.
     """
-    return model_provider_service.get_all_with_models(db, skip=skip, limit=limit)
+    return export_response(
+        session_factory,
+        lambda db: model_service.export(db, provider_id=provider_id, active_only=active_only),
+        model_service.export_fields,
+        format,
+        "models"
+    )
+
+
+@router.get(
+    "/batch",
+    response_model=CatalogBatch,
+    dependencies=[Depends(catalog_conditional_get)]
+)
+async def batch_get_catalog(
+    response: Response,
+    db: AsyncSession = Depends(deps.get_db),
+    provider_ids: List[UUID] = Query([], max_length=BATCH_MAX_IDS),
+    model_ids: List[UUID] = Query([], max_length=BATCH_MAX_IDS),
+    fields: Optional[str] = Query(
+        None, description="Comma-separated fields to return; 'id' is always included"
+    ),
+):
+    """
+    Get many providers and/or models by id in one request, e.g.
+    ``?model_ids=...&model_ids=...&fields=name,display_name``. Ids that do
+    not exist are listed as missing rather than failing the request.
+    """
+    if not provider_ids and not model_ids:
+        raise HTTPException(
+            status_code=400,
+            detail="Pass provider_ids and/or model_ids"
+        )
+    batch = await catalog_batch_service.get_many(db, provider_ids, model_ids, fields)
+    return json_response(batch, CatalogBatch, response)
+
+
+@router.get(
+    "/search",
+    response_model=CatalogSearchResult,
+    dependencies=[Depends(catalog_conditional_get)]
+)
+async def search_catalog(
+    response: Response,
+    db: AsyncSession = Depends(deps.get_db),
+    q: str = Query(..., min_length=1, max_length=100),
+    model_type: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    min_context_window: Optional[int] = Query(None, ge=0),
+    max_context_window: Optional[int] = Query(None, ge=0),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """
+    Ranked prefix and fuzzy search over provider and model names, display
+    names and descriptions. The model filters only apply to models.
+    """
+    result = await catalog_search_service.search(
+        db,
+        q,
+        model_type=model_type,
+        is_active=is_active,
+        min_context_window=min_context_window,
+        max_context_window=max_context_window,
+        limit=limit
+    )
+    return json_response(result, CatalogSearchResult, response)
 
 
 @router.post("/", response_model=ModelProvider)
-def create_model_provider(
+async def create_model_provider(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     model_provider_in: ModelProviderCreate
 ):
     """
     Create new model provider.
     """
-    model_provider = model_provider_service.get_by_name(db, name=model_provider_in.name)
-    if model_provider:
-        raise HTTPException(
-            status_code=400,
-            detail="Model provider with this name already exists."
-        )
-    return model_provider_service.create(db, obj_in=model_provider_in)
+    try:
+        return await model_provider_service.create(db, obj_in=model_provider_in)
+    except IntegrityError as exc:
+        if is_unique_violation(exc):
+            raise HTTPException(
+                status_code=400,
+                detail="Model provider with this name already exists."
+            ) from exc
+        raise
+
+
+@router.post("/bulk-deactivate", response_model=BulkOperationResult)
+async def bulk_deactivate_model_providers(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    selection: BulkSelection,
+    query: ListQuery = Depends(filter_query(model_provider_service.filters))
+):
+    """
+    Deactivate the model providers in ``ids`` and/or matching the
+    ``filter_*`` query parameters, in one statement.
+    """
+    bulk_selection_or_400(selection, query)
+    count = await model_provider_service.bulk_deactivate(db, ids=selection.ids, query=query)
+    return BulkOperationResult(count=count)
+
+
+@router.post("/bulk-delete", response_model=BulkOperationResult)
+async def bulk_delete_model_providers(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    selection: BulkSelection,
+    query: ListQuery = Depends(filter_query(model_provider_service.filters))
+):
+    """
+    Delete the model providers in ``ids`` and/or matching the ``filter_*``
+    query parameters, with their models, in one statement.
+    """
+    bulk_selection_or_400(selection, query)
+    count = await model_provider_service.bulk_delete(db, ids=selection.ids, query=query)
+    return BulkOperationResult(count=count)
 
 
-@router.get("/{id}", response_model=ModelProvider)
-def get_model_provider(
+@router.post("/models/bulk-deactivate", response_model=BulkOperationResult)
+async def bulk_deactivate_models(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
+    selection: BulkSelection,
+    query: ListQuery = Depends(filter_query(model_service.filters))
+):
+    """
+    Deactivate the models in ``ids`` and/or matching the ``filter_*`` query
+    parameters, e.g. ``?filter_provider_name=openai&filter_model_type=embedding``.
+    """
+    bulk_selection_or_400(selection, query)
+    count = await model_service.bulk_deactivate(db, ids=selection.ids, query=query)
+    return BulkOperationResult(count=count)
+
+
+@router.post("/models/bulk-delete", response_model=BulkOperationResult)
+async def bulk_delete_models(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    selection: BulkSelection,
+    query: ListQuery = Depends(filter_query(model_service.filters))
+):
+    """
+    Delete the models in ``ids`` and/or matching the ``filter_*`` query
+    parameters, in one statement.
+    """
+    bulk_selection_or_400(selection, query)
+    count = await model_service.bulk_delete(db, ids=selection.ids, query=query)
+    return BulkOperationResult(count=count)
+
+
+@router.get(
+    "/{id}",
+    response_model=ModelProvider,
+    dependencies=[Depends(catalog_conditional_get)]
+)
+async def get_model_provider(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    response: Response,
     id: UUID
 ):
     """
     Get model provider by ID.
     """
-    model_provider = model_provider_service.get(db, id=id)
+    model_provider = await model_provider_service.get(db, id=id)
     if not model_provider:
         raise HTTPException(
             status_code=404,
             detail="Model provider not found"
         )
-    return model_provider
+    return json_response(model_provider, ModelProvider, response)
 
 
-@router.get("/{id}/with-models", response_model=ModelProviderWithModels)
-def get_model_provider_with_models(
+@router.get(
+    "/{id}/with-models",
+    response_model=ModelProviderWithModels,
+    dependencies=[Depends(catalog_conditional_get)]
+)
+async def get_model_provider_with_models(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
+    response: Response,
     id: UUID
 ):
     """
     Get model provider with its models by ID.
     """
-    model_provider = model_provider_service.get_with_models(db, id=id)
+    model_provider = await model_provider_service.get_with_models(db, id=id)
     if not model_provider:
         raise HTTPException(
             status_code=404,
             detail="Model provider not found"
         )
-    return model_provider
+    return json_response(model_provider, ModelProviderWithModels, response)
 
 
 @router.put("/{id}", response_model=ModelProvider)
-def update_model_provider(
+async def update_model_provider(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     id: UUID,
     model_provider_in: ModelProviderUpdate
 ):
     """
     Update a model provider.
     """
-    model_provider = model_provider_service.get(db, id=id)
+    try:
+        model_provider = await model_provider_service.update(db, id=id, obj_in=model_provider_in)
+    except IntegrityError as exc:
+        if is_unique_violation(exc):
+            raise HTTPException(
+                status_code=400,
+                detail="Model provider with this name already exists."
+            ) from exc
+        raise
     if not model_provider:
         raise HTTPException(
             status_code=404,
             detail="Model provider not found"
         )
-    return model_provider_service.update(db, id=id, obj_in=model_provider_in)
+    return model_provider
 
 
-@router.delete("/{id}", response_model=ModelProvider)
-def delete_model_provider(
+@router.delete("/{id}", response_model=ModelProviderInDB)
+async def delete_model_provider(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     id: UUID
 ):
     """
-    Delete a model provider.
+    Delete a model provider. Its models are deleted by the database's
+    cascade and are not returned.
     """
-    model_provider = model_provider_service.get(db, id=id)
+    model_provider = await model_provider_service.delete(db, id=id)
     if not model_provider:
         raise HTTPException(
             status_code=404,
             detail="Model provider not found"
         )
-    return model_provider_service.delete(db, id=id)
+    return model_provider
 
 
 # Model endpoints
 
-@router.get("/{provider_id}/models", response_model=List[Model])
-def get_models_by_provider(
+def raise_for_model_integrity_error(exc: IntegrityError):
+    """
+    Turn the constraint violations of a model write into client errors.
+    """
+    if is_unique_violation(exc):
+        raise HTTPException(
+            status_code=400,
+            detail="Model with this name already exists for this provider"
+        ) from exc
+    if is_foreign_key_violation(exc):
+        raise HTTPException(
+            status_code=404,
+            detail="Model provider not found"
+        ) from exc
+    raise exc
+
+
+@router.get(
+    "/{provider_id}/models",
+    response_model=Page[Model],
+    dependencies=[Depends(catalog_conditional_get)]
+)
+async def get_models_by_provider(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
+    response: Response,
     provider_id: UUID,
-    skip: int = 0,
-    limit: int = 100
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    include_total: bool = False,
+    query: ListQuery = Depends(list_query(model_service.filters))
 ):
     """
-    Retrieve all models for a specific provider.
+    Retrieve a page of models for a specific provider.
     """
-    model_provider = model_provider_service.get(db, id=provider_id)
+    model_provider = await model_provider_service.get(db, id=provider_id)
     if not model_provider:
         raise HTTPException(
             status_code=404,
             detail="Model provider not found"
         )
-    return model_service.get_by_provider(db, provider_id=provider_id, skip=skip, limit=limit)
+    page = await model_service.get_by_provider(
+        db,
+        provider_id=provider_id,
+        cursor=cursor,
+        limit=limit,
+        include_total=include_total,
+        query=query,
+    )
+    return json_response(page, Page[Model], response)
 
 
 @router.post("/{provider_id}/models", response_model=Model)
-def create_model(
+async def create_model(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     provider_id: UUID,
     model_in: ModelCreate
 ):
     """
     Create new model for a provider.
     """
-    model_provider = model_provider_service.get(db, id=provider_id)
-    if not model_provider:
-        raise HTTPException(
-            status_code=404,
-            detail="Model provider not found"
-        )
-    
     # Ensure the provider_id in the path matches the one in the request body
     if model_in.provider_id != provider_id:
         raise HTTPException(
             status_code=400,
             detail="Provider ID in path does not match provider ID in request body"
         )
-    
-    existing_model = model_service.get_by_name_and_provider(
-        db, name=model_in.name, provider_id=provider_id
-    )
-    if existing_model:
+
+    try:
+        return await model_service.create(db, obj_in=model_in)
+    except IntegrityError as exc:
+        raise_for_model_integrity_error(exc)
+
+
+@router.post("/{provider_id}/models/bulk", response_model=ModelBulkUpsertResult)
+async def bulk_upsert_models(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    provider_id: UUID,
+    models_in: ModelBulkUpsert
+):
+    """
+    Create or update many models for a provider in one transaction.
+
+    Models are matched on name; each result reports whether the model was
+    created, updated or left unchanged.
+    """
+    names = [model_in.name for model_in in models_in.models]
+    if len(set(names)) != len(names):
         raise HTTPException(
             status_code=400,
-            detail="Model with this name already exists for this provider"
+            detail="Model names must be unique within a bulk request"
         )
-    
-    return model_service.create(db, obj_in=model_in)
 
+    try:
+        results = await model_service.bulk_upsert(
+            db, provider_id=provider_id, models_in=models_in.models
+        )
+    except IntegrityError as exc:
+        raise_for_model_integrity_error(exc)
+    return ModelBulkUpsertResult(
+        created=sum(result.status == "created" for result in results),
+        updated=sum(result.status == "updated" for result in results),
+        unchanged=sum(result.status == "unchanged" for result in results),
+        results=results
+    )
 
-@router.get("/{provider_id}/models/{model_id}", response_model=Model)
-def get_model(
+
+@router.get(
+    "/{provider_id}/models/{model_id}",
+    response_model=Model,
+    dependencies=[Depends(catalog_conditional_get)]
+)
+async def get_model(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
+    response: Response,
     provider_id: UUID,
     model_id: UUID
 ):
     """
     Get model by ID.
     """
-    model = model_service.get(db, id=model_id)
+    model = await model_service.get(db, id=model_id)
     if not model:
         raise HTTPException(
             status_code=404,
@@ -219,13 +632,13 @@ def get_model(
             detail="Model not found for this provider"
         )
     
-    return model
+    return json_response(model, Model, response)
 
 
 @router.put("/{provider_id}/models/{model_id}", response_model=Model)
-def update_model(
+async def update_model(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     provider_id: UUID,
     model_id: UUID,
     model_in: ModelUpdate
@@ -233,43 +646,34 @@ def update_model(
     """
     Update a model.
     """
-    model = model_service.get(db, id=model_id)
-    if not model:
-        raise HTTPException(
-            status_code=404,
-            detail="Model not found"
+    try:
+        model = await model_service.update(
+            db, provider_id=provider_id, id=model_id, obj_in=model_in
         )
-    
-    if model.provider_id != provider_id:
+    except IntegrityError as exc:
+        raise_for_model_integrity_error(exc)
+    if not model:
         raise HTTPException(
             status_code=404,
             detail="Model not found for this provider"
         )
-    
-    return model_service.update(db, id=model_id, obj_in=model_in)
+    return model
 
 
 @router.delete("/{provider_id}/models/{model_id}", response_model=Model)
-def delete_model(
+async def delete_model(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     provider_id: UUID,
     model_id: UUID
 ):
     """
     Delete a model.
     """
-    model = model_service.get(db, id=model_id)
+    model = await model_service.delete(db, provider_id=provider_id, id=model_id)
     if not model:
-        raise HTTPException(
-            status_code=404,
-            detail="Model not found"
-        )
-    
-    if model.provider_id != provider_id:
         raise HTTPException(
             status_code=404,
             detail="Model not found for this provider"
         )
-    
-    return model_service.delete(db, id=model_id)
\ No newline at end of file
+    return model
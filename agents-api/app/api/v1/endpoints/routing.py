@@ -0,0 +1,83 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.schemas.routing import ModelRouteScore, RoutedRequest, RoutedResult
+from app.services.model_router import (
+    NoCandidateError,
+    UpstreamError,
+    UpstreamRejectedError,
+    model_router,
+)
+from app.utils.completion_cache import completion_cache
+
+router = APIRouter()
+
+
+@router.get("/scores", response_model=List[ModelRouteScore])
+async def get_routing_scores():
+    """
+    Live EWMA latency, error rate and health of every model routed to so far.
+    """
+    return model_router.scores()
+
+
+@router.get("/cache-stats")
+async def get_completion_cache_stats():
+    """
+    Hit rate, bytes and tokens saved and size of the completion cache.
+    """
+    return completion_cache.stats()
+
+
+@router.get("/candidates", response_model=List[ModelRouteScore])
+async def get_routing_candidates(
+    db: AsyncSession = Depends(deps.get_db),
+    model_type: str = Query(...),
+    name: Optional[str] = None,
+    min_context_window: Optional[int] = Query(None, ge=0)
+):
+    """
+    The models a request would be routed to, in the order they would be tried.
+    """
+    candidates = await model_router.candidates(db, model_type, name, min_context_window)
+    return [model_router.describe(stats) for stats in candidates]
+
+
+@router.post("/{model_type}", response_model=RoutedResult)
+async def route_request(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    model_type: str,
+    request_in: RoutedRequest
+):
+    """
+    Send an OpenAI-style request to the fastest healthy model of
+    ``model_type``, with hedging and failover.
+    """
+    try:
+        return await model_router.route(
+            db,
+            model_type,
+            request_in.payload,
+            name=request_in.name,
+            min_context_window=request_in.min_context_window,
+            hedge=request_in.hedge,
+            cache=request_in.cache
+        )
+    except NoCandidateError as exc:
+        raise HTTPException(
+            status_code=404,
+            detail=str(exc)
+        ) from exc
+    except UpstreamRejectedError as exc:
+        raise HTTPException(
+            status_code=exc.status_code,
+            detail=exc.detail
+        ) from exc
+    except UpstreamError as exc:
+        raise HTTPException(
+            status_code=502,
+            detail=str(exc)
+        ) from exc
@@ -0,0 +1,137 @@
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.schemas.pagination import Page
+from app.schemas.trace import TraceEvent, TraceEventBatch, TraceEventsAccepted, TraceSpan
+from app.services.trace_ingestion import (
+    IngestionBackpressureError,
+    IngestionClosedError,
+    trace_ingestor,
+)
+from app.schemas.usage import TraceMetrics, TraceMetricsCreate, TraceMetricsRecorded
+from app.services.trace_service import TraceEventService
+from app.services.usage_service import UsageService
+
+router = APIRouter()
+trace_event_service = TraceEventService()
+usage_service = UsageService()
+
+
+@router.get("/ingestion-stats")
+async def get_ingestion_stats():
+    """
+    Queue depth and counters of the trace event ingestor.
+    """
+    return trace_ingestor.stats()
+
+
+@router.post("/{trace_id}/events", response_model=TraceEventsAccepted, status_code=202)
+async def ingest_trace_events(
+    *,
+    trace_id: UUID,
+    batch: TraceEventBatch
+):
+    """
+    Queue events of a trace for writing. They are written in batches shortly
+    afterwards; a full queue answers 503 with ``Retry-After``.
+    """
+    try:
+        accepted = await trace_ingestor.submit(trace_id, batch.events)
+    except (IngestionBackpressureError, IngestionClosedError) as exc:
+        raise HTTPException(
+            status_code=503,
+            detail=str(exc),
+            headers={"Retry-After": "1"}
+        ) from exc
+    return TraceEventsAccepted(accepted=accepted)
+
+
+@router.get("/{trace_id}/events", response_model=Page[TraceEvent])
+async def read_trace_events(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    trace_id: UUID,
+    start: Optional[datetime] = Query(None, description="Only events at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only events before this time"),
+    type: Optional[List[str]] = Query(None, description="Only events of these types; repeatable"),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    descending: bool = False
+):
+    """
+    A time window of a trace's events, in timestamp order, optionally of some
+    event types only. Pages are range scans of the timeline index, so a
+    window costs the same however many events the trace has.
+    """
+    return await trace_event_service.get_range(
+        db,
+        trace_id,
+        start=start,
+        end=end,
+        types=type,
+        cursor=cursor,
+        limit=limit,
+        descending=descending,
+    )
+
+
+@router.get("/{trace_id}/span", response_model=TraceSpan)
+async def read_trace_span(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    trace_id: UUID
+):
+    """
+    Time of the first and last event of a trace, e.g. for the extent of a
+    timeline.
+    """
+    span = await trace_event_service.get_span(db, trace_id)
+    if span is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Trace has no events"
+        )
+    return span
+
+
+@router.post("/{trace_id}/complete", response_model=TraceMetricsRecorded)
+async def complete_trace(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    trace_id: UUID,
+    metrics: TraceMetricsCreate
+):
+    """
+    Record the metrics of a completed trace and add them to the usage
+    rollups of its model and provider. Completing a trace again changes
+    nothing and answers ``recorded: false``.
+    """
+    recorded = await usage_service.record(db, trace_id, metrics)
+    if recorded is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Model not found"
+        )
+    return recorded
+
+
+@router.get("/{trace_id}/metrics", response_model=TraceMetrics)
+async def read_trace_metrics(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    trace_id: UUID
+):
+    """
+    Token usage, cost and duration of a completed trace.
+    """
+    metrics = await usage_service.get_metrics(db, trace_id)
+    if metrics is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Trace metrics not found"
+        )
+    return metrics
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Literal, Optional
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.models.trace import as_utc
+from app.models.usage import GRANULARITIES
+from app.schemas.usage import UsageBucket, UsageRebuildResult
+from app.services.usage_service import UsageService
+
+router = APIRouter()
+usage_service = UsageService()
+
+# Time buckets one request may span, e.g. 31 days of hours
+MAX_BUCKETS = 1500
+# Days POST /rebuild may recompute; see app.jobs.rebuild_usage_rollups
+MAX_REBUILD_DAYS = 7
+
+
+@router.get("/rollups", response_model=List[UsageBucket])
+async def read_usage_rollups(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    granularity: Literal["minute", "hour", "day"] = "hour",
+    start: datetime,
+    end: Optional[datetime] = Query(None, description="Defaults to now"),
+    group_by: Literal["model", "provider", "total"] = "model",
+    model_id: Optional[UUID] = None,
+    provider_id: Optional[UUID] = None
+):
+    """
+    Requests, tokens, cost and p50/p95/p99 latency per time bucket in
+    ``[start, end)``, per model, per provider or in total. Read from the
+    rollups, so the cost depends on the buckets asked for, not on the
+    number of traces.
+    """
+    # Naive bounds are UTC, like stored timestamps
+    start = as_utc(start)
+    end = as_utc(end) if end is not None else datetime.now(timezone.utc)
+    if (end - start).total_seconds() > MAX_BUCKETS * GRANULARITIES[granularity]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BUCKETS} {granularity} buckets can be read at once"
+        )
+    return await usage_service.get_rollups(
+        db, granularity, start, end, group_by, model_id, provider_id
+    )
+
+
+@router.post("/rebuild", response_model=UsageRebuildResult)
+async def rebuild_usage_rollups(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    since: datetime = Query(
+        ..., description=f"Rebuild from this day on, at most {MAX_REBUILD_DAYS} days ago"
+    )
+):
+    """
+    Recompute the recent rollups from the stored trace metrics. Traces are
+    not recorded while this runs, so the window is capped; rebuild longer
+    ones, or all of history, offline with
+    ``python -m app.jobs.rebuild_usage_rollups``.
+    """
+    if datetime.now(timezone.utc) - as_utc(since) > timedelta(days=MAX_REBUILD_DAYS):
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                f"At most {MAX_REBUILD_DAYS} days can be rebuilt at once; "
+                "use app.jobs.rebuild_usage_rollups"
+            )
+        )
+    return await usage_service.rebuild(db, as_utc(since))
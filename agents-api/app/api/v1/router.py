@@ -1,20 +1,38 @@
+import importlib
+import os
+
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import (
-    agents,
-    auth,
-    executions,
-    model_providers,
-    traces,
-    users,
-    workflows
+# (endpoint module, prefix/name) of every router, in mount order
+ROUTERS = (
+    ("executions", "executions"),
+    ("traces", "traces"),
+    ("model_providers", "model-providers"),
+    ("routing", "routing"),
+    ("usage", "usage"),
 )
 
+
+def enabled_routers():
+    """
+    Names of the routers to mount: all of them, or the comma-separated
+    ``API_ROUTERS`` (e.g. ``model-providers``). Endpoint modules that are not
+    mounted are never imported, nor is the integration code behind them, so
+    a worker that only serves some routes starts faster.
+    """
+    names = os.getenv("API_ROUTERS")
+    if not names:
+        return {name for _, name in ROUTERS}
+    enabled = {name.strip() for name in names.split(",") if name.strip()}
+    unknown = enabled - {name for _, name in ROUTERS}
+    if unknown:
+        raise ValueError(f"Unknown API_ROUTERS: {', '.join(sorted(unknown))}")
+    return enabled
+
+
 api_router = APIRouter()
-api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
-api_router.include_router(users.router, prefix="/users", tags=["users"])
-api_router.include_router(agents.router, prefix="/agents", tags=["agents"])
-api_router.include_router(workflows.router, prefix="/workflows", tags=["workflows"])
-api_router.include_router(executions.router, prefix="/executions", tags=["executions"])
-api_router.include_router(traces.router, prefix="/traces", tags=["traces"])
-api_router.include_router(model_providers.router, prefix="/model-providers", tags=["model-providers"])
\ No newline at end of file
+_enabled = enabled_routers()
+for module_name, name in ROUTERS:
+    if name in _enabled:
+        module = importlib.import_module(f"app.api.v1.endpoints.{module_name}")
+        api_router.include_router(module.router, prefix=f"/{name}", tags=[name])
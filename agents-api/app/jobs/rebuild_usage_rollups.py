@@ -0,0 +1,49 @@
+"""Rebuild the usage rollups from the stored trace metrics.
+
+Recomputes the per-model minute, hour and day rollups and their latency
+sketches from ``trace_metrics``, e.g. after the rollup tables were added to
+a database with history, or to repair them. Traces are read in batches and
+aggregated with NumPy; the rollups are replaced in one transaction, so
+readers see either the old or the new totals. Recording traces waits
+until it is done, so long rebuilds are best run at a quiet time.
+
+    python -m app.jobs.rebuild_usage_rollups
+    python -m app.jobs.rebuild_usage_rollups --since 2026-10-01
+"""
+import argparse
+import asyncio
+import json
+from datetime import datetime, timezone
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.services.usage_service import UsageService
+from app.utils.db import engine
+
+
+def parse_since(value: str) -> datetime:
+    since = datetime.fromisoformat(value)
+    return since if since.tzinfo is not None else since.replace(tzinfo=timezone.utc)
+
+
+async def main(args: argparse.Namespace):
+    # The primary, not a replica: the rollups are rewritten from what it read
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with session_factory() as db:
+        result = await UsageService().rebuild(db, since=args.since)
+    await engine.dispose()
+    print(json.dumps(result.model_dump(mode="json")))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--since",
+        type=parse_since,
+        default=None,
+        help=(
+            "Only rebuild from this day on (ISO date or time, UTC if naive); "
+            "default all of history"
+        ),
+    )
+    asyncio.run(main(parser.parse_args()))
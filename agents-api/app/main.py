@@ -1,33 +1,97 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+import asyncio
+import json
+import logging
 import os
-from dotenv import load_dotenv
+from contextlib import asynccontextmanager, suppress
 
-from app.api.v1.router import api_router
+from dotenv import load_dotenv
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy.exc import SQLAlchemyError
 
-# Load environment variables
+# The app modules below read their settings (DATABASE_URL, cache and pool
+# sizes, ...) from the environment when they are imported, so .env has to
+# be loaded before them
 load_dotenv()
 
+# pylint: disable=wrong-import-position
+from app.api.v1.router import api_router  # noqa: E402
+from app.services.execution_stream import execution_hub  # noqa: E402
+from app.services.provider_clients import provider_clients  # noqa: E402
+from app.services.trace_ingestion import trace_ingestor  # noqa: E402
+from app.services.trace_service import TraceEventService  # noqa: E402
+from app.utils.cache import catalog_cache  # noqa: E402
+from app.utils.completion_cache import completion_cache  # noqa: E402
+from app.utils.db import AsyncSessionLocal, engine, replica_engines  # noqa: E402
+from app.utils.filtering import InvalidFilterError  # noqa: E402
+from app.utils.metrics import InstrumentationMiddleware, metrics, pool_gauges  # noqa: E402
+from app.utils.pagination import InvalidCursorError  # noqa: E402
+# pylint: enable=wrong-import-position
+
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Drop locally cached catalog entries when another worker writes
+    listener = asyncio.create_task(catalog_cache.listen())
+    # Execution events published by producers on other workers
+    stream_listener = asyncio.create_task(execution_hub.listen())
+    if os.getenv("TRACE_EVENTS_PARTITIONED", "false").lower() in ("true", "1", "yes"):
+        # Monthly trace_events partitions for the coming months; events of
+        # a missing month still land in the default partition, so a failure
+        # must not keep the API from starting
+        try:
+            async with AsyncSessionLocal() as db:
+                await TraceEventService().create_partitions(db)
+        except (SQLAlchemyError, OSError):
+            logger.warning("Could not create trace_events partitions", exc_info=True)
+    yield
+    for task in (listener, stream_listener):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await provider_clients.aclose()
+    # Write the trace events still queued before the process exits
+    await trace_ingestor.aclose()
+    completion_cache.close()
+
+
 app = FastAPI(
     title="OpenAI Agents Dashboard API",
     description="API for the OpenAI Agents Dashboard",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
-# Configure CORS
-origins = os.getenv("CORS_ORIGINS", '["http://localhost:5173"]')
-if isinstance(origins, str):
-    import json
-    origins = json.loads(origins)
+def cors_origins():
+    origins = os.getenv("CORS_ORIGINS")
+    if not origins:
+        return ["http://localhost:5173"]
+    return json.loads(origins)
 
+# Configure CORS
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=origins,
+    allow_origins=cors_origins(),
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+# Outermost, so that its timings cover CORS handling and every other layer
+app.add_middleware(InstrumentationMiddleware)
+
+@app.exception_handler(InvalidCursorError)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursorError):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+@app.exception_handler(InvalidFilterError)
+async def invalid_filter_handler(request: Request, exc: InvalidFilterError):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
 
@@ -35,6 +99,26 @@ app.include_router(api_router, prefix="/api/v1")
 async def root():
     return {"message": "Welcome to the OpenAI Agents Dashboard API"}
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    gauges = {f"catalog_cache_{name}": value for name, value in catalog_cache.stats().items()}
+    gauges.update(pool_gauges(engine.sync_engine.pool))
+    for i, replica in enumerate(replica_engines):
+        gauges.update(pool_gauges(replica.sync_engine.pool, f"replica-{i}"))
+    gauges.update(provider_clients.gauges())
+    gauges.update({
+        f"completion_cache_{name}": value
+        for name, value in completion_cache.stats().items()
+        if not isinstance(value, bool)
+    })
+    gauges.update(
+        {f"trace_ingestion_{name}": value for name, value in trace_ingestor.stats().items()}
+    )
+    gauges.update(
+        {f"execution_streams_{name}": value for name, value in execution_hub.stats().items()}
+    )
+    return PlainTextResponse(metrics.render(gauges), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
@@ -0,0 +1,6 @@
+# Import all models here so Base.metadata is complete wherever it is used to
+# create or inspect the schema (tests, Alembic autogenerate).
+from app.utils.db import Base  # noqa: F401
+from app.models.model_provider import ModelProvider, Model  # noqa: F401
+from app.models.trace import TraceEvent  # noqa: F401
+from app.models.usage import TraceMetrics, UsageLatencyBucket, UsageRollup  # noqa: F401
@@ -1,12 +1,62 @@
 import uuid
-from sqlalchemy import Column, String, Text, Boolean, DateTime, func
+from datetime import datetime, timezone
+from sqlalchemy import (
+    Column,
+    String,
+    Text,
+    Boolean,
+    DateTime,
+    Integer,
+    JSON,
+    DDL,
+    ForeignKey,
+    Index,
+    UniqueConstraint,
+    event,
+    func,
+    text,
+)
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
 
 from app.utils.db import Base
 
 
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def trigram_index(name: str, column: str) -> Index:
+    # GIN trigram index for catalog search; Postgres only, SQLite searches an
+    # in-memory index instead
+    return Index(
+        name, column, postgresql_using="gin", postgresql_ops={column: "gin_trgm_ops"}
+    ).ddl_if(dialect="postgresql")
+
+
+def active_index(name: str, *columns: str) -> Index:
+    # Partial index over active rows only, for active_only listings
+    return Index(
+        name, *columns, postgresql_where=text("is_active"), sqlite_where=text("is_active = 1")
+    )
+
+
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+
+
 class ModelProvider(Base):
     __tablename__ = "model_providers"
+    __table_args__ = (
+        Index("ix_model_providers_created_at_id", "created_at", "id"),
+        Index("ix_model_providers_updated_at_id", "updated_at", "id"),
+        active_index("ix_model_providers_active_created_at_id", "created_at", "id"),
+        trigram_index("ix_model_providers_name_trgm", "name"),
+        trigram_index("ix_model_providers_display_name_trgm", "display_name"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String(100), nullable=False, unique=True)
@@ -15,15 +65,34 @@ class ModelProvider(Base):
     api_base_url = Column(String(255))
     api_key_env_var = Column(String(100))
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Timestamps are also set client-side: keyset cursors and catalog ETags
+    # need full precision, while now() is per-transaction and only second
+    # resolution on SQLite.
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
+    updated_at = Column(
+        DateTime(timezone=True), default=utcnow, server_default=func.now(), onupdate=utcnow
+    )
 
 
 class Model(Base):
     __tablename__ = "models"
+    __table_args__ = (
+        UniqueConstraint("provider_id", "name", name="uq_models_provider_id_name"),
+        Index("ix_models_created_at_id", "created_at", "id"),
+        Index("ix_models_provider_id_created_at_id", "provider_id", "created_at", "id"),
+        Index("ix_models_provider_id_is_active", "provider_id", "is_active"),
+        Index("ix_models_model_type_created_at_id", "model_type", "created_at", "id"),
+        Index("ix_models_updated_at_id", "updated_at", "id"),
+        active_index("ix_models_active_created_at_id", "created_at", "id"),
+        trigram_index("ix_models_name_trgm", "name"),
+        trigram_index("ix_models_display_name_trgm", "display_name"),
+        trigram_index("ix_models_description_trgm", "description"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    provider_id = Column(UUID(as_uuid=True), Column(ForeignKey("model_providers.id", ondelete="CASCADE")))
+    provider_id = Column(
+        UUID(as_uuid=True), ForeignKey("model_providers.id", ondelete="CASCADE"), nullable=False
+    )
     name = Column(String(100), nullable=False)
     display_name = Column(String(100), nullable=False)
     description = Column(Text)
@@ -31,12 +100,17 @@ class Model(Base):
     context_window = Column(Integer)
     is_active = Column(Boolean, default=True)
     default_parameters = Column(JSON)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
-    
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
+    updated_at = Column(
+        DateTime(timezone=True), default=utcnow, server_default=func.now(), onupdate=utcnow
+    )
+
     # Define relationship
     provider = relationship("ModelProvider", back_populates="models")
 
 
-# Add relationship to ModelProvider
-ModelProvider.models = relationship("Model", back_populates="provider", cascade="all, delete-orphan")
\ No newline at end of file
+# Add relationship to ModelProvider. Deleting a provider leaves its models to
+# the database's ON DELETE CASCADE instead of loading and deleting each one.
+ModelProvider.models = relationship(
+    "Model", back_populates="provider", cascade="all, delete-orphan", passive_deletes=True
+)
\ No newline at end of file
@@ -0,0 +1,41 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, JSON, String
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.utils.db import Base
+
+
+def as_utc(value: datetime) -> datetime:
+    # Event timestamps are stored and compared in UTC; naive ones are taken
+    # to be UTC already
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+class TraceEvent(Base):
+    """
+    One event of an execution trace. Rows are only ever inserted, in
+    batches, by the trace event ingestor; ``id`` is their sequence number,
+    which orders events of equal timestamp by arrival.
+
+    Timeline reads are range scans of ``(trace_id, timestamp, id)``, or of
+    ``(trace_id, type, timestamp, id)`` for one event type, so they cost the
+    same however long the trace is.
+    """
+
+    __tablename__ = "trace_events"
+    __table_args__ = (
+        Index("ix_trace_events_trace_id_timestamp_id", "trace_id", "timestamp", "id"),
+        Index("ix_trace_events_trace_id_type_timestamp_id", "trace_id", "type", "timestamp", "id"),
+    )
+
+    # BIGINT identity on Postgres; SQLite only autoincrements INTEGER keys
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    trace_id = Column(UUID(as_uuid=True), nullable=False)
+    # Id the producer gave the event, if any
+    event_id = Column(String(64))
+    type = Column(String(32), nullable=False)
+    timestamp = Column(DateTime(timezone=True), nullable=False)
+    data = Column(JSON)
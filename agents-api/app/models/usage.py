@@ -0,0 +1,87 @@
+from sqlalchemy import BigInteger, Column, DateTime, Float, Index, Integer, String
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.utils.db import Base
+
+# Time buckets usage is rolled up into, with their width in seconds
+GRANULARITIES = {
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400,
+}
+
+
+class TraceMetrics(Base):
+    """
+    Token usage, cost and duration of one completed trace. Model and
+    provider ids are not foreign keys so that usage history outlives
+    deleted catalog entries.
+    """
+
+    __tablename__ = "trace_metrics"
+    __table_args__ = (
+        Index("ix_trace_metrics_completed_at", "completed_at"),
+    )
+
+    trace_id = Column(UUID(as_uuid=True), primary_key=True)
+    model_id = Column(UUID(as_uuid=True), nullable=False)
+    provider_id = Column(UUID(as_uuid=True), nullable=False)
+    completed_at = Column(DateTime(timezone=True), nullable=False)
+    duration_ms = Column(Float, nullable=False)
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    total_tokens = Column(Integer, nullable=False, default=0)
+    cost = Column(Float, nullable=False, default=0.0)
+
+
+class UsageRollup(Base):
+    """
+    Exact usage totals of one model in one minute, hour or day. Provider
+    totals are the sums over the provider's models.
+    """
+
+    __tablename__ = "usage_rollups"
+    __table_args__ = (
+        Index(
+            "ix_usage_rollups_provider_id_granularity_bucket_start",
+            "provider_id",
+            "granularity",
+            "bucket_start",
+        ),
+        Index("ix_usage_rollups_granularity_bucket_start", "granularity", "bucket_start"),
+    )
+
+    model_id = Column(UUID(as_uuid=True), primary_key=True)
+    granularity = Column(String(8), primary_key=True)
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    provider_id = Column(UUID(as_uuid=True), nullable=False)
+    requests = Column(BigInteger, nullable=False, default=0)
+    prompt_tokens = Column(BigInteger, nullable=False, default=0)
+    completion_tokens = Column(BigInteger, nullable=False, default=0)
+    total_tokens = Column(BigInteger, nullable=False, default=0)
+    cost = Column(Float, nullable=False, default=0.0)
+    duration_ms = Column(Float, nullable=False, default=0.0)
+
+
+class UsageLatencyBucket(Base):
+    """
+    One bucket of the latency sketch (see app/utils/sketch.py) of a rollup:
+    how many traces took about ``GAMMA ** bucket`` milliseconds. Sketches
+    merge by adding counts, so they are updated with the same upserts as
+    the rollup counters.
+    """
+
+    __tablename__ = "usage_latency_buckets"
+    __table_args__ = (
+        Index(
+            "ix_usage_latency_buckets_provider_id_granularity_bucket_start",
+            "provider_id", "granularity", "bucket_start"
+        ),
+    )
+
+    model_id = Column(UUID(as_uuid=True), primary_key=True)
+    granularity = Column(String(8), primary_key=True)
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    bucket = Column(Integer, primary_key=True, autoincrement=False)
+    provider_id = Column(UUID(as_uuid=True), nullable=False)
+    count = Column(BigInteger, nullable=False, default=0)
@@ -1,97 +1,732 @@
-from typing import List, Optional
+import asyncio
+import uuid
+from typing import Any, AsyncIterator, List, Mapping, Optional, Sequence, Tuple
 from uuid import UUID
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, case, delete, func, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.models.model_provider import ModelProvider, Model
-from app.schemas.model_provider import ModelProviderCreate, ModelProviderUpdate, ModelCreate, ModelUpdate
+from app.models.model_provider import ModelProvider, Model, utcnow
+from app.schemas.model_provider import (
+    CatalogVersion,
+    ModelBase,
+    ModelProviderCreate,
+    ModelProviderUpdate,
+    ModelCreate,
+    ModelUpdate,
+    ModelUpsertResult
+)
+from app.utils.export import stream_rows
+from app.utils.filtering import (
+    Field,
+    FilterSet,
+    ListQuery,
+    parse_bool,
+    parse_datetime,
+    sparse_columns,
+)
+from app.utils.pagination import CursorPage, paginate
+from app.utils.search import InvertedIndex
+
+# Rows per server-side cursor fetch in the streaming exports
+EXPORT_BATCH_SIZE = 1000
+
+PROVIDER_EXPORT_COLUMNS = (
+    ModelProvider.id,
+    ModelProvider.name,
+    ModelProvider.display_name,
+    ModelProvider.description,
+    ModelProvider.api_base_url,
+    ModelProvider.api_key_env_var,
+    ModelProvider.is_active,
+    ModelProvider.created_at,
+    ModelProvider.updated_at,
+)
+PROVIDER_EXPORT_FIELDS = tuple(column.key for column in PROVIDER_EXPORT_COLUMNS)
+
+MODEL_EXPORT_COLUMNS = (
+    Model.id,
+    Model.provider_id,
+    ModelProvider.name.label("provider_name"),
+    Model.name,
+    Model.display_name,
+    Model.description,
+    Model.model_type,
+    Model.context_window,
+    Model.is_active,
+    Model.default_parameters,
+    Model.created_at,
+    Model.updated_at,
+)
+MODEL_EXPORT_FIELDS = tuple(column.key for column in MODEL_EXPORT_COLUMNS)
+
+# Columns a sparse fieldset (``fields=``) can select
+PROVIDER_COLUMNS = {column.key: column for column in PROVIDER_EXPORT_COLUMNS}
+MODEL_COLUMNS = {column.key: column for column in Model.__table__.columns}
+
+RANGE_OPERATORS = ("eq", "ne", "gt", "gte", "lt", "lte", "in")
+
+# Filters and sort orders the list endpoints accept. Sortable fields must be
+# non-nullable, as the keyset cursor compares (field, id) tuples.
+PROVIDER_FILTERS = FilterSet(
+    {
+        "name": Field(ModelProvider.name, sortable=True),
+        "display_name": Field(ModelProvider.display_name, sortable=True),
+        "is_active": Field(ModelProvider.is_active, parse_bool, operators=("eq",)),
+        "created_at": Field(
+            ModelProvider.created_at, parse_datetime, operators=RANGE_OPERATORS, sortable=True
+        ),
+        "updated_at": Field(
+            ModelProvider.updated_at, parse_datetime, operators=RANGE_OPERATORS, sortable=True
+        ),
+    }
+)
+
+MODEL_FILTERS = FilterSet(
+    {
+        "name": Field(Model.name, sortable=True),
+        "display_name": Field(Model.display_name, sortable=True),
+        "model_type": Field(Model.model_type, sortable=True),
+        "is_active": Field(Model.is_active, parse_bool, operators=("eq",)),
+        "context_window": Field(Model.context_window, int, operators=RANGE_OPERATORS),
+        "provider_id": Field(Model.provider_id, UUID),
+        "provider_name": Field(
+            ModelProvider.name, join=(ModelProvider, Model.provider_id == ModelProvider.id)
+        ),
+        "provider_is_active": Field(
+            ModelProvider.is_active,
+            parse_bool,
+            operators=("eq",),
+            join=(ModelProvider, Model.provider_id == ModelProvider.id),
+        ),
+        "created_at": Field(
+            Model.created_at, parse_datetime, operators=RANGE_OPERATORS, sortable=True
+        ),
+        "updated_at": Field(
+            Model.updated_at, parse_datetime, operators=RANGE_OPERATORS, sortable=True
+        ),
+    }
+)
+
+
+async def paginate_list(
+    db: AsyncSession,
+    stmt,
+    entity,
+    filters: FilterSet,
+    query: Optional[ListQuery],
+    cursor: Optional[str],
+    limit: int,
+    include_total: bool
+) -> CursorPage:
+    """
+    Keyset-paginate ``stmt`` with the filters and sort order of ``query``.
+    """
+    if query is None:
+        return await paginate(db, stmt, entity, cursor, limit, include_total)
+    return await paginate(
+        db,
+        filters.apply(stmt, query),
+        entity,
+        cursor,
+        limit,
+        include_total,
+        filters.sort_column(query),
+        query.descending
+    )
+
+
+async def execute_and_commit(db: AsyncSession, *statements):
+    """
+    Run DML ``... RETURNING`` statements in one transaction and return the
+    entity each one returned (or ``None``). Constraint violations roll the
+    transaction back and propagate as ``IntegrityError``.
+    """
+    try:
+        results = [await db.scalar(stmt) for stmt in statements]
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise
+    return results
+
+
+def bulk_target(
+    entity, filters: FilterSet, ids: Optional[Sequence[UUID]], query: Optional[ListQuery]
+):
+    """
+    WHERE clause selecting the rows a bulk operation applies to: those in
+    ``ids`` (when given) that also match the filters of ``query``. Filters
+    go through an ``id IN (SELECT ...)`` subquery, as UPDATE and DELETE
+    statements cannot carry the joins some filters need.
+    """
+    clauses = []
+    if ids is not None:
+        clauses.append(entity.id.in_(ids))
+    if query is not None and query.filters:
+        clauses.append(entity.id.in_(filters.apply(select(entity.id), query).scalar_subquery()))
+    return and_(*clauses)
+
+
+async def execute_bulk(db: AsyncSession, stmt) -> int:
+    try:
+        result = await db.execute(stmt)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise
+    return result.rowcount
 
 
 class ModelProviderRepository:
-    def get(self, db: Session, id: UUID) -> Optional[ModelProvider]:
-        return db.query(ModelProvider).filter(ModelProvider.id == id).first()
-
-    def get_by_name(self, db: Session, name: str) -> Optional[ModelProvider]:
-        return db.query(ModelProvider).filter(ModelProvider.name == name).first()
-
-    def get_all(self, db: Session, skip: int = 0, limit: int = 100) -> List[ModelProvider]:
-        return db.query(ModelProvider).offset(skip).limit(limit).all()
-
-    def get_active(self, db: Session, skip: int = 0, limit: int = 100) -> List[ModelProvider]:
-        return db.query(ModelProvider).filter(ModelProvider.is_active == True).offset(skip).limit(limit).all()
-
-    def create(self, db: Session, obj_in: ModelProviderCreate) -> ModelProvider:
-        db_obj = ModelProvider(
-            name=obj_in.name,
-            display_name=obj_in.display_name,
-            description=obj_in.description,
-            api_base_url=obj_in.api_base_url,
-            api_key_env_var=obj_in.api_key_env_var,
-            is_active=obj_in.is_active
-        )
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+    # ModelProvider responses embed the provider's models, and relationships
+    # cannot be lazy-loaded on an AsyncSession, so every read that feeds a
+    # response loads them up front.
+    def _select_with_models(self):
+        return select(ModelProvider).options(selectinload(ModelProvider.models))
+
+    async def get(self, db: AsyncSession, id: UUID) -> Optional[ModelProvider]:
+        result = await db.execute(self._select_with_models().filter(ModelProvider.id == id))
+        return result.scalars().first()
+
+    async def get_by_name(self, db: AsyncSession, name: str) -> Optional[ModelProvider]:
+        result = await db.execute(select(ModelProvider).filter(ModelProvider.name == name))
+        return result.scalars().first()
+
+    async def get_all(
+        self,
+        db: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        include_total: bool = False,
+        query: Optional[ListQuery] = None
+    ) -> CursorPage:
+        return await paginate_list(
+            db,
+            self._select_with_models(),
+            ModelProvider,
+            PROVIDER_FILTERS,
+            query,
+            cursor,
+            limit,
+            include_total,
+        )
+
+    async def get_active(
+        self,
+        db: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        include_total: bool = False,
+        query: Optional[ListQuery] = None
+    ) -> CursorPage:
+        stmt = self._select_with_models().filter(ModelProvider.is_active == True)
+        return await paginate_list(
+            db, stmt, ModelProvider, PROVIDER_FILTERS, query, cursor, limit, include_total
+        )
+
+    async def get_with_models(self, db: AsyncSession, id: UUID) -> Optional[ModelProvider]:
+        return await self.get(db, id)
+
+    async def get_all_with_models(
+        self,
+        db: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        include_total: bool = False,
+        query: Optional[ListQuery] = None
+    ) -> CursorPage:
+        # One query for the page of providers plus one IN (...) query for all of
+        # their models, however many providers or models the page contains.
+        return await self.get_all(db, cursor, limit, include_total, query)
+
+    async def get_endpoint(self, db: AsyncSession, id: UUID):
+        """
+        Just the columns an HTTP client for the provider needs, or ``None``.
+        """
+        result = await db.execute(
+            select(
+                ModelProvider.api_base_url, ModelProvider.api_key_env_var, ModelProvider.is_active
+            ).filter(ModelProvider.id == id)
+        )
+        return result.first()
+
+    async def get_many(
+        self, db: AsyncSession, ids: Sequence[UUID], fields: Optional[Sequence[str]] = None
+    ) -> List[Mapping]:
+        """
+        Providers in ``ids`` with only the ``fields`` columns, in one query.
+        """
+        stmt = select(*sparse_columns(PROVIDER_COLUMNS, fields, ("id",))).filter(
+            ModelProvider.id.in_(ids)
+        )
+        return (await db.execute(stmt)).mappings().all()
+
+    async def get_catalog_version(self, db: AsyncSession) -> CatalogVersion:
+        # Any insert or update moves a max(updated_at) forward and any delete
+        # lowers a count, so together they change whenever the catalog does.
+        row = (await db.execute(
+            select(
+                select(func.count()).select_from(ModelProvider).scalar_subquery(),
+                select(func.max(ModelProvider.updated_at)).scalar_subquery(),
+                select(func.count()).select_from(Model).scalar_subquery(),
+                select(func.max(Model.updated_at)).scalar_subquery(),
+            )
+        )).one()
+        provider_count, provider_updated_at, model_count, model_updated_at = row
+        timestamps = [t for t in (provider_updated_at, model_updated_at) if t is not None]
+        return CatalogVersion(
+            provider_count=provider_count,
+            model_count=model_count,
+            last_modified=max(timestamps) if timestamps else None
+        )
+
+    def export(
+        self, db: AsyncSession, active_only: bool = False, batch_size: int = EXPORT_BATCH_SIZE
+    ) -> AsyncIterator[Sequence[Mapping]]:
+        # Plain columns rather than entities: exported rows skip the identity
+        # map and relationship loading entirely.
+        stmt = select(*PROVIDER_EXPORT_COLUMNS).order_by(ModelProvider.created_at, ModelProvider.id)
+        if active_only:
+            stmt = stmt.filter(ModelProvider.is_active == True)
+        return stream_rows(db, stmt, batch_size)
+
+    async def create(self, db: AsyncSession, obj_in: ModelProviderCreate) -> ModelProvider:
+        [db_obj] = await execute_and_commit(
+            db, insert(ModelProvider).values(**obj_in.model_dump()).returning(ModelProvider)
+        )
+        # A new provider has no models; mark the collection loaded so the
+        # response does not try to lazy-load it
+        set_committed_value(db_obj, "models", [])
         return db_obj
 
-    def update(self, db: Session, db_obj: ModelProvider, obj_in: ModelProviderUpdate) -> ModelProvider:
-        update_data = obj_in.dict(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_obj, field, value)
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+    async def update(
+        self, db: AsyncSession, id: UUID, obj_in: ModelProviderUpdate
+    ) -> Optional[ModelProvider]:
+        [db_obj] = await execute_and_commit(
+            db,
+            update(ModelProvider)
+            .filter(ModelProvider.id == id)
+            .values(**obj_in.model_dump(exclude_unset=True))
+            .returning(ModelProvider)
+            .options(selectinload(ModelProvider.models))
+        )
         return db_obj
 
-    def delete(self, db: Session, id: UUID) -> ModelProvider:
-        obj = db.query(ModelProvider).get(id)
-        db.delete(obj)
-        db.commit()
-        return obj
+    async def delete(self, db: AsyncSession, id: UUID) -> Optional[ModelProvider]:
+        # One statement however many models the provider has: ON DELETE
+        # CASCADE removes them in the database
+        [db_obj] = await execute_and_commit(
+            db, delete(ModelProvider).filter(ModelProvider.id == id).returning(ModelProvider)
+        )
+        return db_obj
+
+    async def bulk_deactivate(
+        self,
+        db: AsyncSession,
+        ids: Optional[Sequence[UUID]] = None,
+        query: Optional[ListQuery] = None,
+    ) -> int:
+        return await execute_bulk(
+            db,
+            update(ModelProvider)
+            .filter(
+                bulk_target(ModelProvider, PROVIDER_FILTERS, ids, query),
+                ModelProvider.is_active.is_not(False),
+            )
+            .values(is_active=False),
+        )
+
+    async def bulk_delete(
+        self,
+        db: AsyncSession,
+        ids: Optional[Sequence[UUID]] = None,
+        query: Optional[ListQuery] = None,
+    ) -> int:
+        return await execute_bulk(
+            db,
+            delete(ModelProvider).filter(bulk_target(ModelProvider, PROVIDER_FILTERS, ids, query)),
+        )
+
+
+# Fields a bulk upsert may overwrite on an existing (provider_id, name) row
+MODEL_UPSERT_FIELDS = (
+    "display_name",
+    "description",
+    "model_type",
+    "context_window",
+    "is_active",
+    "default_parameters",
+)
+
+# Rows per INSERT statement; keeps each statement well under the bind
+# parameter limits of Postgres (65535) and SQLite (32766)
+MODEL_UPSERT_BATCH_SIZE = 500
+
+UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
 
 
 class ModelRepository:
-    def get(self, db: Session, id: UUID) -> Optional[Model]:
-        return db.query(Model).filter(Model.id == id).first()
-
-    def get_by_name_and_provider(self, db: Session, name: str, provider_id: UUID) -> Optional[Model]:
-        return db.query(Model).filter(Model.name == name, Model.provider_id == provider_id).first()
-
-    def get_all(self, db: Session, skip: int = 0, limit: int = 100) -> List[Model]:
-        return db.query(Model).offset(skip).limit(limit).all()
-
-    def get_by_provider(self, db: Session, provider_id: UUID, skip: int = 0, limit: int = 100) -> List[Model]:
-        return db.query(Model).filter(Model.provider_id == provider_id).offset(skip).limit(limit).all()
-
-    def get_active(self, db: Session, skip: int = 0, limit: int = 100) -> List[Model]:
-        return db.query(Model).filter(Model.is_active == True).offset(skip).limit(limit).all()
-
-    def create(self, db: Session, obj_in: ModelCreate) -> Model:
-        db_obj = Model(
-            provider_id=obj_in.provider_id,
-            name=obj_in.name,
-            display_name=obj_in.display_name,
-            description=obj_in.description,
-            model_type=obj_in.model_type,
-            context_window=obj_in.context_window,
-            is_active=obj_in.is_active,
-            default_parameters=obj_in.default_parameters
-        )
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+    async def get(self, db: AsyncSession, id: UUID) -> Optional[Model]:
+        result = await db.execute(select(Model).filter(Model.id == id))
+        return result.scalars().first()
+
+    async def get_by_name_and_provider(
+        self, db: AsyncSession, name: str, provider_id: UUID
+    ) -> Optional[Model]:
+        result = await db.execute(
+            select(Model).filter(Model.name == name, Model.provider_id == provider_id)
+        )
+        return result.scalars().first()
+
+    async def get_many(
+        self, db: AsyncSession, ids: Sequence[UUID], fields: Optional[Sequence[str]] = None
+    ) -> List[Mapping]:
+        """
+        Models in ``ids`` with only the ``fields`` columns, in one query; the
+        description and default parameters are not read unless asked for.
+        """
+        stmt = select(*sparse_columns(MODEL_COLUMNS, fields, ("id", "provider_id"))).filter(
+            Model.id.in_(ids)
+        )
+        return (await db.execute(stmt)).mappings().all()
+
+    async def get_all(
+        self,
+        db: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        include_total: bool = False,
+        query: Optional[ListQuery] = None
+    ) -> CursorPage:
+        return await paginate_list(
+            db, select(Model), Model, MODEL_FILTERS, query, cursor, limit, include_total
+        )
+
+    async def get_by_provider(
+        self,
+        db: AsyncSession,
+        provider_id: UUID,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        include_total: bool = False,
+        query: Optional[ListQuery] = None
+    ) -> CursorPage:
+        stmt = select(Model).filter(Model.provider_id == provider_id)
+        return await paginate_list(
+            db, stmt, Model, MODEL_FILTERS, query, cursor, limit, include_total
+        )
+
+    async def get_active(
+        self,
+        db: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        include_total: bool = False,
+        query: Optional[ListQuery] = None
+    ) -> CursorPage:
+        stmt = select(Model).filter(Model.is_active == True)
+        return await paginate_list(
+            db, stmt, Model, MODEL_FILTERS, query, cursor, limit, include_total
+        )
+
+    def export(
+        self,
+        db: AsyncSession,
+        provider_id: Optional[UUID] = None,
+        active_only: bool = False,
+        batch_size: int = EXPORT_BATCH_SIZE
+    ) -> AsyncIterator[Sequence[Mapping]]:
+        stmt = (
+            select(*MODEL_EXPORT_COLUMNS)
+            .join(ModelProvider, Model.provider_id == ModelProvider.id)
+            .order_by(Model.created_at, Model.id)
+        )
+        if provider_id is not None:
+            stmt = stmt.filter(Model.provider_id == provider_id)
+        if active_only:
+            stmt = stmt.filter(Model.is_active == True)
+        return stream_rows(db, stmt, batch_size)
+
+    async def create(self, db: AsyncSession, obj_in: ModelCreate) -> Model:
+        [db_obj] = await execute_and_commit(
+            db, insert(Model).values(**obj_in.model_dump()).returning(Model)
+        )
         return db_obj
 
-    def update(self, db: Session, db_obj: Model, obj_in: ModelUpdate) -> Model:
-        update_data = obj_in.dict(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_obj, field, value)
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+    async def update(
+        self, db: AsyncSession, provider_id: UUID, id: UUID, obj_in: ModelUpdate
+    ) -> Optional[Model]:
+        [db_obj] = await execute_and_commit(
+            db,
+            update(Model)
+            .filter(Model.id == id, Model.provider_id == provider_id)
+            .values(**obj_in.model_dump(exclude_unset=True))
+            .returning(Model)
+        )
         return db_obj
 
-    def delete(self, db: Session, id: UUID) -> Model:
-        obj = db.query(Model).get(id)
-        db.delete(obj)
-        db.commit()
-        return obj
\ No newline at end of file
+    async def delete(self, db: AsyncSession, provider_id: UUID, id: UUID) -> Optional[Model]:
+        [db_obj] = await execute_and_commit(
+            db,
+            delete(Model).filter(Model.id == id, Model.provider_id == provider_id).returning(Model),
+        )
+        return db_obj
+
+    async def bulk_deactivate(
+        self,
+        db: AsyncSession,
+        ids: Optional[Sequence[UUID]] = None,
+        query: Optional[ListQuery] = None,
+    ) -> int:
+        return await execute_bulk(
+            db,
+            update(Model)
+            .filter(bulk_target(Model, MODEL_FILTERS, ids, query), Model.is_active.is_not(False))
+            .values(is_active=False)
+        )
+
+    async def bulk_delete(
+        self,
+        db: AsyncSession,
+        ids: Optional[Sequence[UUID]] = None,
+        query: Optional[ListQuery] = None,
+    ) -> int:
+        return await execute_bulk(
+            db, delete(Model).filter(bulk_target(Model, MODEL_FILTERS, ids, query))
+        )
+
+    async def bulk_upsert(
+        self, db: AsyncSession, provider_id: UUID, models_in: List[ModelBase]
+    ) -> List[ModelUpsertResult]:
+        """
+        Insert or update ``models_in`` for a provider, matched on name, in one
+        transaction: one SELECT for the existing rows, then one multi-row
+        ``INSERT ... ON CONFLICT (provider_id, name) DO UPDATE`` per batch for
+        the rows that are new or differ. Unchanged rows are not written.
+        """
+        names = [model_in.name for model_in in models_in]
+        existing = {
+            row.name: row
+            for row in (await db.execute(
+                select(Model.id, Model.name, *(getattr(Model, f) for f in MODEL_UPSERT_FIELDS))
+                .filter(Model.provider_id == provider_id, Model.name.in_(names))
+            )).all()
+        }
+
+        now = utcnow()
+        statuses, rows = {}, []
+        for model_in in models_in:
+            values = model_in.model_dump(include={"name", *MODEL_UPSERT_FIELDS})
+            current = existing.get(model_in.name)
+            if current is None:
+                statuses[model_in.name] = "created"
+            elif any(getattr(current, f) != values[f] for f in MODEL_UPSERT_FIELDS):
+                statuses[model_in.name] = "updated"
+            else:
+                statuses[model_in.name] = "unchanged"
+                continue
+            rows.append({
+                **values,
+                "id": uuid.uuid4(),
+                "provider_id": provider_id,
+                "created_at": now,
+                "updated_at": now,
+            })
+
+        # Ids come back from RETURNING, so a row another request inserted in
+        # the meantime is still reported with the id it really has
+        ids = {name: row.id for name, row in existing.items()}
+        upsert = UPSERT_INSERTS[db.get_bind().dialect.name]
+        try:
+            for start in range(0, len(rows), MODEL_UPSERT_BATCH_SIZE):
+                stmt = upsert(Model).values(rows[start:start + MODEL_UPSERT_BATCH_SIZE])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[Model.provider_id, Model.name],
+                    set_={
+                        **{f: stmt.excluded[f] for f in MODEL_UPSERT_FIELDS},
+                        "updated_at": stmt.excluded.updated_at,
+                    }
+                ).returning(Model.id, Model.name)
+                ids.update({row.name: row.id for row in await db.execute(stmt)})
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise
+        return [
+            ModelUpsertResult(
+                id=ids[model_in.name], name=model_in.name, status=statuses[model_in.name]
+            )
+            for model_in in models_in
+        ]
+
+
+# Relative weight of a match in each searchable field
+SEARCH_WEIGHTS = {"name": 1.0, "display_name": 0.8, "description": 0.4}
+
+
+class CatalogSearchRepository:
+    """
+    Ranked prefix and fuzzy search over provider and model names, display
+    names and descriptions.
+
+    Postgres answers with pg_trgm similarity on the trigram indexes of
+    migration 004. Other databases (SQLite) search an in-memory
+    :class:`InvertedIndex` of the catalog, rebuilt when the catalog version
+    changes.
+    """
+
+    def __init__(self):
+        self._version: Optional[CatalogVersion] = None
+        self._providers: Optional[InvertedIndex] = None
+        self._models: Optional[InvertedIndex] = None
+        self._lock = asyncio.Lock()
+
+    async def search(
+        self,
+        db: AsyncSession,
+        q: str,
+        version: CatalogVersion,
+        model_type: Optional[str] = None,
+        is_active: Optional[bool] = None,
+        min_context_window: Optional[int] = None,
+        max_context_window: Optional[int] = None,
+        limit: int = 20
+    ) -> Tuple[List[Tuple[Any, float]], List[Tuple[Any, float]]]:
+        """
+        Return the best ``limit`` ``(provider row, score)`` and ``(model row,
+        score)`` pairs for ``q``. Model rows carry their ``provider_name``.
+        """
+        model_filters = (model_type, is_active, min_context_window, max_context_window)
+        if db.get_bind().dialect.name == "postgresql":
+            return (
+                await self._search_providers_sql(db, q, is_active, limit),
+                await self._search_models_sql(db, q, *model_filters, limit),
+            )
+
+        await self._ensure_index(db, version)
+
+        def model_matches(row) -> bool:
+            return (
+                (model_type is None or row["model_type"] == model_type)
+                and (is_active is None or row["is_active"] == is_active)
+                and (
+                    min_context_window is None or (row["context_window"] or 0) >= min_context_window
+                )
+                and (
+                    max_context_window is None or (row["context_window"] or 0) <= max_context_window
+                )
+            )
+
+        def provider_matches(row) -> bool:
+            return is_active is None or row["is_active"] == is_active
+
+        return (
+            self._providers.search(q, limit, provider_matches),
+            self._models.search(q, limit, model_matches),
+        )
+
+    async def _ensure_index(self, db: AsyncSession, version: CatalogVersion):
+        async with self._lock:
+            if self._version == version:
+                return
+            providers = InvertedIndex(SEARCH_WEIGHTS)
+            models = InvertedIndex(SEARCH_WEIGHTS)
+            provider_rows = select(*PROVIDER_EXPORT_COLUMNS).order_by(
+                ModelProvider.created_at, ModelProvider.id
+            )
+            async for rows in stream_rows(db, provider_rows, EXPORT_BATCH_SIZE):
+                for row in rows:
+                    providers.add(
+                        {"name": row["name"], "display_name": row["display_name"]}, dict(row)
+                    )
+            model_rows = (
+                select(*MODEL_EXPORT_COLUMNS)
+                .join(ModelProvider, Model.provider_id == ModelProvider.id)
+                .order_by(Model.created_at, Model.id)
+            )
+            async for rows in stream_rows(db, model_rows, EXPORT_BATCH_SIZE):
+                for row in rows:
+                    models.add(
+                        {
+                            "name": row["name"],
+                            "display_name": row["display_name"],
+                            "description": row["description"],
+                        },
+                        dict(row),
+                    )
+            self._providers, self._models, self._version = providers, models, version
+
+    @staticmethod
+    def _score(q: str, name, display_name, description=None):
+        # Prefix matches on the name rank first, then trigram similarity
+        scores = [
+            func.similarity(name, q) * SEARCH_WEIGHTS["name"]
+            + case((name.istartswith(q, autoescape=True), 1.0), else_=0.0),
+            func.similarity(display_name, q) * SEARCH_WEIGHTS["display_name"],
+        ]
+        if description is not None:
+            scores.append(
+                func.coalesce(func.word_similarity(q, description), 0.0)
+                * SEARCH_WEIGHTS["description"]
+            )
+        return func.greatest(*scores)
+
+    @staticmethod
+    def _matches(q: str, name, display_name, description=None):
+        conditions = [
+            name.istartswith(q, autoescape=True),
+            name.op("%")(q),
+            display_name.op("%")(q),
+        ]
+        if description is not None:
+            conditions.append(description.op("%>")(q))
+        return or_(*conditions)
+
+    async def _search_providers_sql(
+        self, db: AsyncSession, q: str, is_active: Optional[bool], limit: int
+    ):
+        score = self._score(q, ModelProvider.name, ModelProvider.display_name).label("score")
+        stmt = (
+            select(*PROVIDER_EXPORT_COLUMNS, score)
+            .filter(self._matches(q, ModelProvider.name, ModelProvider.display_name))
+            .order_by(score.desc(), ModelProvider.name)
+            .limit(limit)
+        )
+        if is_active is not None:
+            stmt = stmt.filter(ModelProvider.is_active == is_active)
+        return [(row, row["score"]) for row in (await db.execute(stmt)).mappings()]
+
+    async def _search_models_sql(
+        self,
+        db: AsyncSession,
+        q: str,
+        model_type: Optional[str],
+        is_active: Optional[bool],
+        min_context_window: Optional[int],
+        max_context_window: Optional[int],
+        limit: int
+    ):
+        score = self._score(q, Model.name, Model.display_name, Model.description).label("score")
+        stmt = (
+            select(*MODEL_EXPORT_COLUMNS, score)
+            .join(ModelProvider, Model.provider_id == ModelProvider.id)
+            .filter(self._matches(q, Model.name, Model.display_name, Model.description))
+            .order_by(score.desc(), Model.name)
+            .limit(limit)
+        )
+        if model_type is not None:
+            stmt = stmt.filter(Model.model_type == model_type)
+        if is_active is not None:
+            stmt = stmt.filter(Model.is_active == is_active)
+        if min_context_window is not None:
+            stmt = stmt.filter(Model.context_window >= min_context_window)
+        if max_context_window is not None:
+            stmt = stmt.filter(Model.context_window <= max_context_window)
+        return [(row, row["score"]) for row in (await db.execute(stmt)).mappings()]
@@ -0,0 +1,70 @@
+from datetime import datetime
+from typing import Optional, Sequence
+from uuid import UUID
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.trace import TraceEvent, as_utc
+from app.utils.pagination import CursorPage, paginate
+
+
+class TraceEventRepository:
+    async def get_range(
+        self,
+        db: AsyncSession,
+        trace_id: UUID,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        types: Optional[Sequence[str]] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        descending: bool = False
+    ) -> CursorPage:
+        """
+        Events of a trace with ``start <= timestamp < end``, optionally only
+        those of ``types``, in timestamp order.
+        """
+        stmt = select(TraceEvent).filter(TraceEvent.trace_id == trace_id)
+        if start is not None:
+            stmt = stmt.filter(TraceEvent.timestamp >= as_utc(start))
+        if end is not None:
+            stmt = stmt.filter(TraceEvent.timestamp < as_utc(end))
+        if types:
+            stmt = stmt.filter(TraceEvent.type.in_(types))
+        return await paginate(
+            db,
+            stmt,
+            TraceEvent,
+            cursor,
+            limit,
+            sort_column=TraceEvent.timestamp,
+            descending=descending,
+        )
+
+    async def get_span(self, db: AsyncSession, trace_id: UUID) -> Optional[tuple]:
+        """
+        Timestamps of the first and last event of a trace, both read from
+        the ends of the timeline index.
+        """
+        first = (
+            select(func.min(TraceEvent.timestamp))
+            .filter(TraceEvent.trace_id == trace_id)
+            .scalar_subquery()
+        )
+        last = (
+            select(func.max(TraceEvent.timestamp))
+            .filter(TraceEvent.trace_id == trace_id)
+            .scalar_subquery()
+        )
+        row = (await db.execute(select(first, last))).one()
+        return None if row[0] is None else tuple(row)
+
+    async def create_partitions(self, db: AsyncSession, months_ahead: int = 3):
+        """
+        Create the monthly partitions of a partitioned ``trace_events``
+        (Postgres, see migration 007) for the coming months.
+        """
+        await db.execute(
+            text("SELECT create_trace_event_partitions(:months)"), {"months": months_ahead}
+        )
+        await db.commit()
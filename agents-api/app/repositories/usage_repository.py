@@ -0,0 +1,326 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Set, Tuple
+from uuid import UUID
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.model_provider import Model
+from app.models.trace import as_utc
+from app.models.usage import GRANULARITIES, TraceMetrics, UsageLatencyBucket, UsageRollup
+from app.repositories.model_provider_repository import UPSERT_INSERTS
+from app.utils.export import stream_rows
+from app.utils.sketch import (
+    MAX_INDEX,
+    MIN_INDEX,
+    LatencySketch,
+    bucket_index,
+    bucket_indices,
+    numpy,
+)
+
+# Summed per rollup; "requests" counts the traces
+ROLLUP_COUNTERS = (
+    "requests",
+    "prompt_tokens",
+    "completion_tokens",
+    "total_tokens",
+    "cost",
+    "duration_ms",
+)
+METRIC_COUNTERS = ROLLUP_COUNTERS[1:]
+
+UPSERT_BATCH_SIZE = 1000
+BACKFILL_BATCH_SIZE = 50000
+
+# (model id, granularity, bucket start) of a rollup
+RollupKey = Tuple[UUID, str, datetime]
+
+
+def bucket_start(moment: datetime, seconds: int) -> datetime:
+    epoch = int(as_utc(moment).timestamp())
+    return datetime.fromtimestamp(epoch - epoch % seconds, timezone.utc)
+
+
+class RollupDelta:
+    """
+    Counters and latency sketch buckets to add to the rollups, keyed by
+    rollup, accumulated from any number of traces.
+    """
+
+    def __init__(self):
+        self.providers: Dict[UUID, UUID] = {}
+        self.counters: Dict[RollupKey, List[float]] = {}
+        self.latencies: Dict[Tuple[UUID, str, datetime, int], int] = {}
+
+    def add(self, key: RollupKey, provider_id: UUID, counters: Sequence[float]):
+        self.providers[key[0]] = provider_id
+        totals = self.counters.get(key)
+        if totals is None:
+            self.counters[key] = list(counters)
+        else:
+            for i, value in enumerate(counters):
+                totals[i] += value
+
+    def add_latency(self, key: RollupKey, bucket: int, count: int):
+        latency_key = (*key, bucket)
+        self.latencies[latency_key] = self.latencies.get(latency_key, 0) + count
+
+    def add_traces(self, rows: Sequence[Mapping[str, Any]]):
+        """
+        Add traces one at a time; for the few traces of a request.
+        """
+        for row in rows:
+            for granularity, seconds in GRANULARITIES.items():
+                key = (row["model_id"], granularity, bucket_start(row["completed_at"], seconds))
+                self.add(
+                    key, row["provider_id"], [1, *(row[counter] for counter in METRIC_COUNTERS)]
+                )
+                self.add_latency(key, bucket_index(row["duration_ms"]), 1)
+
+    def add_arrays(self, rows: Sequence[Mapping[str, Any]]):
+        """
+        Add a large batch of traces with NumPy: per granularity, one
+        ``unique`` over (model, bucket start) keys and one ``bincount`` per
+        counter, instead of a dictionary update per trace and counter.
+        """
+        model_ids = [row["model_id"] for row in rows]
+        _, first, model_codes = numpy.unique(
+            numpy.array([str(model_id) for model_id in model_ids]),
+            return_index=True,
+            return_inverse=True,
+        )
+        providers = [rows[i]["provider_id"] for i in first]
+        model_uuids = [model_ids[i] for i in first]
+        epochs = numpy.array(
+            [int(as_utc(row["completed_at"]).timestamp()) for row in rows], dtype=numpy.int64
+        )
+        counters = {
+            counter: numpy.array([row[counter] for row in rows], dtype=numpy.float64)
+            for counter in METRIC_COUNTERS
+        }
+        latency_buckets = bucket_indices(counters["duration_ms"]) - MIN_INDEX
+        width = MAX_INDEX - MIN_INDEX + 1
+
+        for granularity, seconds in GRANULARITIES.items():
+            # Bucket starts fit in 32 bits until 2106
+            keys = (model_codes.astype(numpy.int64) << 32) | (epochs - epochs % seconds)
+            groups, inverse = numpy.unique(keys, return_inverse=True)
+            sums = [numpy.bincount(inverse, minlength=len(groups))] + [
+                numpy.bincount(inverse, weights=counters[counter], minlength=len(groups))
+                for counter in METRIC_COUNTERS
+            ]
+            rollup_keys = []
+            for g, group in enumerate(groups.tolist()):
+                code = group >> 32
+                key = (
+                    model_uuids[code],
+                    granularity,
+                    datetime.fromtimestamp(group & 0xFFFFFFFF, timezone.utc),
+                )
+                rollup_keys.append(key)
+                self.add(key, providers[code], [column[g].item() for column in sums])
+
+            latency_groups, counts = numpy.unique(
+                inverse * width + latency_buckets, return_counts=True
+            )
+            for latency_group, count in zip(latency_groups.tolist(), counts.tolist()):
+                self.add_latency(
+                    rollup_keys[latency_group // width], latency_group % width + MIN_INDEX, count
+                )
+
+
+class UsageRepository:
+    async def get_provider_ids(
+        self, db: AsyncSession, model_ids: Sequence[UUID]
+    ) -> Dict[UUID, UUID]:
+        rows = await db.execute(
+            select(Model.id, Model.provider_id).filter(Model.id.in_(set(model_ids)))
+        )
+        return {row.id: row.provider_id for row in rows}
+
+    async def get_metrics(self, db: AsyncSession, trace_id: UUID) -> Optional[TraceMetrics]:
+        return await db.get(TraceMetrics, trace_id)
+
+    async def record(self, db: AsyncSession, rows: Sequence[Mapping[str, Any]]) -> Set[UUID]:
+        """
+        Store the metrics of completed traces and add them to the rollups,
+        in one transaction. Traces recorded before are left alone, so a
+        completion that is delivered twice is counted once. Returns the ids
+        of the traces recorded now.
+        """
+        upsert = UPSERT_INSERTS[db.get_bind().dialect.name]
+        stmt = upsert(TraceMetrics).values(list(rows)).on_conflict_do_nothing(
+            index_elements=[TraceMetrics.trace_id]
+        ).returning(TraceMetrics.trace_id)
+        recorded = set((await db.execute(stmt)).scalars().all())
+
+        delta = RollupDelta()
+        delta.add_traces([row for row in rows if row["trace_id"] in recorded])
+        await self._apply(db, delta)
+        await db.commit()
+        return recorded
+
+    async def _apply(self, db: AsyncSession, delta: RollupDelta):
+        # Counters are added in the database, so concurrent writers to the
+        # same rollup never lose an update
+        upsert = UPSERT_INSERTS[db.get_bind().dialect.name]
+        rollups = [
+            {
+                "model_id": key[0],
+                "granularity": key[1],
+                "bucket_start": key[2],
+                "provider_id": delta.providers[key[0]],
+                **dict(zip(ROLLUP_COUNTERS, totals)),
+            }
+            for key, totals in delta.counters.items()
+        ]
+        for start in range(0, len(rollups), UPSERT_BATCH_SIZE):
+            stmt = upsert(UsageRollup).values(rollups[start:start + UPSERT_BATCH_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[
+                    UsageRollup.model_id,
+                    UsageRollup.granularity,
+                    UsageRollup.bucket_start,
+                ],
+                set_={
+                    counter: getattr(UsageRollup, counter) + stmt.excluded[counter]
+                    for counter in ROLLUP_COUNTERS
+                },
+            )
+            await db.execute(stmt)
+
+        latencies = [
+            {
+                "model_id": model_id,
+                "granularity": granularity,
+                "bucket_start": start,
+                "bucket": bucket,
+                "provider_id": delta.providers[model_id],
+                "count": count,
+            }
+            for (model_id, granularity, start, bucket), count in delta.latencies.items()
+        ]
+        for start in range(0, len(latencies), UPSERT_BATCH_SIZE):
+            stmt = upsert(UsageLatencyBucket).values(latencies[start:start + UPSERT_BATCH_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[
+                    UsageLatencyBucket.model_id,
+                    UsageLatencyBucket.granularity,
+                    UsageLatencyBucket.bucket_start,
+                    UsageLatencyBucket.bucket,
+                ],
+                set_={"count": UsageLatencyBucket.count + stmt.excluded.count}
+            )
+            await db.execute(stmt)
+
+    async def rebuild(self, db: AsyncSession, since: Optional[datetime] = None) -> Tuple[int, int]:
+        """
+        Recompute every rollup from ``since`` (rounded down to the start of
+        its day; all of history when ``None``) from the stored trace
+        metrics, in one transaction. Returns the number of traces read and
+        of rollups written.
+
+        Traces are not recorded while this runs: otherwise a trace recorded
+        after its metrics were read would have its rollup increments deleted
+        with the old rollups and be missing from the new ones.
+        """
+        if db.get_bind().dialect.name == "postgresql":
+            # Waits for transactions recording traces, blocks new ones
+            await db.execute(text("LOCK TABLE trace_metrics IN SHARE MODE"))
+        if since is not None:
+            since = bucket_start(since, GRANULARITIES["day"])
+        # Deleting first also takes SQLite's write lock before the read
+        for entity in (UsageRollup, UsageLatencyBucket):
+            stmt = delete(entity)
+            if since is not None:
+                stmt = stmt.filter(entity.bucket_start >= since)
+            await db.execute(stmt)
+
+        stmt = select(*TraceMetrics.__table__.columns)
+        if since is not None:
+            stmt = stmt.filter(TraceMetrics.completed_at >= since)
+        delta = RollupDelta()
+        traces = 0
+        async for rows in stream_rows(db, stmt, BACKFILL_BATCH_SIZE):
+            delta.add_arrays(rows)
+            traces += len(rows)
+
+        await self._apply(db, delta)
+        await db.commit()
+        return traces, len(delta.counters)
+
+    async def get_rollups(
+        self,
+        db: AsyncSession,
+        granularity: str,
+        start: datetime,
+        end: datetime,
+        group_by: str = "model",
+        model_id: Optional[UUID] = None,
+        provider_id: Optional[UUID] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Usage per time bucket in ``[start, end)``, per model, per provider
+        or in total (``group_by``), with p50/p95/p99 latency from the merged
+        sketches of the rollups summed up.
+        """
+        buckets = []
+        for entity in (UsageRollup, UsageLatencyBucket):
+            dimensions = [entity.bucket_start]
+            if group_by in ("model", "provider"):
+                dimensions.append(entity.provider_id)
+            if group_by == "model":
+                dimensions.append(entity.model_id)
+            filters = [
+                entity.granularity == granularity,
+                entity.bucket_start >= as_utc(start),
+                entity.bucket_start < as_utc(end),
+            ]
+            if model_id is not None:
+                filters.append(entity.model_id == model_id)
+            if provider_id is not None:
+                filters.append(entity.provider_id == provider_id)
+            buckets.append((dimensions, filters))
+
+        (dimensions, filters), (latency_dimensions, latency_filters) = buckets
+        totals = await db.execute(
+            select(
+                *dimensions,
+                *(
+                    func.sum(getattr(UsageRollup, counter)).label(counter)
+                    for counter in ROLLUP_COUNTERS
+                )
+            )
+            .filter(*filters)
+            .group_by(*dimensions)
+            .order_by(*dimensions)
+        )
+        # Both queries name their dimension columns alike
+        names = [dimension.key for dimension in dimensions]
+        sketches: Dict[tuple, LatencySketch] = {}
+        for row in await db.execute(
+            select(
+                *latency_dimensions,
+                UsageLatencyBucket.bucket,
+                func.sum(UsageLatencyBucket.count).label("count"),
+            )
+            .filter(*latency_filters)
+            .group_by(*latency_dimensions, UsageLatencyBucket.bucket)
+        ):
+            key = tuple(getattr(row, name) for name in names)
+            sketches.setdefault(key, LatencySketch()).add_count(row.bucket, int(row.count))
+
+        result = []
+        for row in totals:
+            values = row._asdict()
+            sketch = sketches.get(tuple(values[name] for name in names), LatencySketch())
+            result.append({
+                **values,
+                "avg_duration_ms": (
+                    values["duration_ms"] / values["requests"] if values["requests"] else None
+                ),
+                "p50_ms": sketch.quantile(0.5),
+                "p95_ms": sketch.quantile(0.95),
+                "p99_ms": sketch.quantile(0.99),
+            })
+        return result
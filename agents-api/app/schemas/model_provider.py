@@ -1,7 +1,17 @@
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 from uuid import UUID
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+
+def reject_null(value):
+    """
+    For update fields whose column is NOT NULL: they may be left out, but
+    not set to null.
+    """
+    if value is None:
+        raise ValueError("may not be null")
+    return value
 
 
 class ModelBase(BaseModel):
@@ -27,6 +37,35 @@ class ModelUpdate(BaseModel):
     is_active: Optional[bool] = None
     default_parameters: Optional[Dict[str, Any]] = None
 
+    _not_null = field_validator("name", "display_name", "model_type", "is_active")(reject_null)
+
+
+class ModelBulkUpsert(BaseModel):
+    models: List[ModelBase] = Field(..., min_length=1, max_length=5000)
+
+
+class ModelUpsertResult(BaseModel):
+    id: UUID
+    name: str
+    status: Literal["created", "updated", "unchanged"]
+
+
+class ModelBulkUpsertResult(BaseModel):
+    created: int
+    updated: int
+    unchanged: int
+    results: List[ModelUpsertResult]
+
+
+class BulkSelection(BaseModel):
+    # Restrict a bulk operation to these ids; combined with any filter_*
+    # query parameters
+    ids: Optional[List[UUID]] = Field(None, max_length=10000)
+
+
+class BulkOperationResult(BaseModel):
+    count: int
+
 
 class ModelInDBBase(ModelBase):
     id: UUID
@@ -34,8 +73,7 @@ class ModelInDBBase(ModelBase):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class Model(ModelInDBBase):
@@ -67,14 +105,15 @@ class ModelProviderUpdate(BaseModel):
     api_key_env_var: Optional[str] = None
     is_active: Optional[bool] = None
 
+    _not_null = field_validator("name", "display_name", "is_active")(reject_null)
+
 
 class ModelProviderInDBBase(ModelProviderBase):
     id: UUID
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ModelProvider(ModelProviderInDBBase):
@@ -86,4 +125,32 @@ class ModelProviderInDB(ModelProviderInDBBase):
 
 
 class ModelProviderWithModels(ModelProviderInDBBase):
-    models: List[Model] = []
\ No newline at end of file
+    models: List[Model] = []
+
+
+class CatalogVersion(BaseModel):
+    provider_count: int
+    model_count: int
+    last_modified: Optional[datetime] = None
+
+
+class ModelProviderSearchHit(ModelProviderInDBBase):
+    score: float
+
+
+class ModelSearchHit(ModelInDBBase):
+    provider_name: str
+    score: float
+
+
+class CatalogBatch(BaseModel):
+    # Rows carry only the requested fields, in the order their ids were given
+    providers: List[Dict[str, Any]]
+    models: List[Dict[str, Any]]
+    missing_provider_ids: List[UUID]
+    missing_model_ids: List[UUID]
+
+
+class CatalogSearchResult(BaseModel):
+    providers: List[ModelProviderSearchHit]
+    models: List[ModelSearchHit]
@@ -0,0 +1,12 @@
+from typing import Generic, List, Optional, TypeVar
+from pydantic import BaseModel, ConfigDict
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+    model_config = ConfigDict(from_attributes=True)
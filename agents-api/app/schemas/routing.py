@@ -0,0 +1,41 @@
+from typing import Any, Dict, Optional
+from uuid import UUID
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class ModelRouteScore(BaseModel):
+    model_id: UUID
+    provider_id: UUID
+    name: str
+    latency_ms: Optional[float] = None
+    error_rate: float
+    requests: int
+    failures: int
+    in_flight: int
+    healthy: bool
+    score: Optional[float] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class RoutedRequest(BaseModel):
+    # Logical model name; any active model of the type when omitted
+    name: Optional[str] = None
+    # OpenAI-style request body; "model" is filled in per candidate
+    payload: Dict[str, Any]
+    # Smallest context window a candidate needs; estimated from the
+    # payload's messages and max_tokens when omitted
+    min_context_window: Optional[int] = Field(None, ge=0)
+    hedge: bool = True
+    # Serve and store the answer in the completion cache
+    cache: bool = True
+
+
+class RoutedResult(BaseModel):
+    model_id: UUID
+    provider_id: UUID
+    latency_ms: float
+    attempts: int
+    hedged: bool
+    cached: bool = False
+    response: Dict[str, Any]
@@ -0,0 +1,40 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+from pydantic import BaseModel, ConfigDict, Field
+
+# Events accepted per ingestion request
+MAX_EVENTS_PER_REQUEST = 10000
+
+
+class TraceEventCreate(BaseModel):
+    id: Optional[str] = Field(None, max_length=64)
+    # message | tool_call | handoff | error
+    type: str = Field(..., max_length=32)
+    timestamp: datetime
+    data: Dict[str, Any] = {}
+
+
+class TraceEventBatch(BaseModel):
+    events: List[TraceEventCreate] = Field(..., min_length=1, max_length=MAX_EVENTS_PER_REQUEST)
+
+
+class TraceEventsAccepted(BaseModel):
+    accepted: int
+
+
+class TraceEvent(BaseModel):
+    # The producer's event id; ``seq`` orders events of equal timestamp
+    id: Optional[str] = Field(None, validation_alias="event_id")
+    seq: int = Field(..., validation_alias="id")
+    type: str
+    timestamp: datetime
+    data: Optional[Dict[str, Any]] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class TraceSpan(BaseModel):
+    trace_id: UUID
+    start: datetime
+    end: datetime
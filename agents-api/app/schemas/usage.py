@@ -0,0 +1,62 @@
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class TokenUsage(BaseModel):
+    prompt_tokens: int = Field(0, ge=0)
+    completion_tokens: int = Field(0, ge=0)
+    total_tokens: Optional[int] = Field(None, ge=0)
+
+
+class TraceMetricsCreate(BaseModel):
+    # The ``metrics`` object of a completed trace
+    model_id: UUID
+    completed_at: Optional[datetime] = None
+    total_duration_ms: float = Field(..., ge=0)
+    token_usage: TokenUsage = TokenUsage()
+    cost: float = Field(0.0, ge=0)
+
+
+class TraceMetrics(BaseModel):
+    trace_id: UUID
+    model_id: UUID
+    provider_id: UUID
+    completed_at: datetime
+    duration_ms: float
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    cost: float
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class TraceMetricsRecorded(TraceMetrics):
+    # False when the trace's completion had been recorded before
+    recorded: bool
+
+
+class UsageBucket(BaseModel):
+    bucket_start: datetime
+    # Set when grouped by model, or by model or provider
+    model_id: Optional[UUID] = None
+    provider_id: Optional[UUID] = None
+    requests: int
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    cost: float
+    duration_ms: float
+    avg_duration_ms: Optional[float] = None
+    # Within 1% of the exact latency quantiles
+    p50_ms: Optional[float] = None
+    p95_ms: Optional[float] = None
+    p99_ms: Optional[float] = None
+
+
+class UsageRebuildResult(BaseModel):
+    since: Optional[datetime] = None
+    traces: int
+    rollups: int
@@ -0,0 +1,535 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from app.utils.lazy import lazy_import
+
+redis_module = lazy_import("redis")
+
+logger = logging.getLogger(__name__)
+
+# Sent before the first event: how long an EventSource waits before it
+# reconnects, e.g. after being dropped for falling behind
+RECONNECT_MS = 1000
+KEEP_ALIVE = b": keep-alive\n\n"
+
+# A message of the bridge is the event's sequence number, a newline and its
+# SSE frame; an empty frame ends the execution's stream
+Deliver = Callable[[str, int, bytes], None]
+
+
+class StreamError(Exception):
+    pass
+
+
+class ProducerConflictError(StreamError):
+    """
+    Another producer is already publishing the events of this execution.
+    """
+
+
+def encode_event(seq: int, type_: str, data: Any) -> bytes:
+    # JSON escapes newlines, so the payload is always a single data line
+    payload = json.dumps(data, default=str, separators=(",", ":"))
+    return f"id: {seq}\nevent: {type_}\ndata: {payload}\n\n".encode()
+
+
+def encode_message(seq: int, frame: bytes) -> bytes:
+    return b"%d\n%s" % (seq, frame)
+
+
+def decode_message(message: bytes) -> Tuple[int, bytes]:
+    seq, frame = message.split(b"\n", 1)
+    return int(seq), frame
+
+
+class LocalBridge:
+    """
+    In-process stand-in for :class:`RedisBridge`: hubs sharing one instance
+    behave like workers sharing one Redis.
+    """
+
+    def __init__(self, history_size: int = 1000):
+        self.history_size = history_size
+        self.histories: Dict[str, Deque[bytes]] = {}
+        self.owners: Dict[str, str] = {}
+        self.listeners: List[Deliver] = []
+
+    async def claim(self, execution_id: str, owner: str) -> bool:
+        return self.owners.setdefault(execution_id, owner) == owner
+
+    async def release(self, execution_id: str, owner: str):
+        if self.owners.get(execution_id) == owner:
+            del self.owners[execution_id]
+
+    async def publish(self, execution_id: str, seq: int, frame: bytes):
+        message = encode_message(seq, frame)
+        self.histories.setdefault(execution_id, deque(maxlen=self.history_size)).append(message)
+        for deliver in list(self.listeners):
+            deliver(execution_id, *decode_message(message))
+
+    async def history(self, execution_id: str) -> List[Tuple[int, bytes]]:
+        return [decode_message(message) for message in self.histories.get(execution_id, ())]
+
+    async def exists(self, execution_id: str) -> bool:
+        return execution_id in self.histories or execution_id in self.owners
+
+    async def listen(self, deliver: Deliver, resync: Callable[[], Awaitable[None]]):
+        self.listeners.append(deliver)
+        try:
+            await resync()
+            await asyncio.Event().wait()
+        finally:
+            self.listeners.remove(deliver)
+
+
+class RedisBridge:
+    """
+    Carries execution events between workers: every event is published on
+    ``executions:<id>`` and appended to a capped list that workers replay
+    from when their first viewer of an execution connects.
+    """
+
+    prefix = "executions"
+
+    def __init__(
+        self, redis, history_size: int = 1000, retention: float = 300.0, claim_ttl: float = 3600.0
+    ):
+        self.redis = redis
+        self.history_size = history_size
+        self.retention = retention
+        self.claim_ttl = claim_ttl
+        self.errors = 0
+
+    async def claim(self, execution_id: str, owner: str) -> bool:
+        key = f"{self.prefix}:{execution_id}:producer"
+        if await self.redis.set(key, owner, nx=True, ex=int(self.claim_ttl)):
+            return True
+        return (await self.redis.get(key)) == owner.encode()
+
+    async def release(self, execution_id: str, owner: str):
+        key = f"{self.prefix}:{execution_id}:producer"
+        if (await self.redis.get(key)) == owner.encode():
+            await self.redis.delete(key)
+
+    async def publish(self, execution_id: str, seq: int, frame: bytes):
+        message = encode_message(seq, frame)
+        history = f"{self.prefix}:{execution_id}:history"
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(history, message)
+            pipe.ltrim(history, -self.history_size, -1)
+            pipe.expire(history, int(self.retention))
+            pipe.expire(f"{self.prefix}:{execution_id}:producer", int(self.claim_ttl))
+            pipe.publish(f"{self.prefix}:{execution_id}", message)
+            await pipe.execute()
+
+    async def history(self, execution_id: str) -> List[Tuple[int, bytes]]:
+        messages = await self.redis.lrange(f"{self.prefix}:{execution_id}:history", 0, -1)
+        return [decode_message(message) for message in messages]
+
+    async def exists(self, execution_id: str) -> bool:
+        keys = (f"{self.prefix}:{execution_id}:history", f"{self.prefix}:{execution_id}:producer")
+        return await self.redis.exists(*keys) > 0
+
+    async def listen(self, deliver: Deliver, resync: Callable[[], Awaitable[None]]):
+        """
+        Deliver the events of every execution published by any worker.
+        Runs until cancelled; after a reconnect ``resync`` catches up on
+        what was missed from the histories.
+        """
+        pattern = f"{self.prefix}:*"
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.psubscribe(pattern)
+                    await resync()
+                    async for message in pubsub.listen():
+                        if message["type"] != "pmessage":
+                            continue
+                        channel = message["channel"]
+                        if isinstance(channel, bytes):
+                            channel = channel.decode()
+                        deliver(channel[len(self.prefix) + 1:], *decode_message(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except redis_module.RedisError:
+                self.errors += 1
+                logger.warning("Execution streams: Redis listener failed, retrying", exc_info=True)
+                await asyncio.sleep(1)
+
+
+class Subscriber:
+    """
+    One SSE connection: the frames published since it last read, up to
+    ``max_pending`` of them.
+    """
+
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self.pending: Deque[bytes] = deque()
+        self.wakeup = asyncio.Event()
+        self.dropped = False
+        self.finished = False
+
+    def push(self, frame: bytes) -> bool:
+        if len(self.pending) >= self.max_pending:
+            self.dropped = True
+            self.wakeup.set()
+            return False
+        self.pending.append(frame)
+        self.wakeup.set()
+        return True
+
+    def finish(self):
+        self.finished = True
+        self.wakeup.set()
+
+
+class ExecutionChannel:
+    def __init__(self, buffer_size: int):
+        # The latest events, for viewers that join late or reconnect
+        self.buffer: Deque[Tuple[int, bytes]] = deque(maxlen=buffer_size)
+        self.last_seq = 0
+        self.subscribers: Set[Subscriber] = set()
+        self.producing = False
+        self.ended = False
+        # Set once the buffer holds the bridge's history
+        self.ready: Optional[asyncio.Event] = None
+
+    def merge(self, events: List[Tuple[int, bytes]]):
+        merged = dict(self.buffer)
+        merged.update(events)
+        self.buffer = deque(sorted(merged.items()), maxlen=self.buffer.maxlen)
+        if self.buffer:
+            self.last_seq = self.buffer[-1][0]
+            self.ended = not self.buffer[-1][1]
+
+
+class ExecutionPublisher:
+    """
+    The single producer of an execution's events; see
+    :meth:`ExecutionStreamHub.open`.
+    """
+
+    def __init__(self, hub: "ExecutionStreamHub", execution_id: str, owner: str, seq: int):
+        self.hub = hub
+        self.execution_id = execution_id
+        self.owner = owner
+        self.seq = seq
+        self.closed = False
+
+    async def send(self, type_: str, data: Any = None) -> int:
+        """
+        Publish an event to every viewer of the execution; returns its id.
+        Never waits for viewers.
+        """
+        if self.closed:
+            raise StreamError("Publisher is closed")
+        self.seq += 1
+        await self.hub._publish(self.execution_id, self.seq, encode_event(self.seq, type_, data))
+        return self.seq
+
+    async def close(self):
+        """
+        End the execution's stream: viewers get the remaining events and
+        are disconnected.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.seq += 1
+        try:
+            await self.hub._publish(self.execution_id, self.seq, b"")
+        finally:
+            await self.hub._release(self.execution_id, self.owner)
+
+    async def __aenter__(self) -> "ExecutionPublisher":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+class ExecutionStreamHub:
+    """
+    Fans the events of each execution out to any number of SSE viewers.
+
+    Each execution has one producer (:meth:`open`) whose events are encoded
+    once and appended to a ring buffer of the latest ``buffer_size`` events
+    and to every viewer's queue, so the cost of an event does not depend on
+    how many tabs watch it. A viewer that reconnects with ``Last-Event-ID``
+    is first sent the buffered events after that id. Publishing never waits
+    for viewers: one with ``max_pending`` events unread is disconnected, and
+    its EventSource reconnects and resumes from the buffer.
+
+    With a ``bridge`` events go through it (Redis pub/sub between workers),
+    so viewers on any worker see the events of a producer on any other.
+    Finished executions are kept for ``retention`` seconds for late
+    viewers. A viewer that gets no event for ``idle_timeout`` seconds is
+    disconnected, so the streams of a producer that died do not stay open
+    forever.
+    """
+
+    def __init__(
+        self,
+        bridge=None,
+        buffer_size: int = 1000,
+        max_pending: int = 256,
+        retention: float = 300.0,
+        keep_alive_interval: float = 15.0,
+        idle_timeout: float = 300.0
+    ):
+        self.bridge = bridge
+        self.buffer_size = buffer_size
+        self.max_pending = max_pending
+        self.retention = retention
+        self.keep_alive_interval = keep_alive_interval
+        self.idle_timeout = idle_timeout
+        self.channels: Dict[str, ExecutionChannel] = {}
+        # Executions whose stream ended, by when; oldest first
+        self.ended: "OrderedDict[str, float]" = OrderedDict()
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.replayed = 0
+
+    @classmethod
+    def from_env(cls) -> "ExecutionStreamHub":
+        buffer_size = int(os.getenv("EXECUTION_STREAM_BUFFER", "1000"))
+        retention = float(os.getenv("EXECUTION_STREAM_RETENTION", "300"))
+        bridge = None
+        redis_url = os.getenv("REDIS_URL")
+        if redis_url:
+            from redis.asyncio import Redis
+            bridge = RedisBridge(
+                Redis.from_url(redis_url), history_size=buffer_size, retention=retention
+            )
+        return cls(
+            bridge=bridge,
+            buffer_size=buffer_size,
+            max_pending=int(os.getenv("EXECUTION_STREAM_MAX_PENDING", "256")),
+            retention=retention,
+            idle_timeout=float(os.getenv("EXECUTION_STREAM_IDLE_TIMEOUT", "300")),
+        )
+
+    async def open(self, execution_id: str) -> ExecutionPublisher:
+        """
+        Become the producer of an execution's events. Raises
+        :class:`ProducerConflictError` while another producer, on any
+        worker, has it open.
+        """
+        channel = self._channel(execution_id)
+        owner = uuid.uuid4().hex
+        if channel.producing:
+            raise ProducerConflictError(f"Execution {execution_id} already has a producer")
+        channel.producing = True
+        if self.bridge is not None:
+            try:
+                claimed = await self.bridge.claim(execution_id, owner)
+                if claimed:
+                    await self._load(execution_id, channel)
+            except BaseException:
+                channel.producing = False
+                raise
+            if not claimed:
+                channel.producing = False
+                self._evict(execution_id)
+                raise ProducerConflictError(f"Execution {execution_id} already has a producer")
+        channel.ended = False
+        self.ended.pop(execution_id, None)
+        return ExecutionPublisher(self, execution_id, owner, channel.last_seq)
+
+    async def _release(self, execution_id: str, owner: str):
+        channel = self.channels.get(execution_id)
+        if channel is not None:
+            channel.producing = False
+        if self.bridge is not None:
+            await self.bridge.release(execution_id, owner)
+        self._evict(execution_id)
+
+    async def _publish(self, execution_id: str, seq: int, frame: bytes):
+        self.published += 1
+        if self.bridge is not None:
+            # Delivered here, as on every worker, by the bridge
+            await self.bridge.publish(execution_id, seq, frame)
+        else:
+            self._deliver(execution_id, seq, frame)
+
+    def _deliver(self, execution_id: str, seq: int, frame: bytes):
+        channel = self.channels.get(execution_id)
+        # Duplicates come from a history replayed after a reconnect
+        if channel is None or seq <= channel.last_seq:
+            return
+        channel.last_seq = seq
+        channel.buffer.append((seq, frame))
+        if not frame:
+            channel.ended = True
+            self.ended[execution_id] = time.monotonic()
+            for subscriber in channel.subscribers:
+                subscriber.finish()
+            channel.subscribers.clear()
+            return
+        for subscriber in list(channel.subscribers):
+            if subscriber.push(frame):
+                self.delivered += 1
+            else:
+                channel.subscribers.discard(subscriber)
+                self.dropped += 1
+
+    def _channel(self, execution_id: str) -> ExecutionChannel:
+        self._sweep()
+        channel = self.channels.get(execution_id)
+        if channel is None:
+            channel = self.channels[execution_id] = ExecutionChannel(self.buffer_size)
+        return channel
+
+    def _sweep(self):
+        deadline = time.monotonic() - self.retention
+        while self.ended:
+            execution_id, ended_at = next(iter(self.ended.items()))
+            if ended_at > deadline:
+                break
+            del self.ended[execution_id]
+            channel = self.channels.get(execution_id)
+            if (
+                channel is not None
+                and channel.ended
+                and not channel.subscribers
+                and not channel.producing
+            ):
+                del self.channels[execution_id]
+
+    def _evict(self, execution_id: str):
+        channel = self.channels.get(execution_id)
+        if channel is None or channel.subscribers or channel.producing:
+            return
+        if self.bridge is not None:
+            # A worker only keeps the executions its viewers or producers
+            # use; their history stays in the bridge
+            if channel.ready is None or not channel.ready.is_set():
+                return
+        elif channel.buffer:
+            # Kept for late viewers until the retention expires
+            return
+        del self.channels[execution_id]
+        self.ended.pop(execution_id, None)
+
+    async def _load(self, execution_id: str, channel: ExecutionChannel):
+        if channel.ready is None:
+            channel.ready = asyncio.Event()
+            try:
+                channel.merge(await self.bridge.history(execution_id))
+            finally:
+                channel.ready.set()
+            if channel.ended:
+                self.ended.setdefault(execution_id, time.monotonic())
+        await channel.ready.wait()
+
+    async def resync(self):
+        """
+        Catch up on events published while the bridge was disconnected.
+        """
+        for execution_id, channel in list(self.channels.items()):
+            if channel.ready is None or not channel.ready.is_set():
+                continue
+            for seq, frame in await self.bridge.history(execution_id):
+                self._deliver(execution_id, seq, frame)
+
+    async def listen(self):
+        """
+        Receive events from the bridge; runs until cancelled, meant to be
+        started as a background task.
+        """
+        if self.bridge is None:
+            return
+        await self.bridge.listen(self._deliver, self.resync)
+
+    async def exists(self, execution_id: str) -> bool:
+        """
+        Whether the execution has a producer or buffered events, here or
+        (with a bridge) on any worker.
+        """
+        channel = self.channels.get(execution_id)
+        if channel is not None and (channel.producing or channel.buffer):
+            return True
+        return self.bridge is not None and await self.bridge.exists(execution_id)
+
+    async def subscribe(
+        self, execution_id: str, last_event_id: Optional[int] = None
+    ) -> Tuple[Subscriber, List[bytes]]:
+        """
+        Register a viewer; returns it with the buffered frames after
+        ``last_event_id`` (all buffered frames when ``None``) to send first.
+        """
+        channel = self._channel(execution_id)
+        if self.bridge is not None:
+            await self._load(execution_id, channel)
+        subscriber = Subscriber(self.max_pending)
+        after = last_event_id if last_event_id is not None else 0
+        replay = [frame for seq, frame in channel.buffer if seq > after and frame]
+        self.replayed += len(replay)
+        if channel.ended:
+            subscriber.finish()
+        else:
+            channel.subscribers.add(subscriber)
+        return subscriber, replay
+
+    def unsubscribe(self, execution_id: str, subscriber: Subscriber):
+        channel = self.channels.get(execution_id)
+        if channel is not None:
+            channel.subscribers.discard(subscriber)
+        self._evict(execution_id)
+
+    async def stream(
+        self, execution_id: str, last_event_id: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        The SSE body of one viewer, until the execution ends, the viewer
+        disconnects, it is dropped for falling behind or nothing happened
+        for ``idle_timeout`` seconds.
+        """
+        subscriber, replay = await self.subscribe(execution_id, last_event_id)
+        try:
+            yield b"retry: %d\n\n%s" % (RECONNECT_MS, b"".join(replay))
+            last_event = time.monotonic()
+            while True:
+                if subscriber.pending:
+                    frames = b"".join(subscriber.pending)
+                    subscriber.pending.clear()
+                    last_event = time.monotonic()
+                    yield frames
+                    continue
+                if subscriber.finished or subscriber.dropped:
+                    return
+                idle = time.monotonic() - last_event
+                if idle >= self.idle_timeout:
+                    return
+                subscriber.wakeup.clear()
+                try:
+                    await asyncio.wait_for(
+                        subscriber.wakeup.wait(),
+                        min(self.keep_alive_interval, self.idle_timeout - idle),
+                    )
+                except asyncio.TimeoutError:
+                    yield KEEP_ALIVE
+        finally:
+            self.unsubscribe(execution_id, subscriber)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "executions": len(self.channels),
+            "producers": sum(channel.producing for channel in self.channels.values()),
+            "subscribers": sum(len(channel.subscribers) for channel in self.channels.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "replayed": self.replayed,
+        }
+
+
+execution_hub = ExecutionStreamHub.from_env()
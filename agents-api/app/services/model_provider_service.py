@@ -1,112 +1,397 @@
-from typing import List, Optional
+from typing import AsyncIterator, List, Mapping, Optional, Sequence, Tuple
 from uuid import UUID
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.repositories.model_provider_repository import ModelProviderRepository, ModelRepository
+from app.repositories.model_provider_repository import (
+    MODEL_EXPORT_FIELDS,
+    MODEL_COLUMNS,
+    MODEL_FILTERS,
+    PROVIDER_COLUMNS,
+    PROVIDER_EXPORT_FIELDS,
+    PROVIDER_FILTERS,
+    CatalogSearchRepository,
+    ModelProviderRepository,
+    ModelRepository
+)
+from app.utils.cache import CatalogCache, catalog_cache
+from app.utils.db import session_factory_of
+from app.utils.filtering import ListQuery, parse_fields
+from app.schemas.pagination import Page
 from app.schemas.model_provider import (
+    CatalogBatch,
+    CatalogSearchResult,
+    CatalogVersion,
+    ModelBase,
+    ModelUpsertResult,
     ModelProviderCreate, 
     ModelProviderUpdate, 
     ModelProvider, 
     ModelCreate, 
     ModelUpdate, 
     Model,
-    ModelProviderWithModels
+    ModelProviderWithModels,
+    ModelProviderSearchHit,
+    ModelSearchHit
 )
 
 
+def list_query_key(query: Optional[ListQuery]) -> str:
+    return query.key() if query is not None else ""
+
+
 class ModelProviderService:
-    def __init__(self):
+    export_fields = PROVIDER_EXPORT_FIELDS
+    filters = PROVIDER_FILTERS
+
+    def __init__(self, cache: Optional[CatalogCache] = None):
         self.repository = ModelProviderRepository()
         self.model_repository = ModelRepository()
+        self.cache = cache if cache is not None else catalog_cache
+
+    async def get(self, db: AsyncSession, id: UUID) -> Optional[ModelProvider]:
+        return await self.cache.get_or_load(
+            f"providers:{id}",
+            ModelProvider,
+            lambda session: self.repository.get(session, id),
+            session_factory_of(db)
+        )
+
+    async def get_by_name(self, db: AsyncSession, name: str) -> Optional[ModelProvider]:
+        return await self.repository.get_by_name(db, name)
+
+    async def get_catalog_version(self, db: AsyncSession) -> CatalogVersion:
+        return await self.cache.get_or_load(
+            "catalog-version",
+            CatalogVersion,
+            self.repository.get_catalog_version,
+            session_factory_of(db)
+        )
+
+    async def get_all(
+        self,
+        db: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        include_total: bool = False,
+        query: Optional[ListQuery] = None
+    ) -> Page[ModelProvider]:
+        return await self.cache.get_or_load(
+            f"providers:all:{cursor}:{limit}:{include_total}:{list_query_key(query)}",
+            Page[ModelProvider],
+            lambda session: self.repository.get_all(session, cursor, limit, include_total, query),
+            session_factory_of(db)
+        )
 
-    def get(self, db: Session, id: UUID) -> Optional[ModelProvider]:
-        return self.repository.get(db, id)
-
-    def get_by_name(self, db: Session, name: str) -> Optional[ModelProvider]:
-        return self.repository.get_by_name(db, name)
-
-    def get_all(self, db: Session, skip: int = 0, limit: int = 100) -> List[ModelProvider]:
-        return self.repository.get_all(db, skip, limit)
-
-    def get_active(self, db: Session, skip: int = 0, limit: int = 100) -> List[ModelProvider]:
-        return self.repository.get_active(db, skip, limit)
-
-    def create(self, db: Session, obj_in: ModelProviderCreate) -> ModelProvider:
-        return self.repository.create(db, obj_in)
-
-    def update(self, db: Session, id: UUID, obj_in: ModelProviderUpdate) -> ModelProvider:
-        db_obj = self.repository.get(db, id)
-        return self.repository.update(db, db_obj, obj_in)
-
-    def delete(self, db: Session, id: UUID) -> ModelProvider:
-        return self.repository.delete(db, id)
-
-    def get_with_models(self, db: Session, id: UUID) -> Optional[ModelProviderWithModels]:
-        provider = self.repository.get(db, id)
-        if not provider:
-            return None
-        
-        models = self.model_repository.get_by_provider(db, provider.id)
-        return ModelProviderWithModels(
-            id=provider.id,
-            name=provider.name,
-            display_name=provider.display_name,
-            description=provider.description,
-            api_base_url=provider.api_base_url,
-            api_key_env_var=provider.api_key_env_var,
-            is_active=provider.is_active,
-            created_at=provider.created_at,
-            updated_at=provider.updated_at,
-            models=models
+    async def get_active(
+        self,
+        db: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        include_total: bool = False,
+        query: Optional[ListQuery] = None
+    ) -> Page[ModelProvider]:
+        return await self.cache.get_or_load(
+            f"providers:active:{cursor}:{limit}:{include_total}:{list_query_key(query)}",
+            Page[ModelProvider],
+            lambda session: self.repository.get_active(
+                session, cursor, limit, include_total, query
+            ),
+            session_factory_of(db),
         )
 
-    def get_all_with_models(self, db: Session, skip: int = 0, limit: int = 100) -> List[ModelProviderWithModels]:
-        providers = self.repository.get_all(db, skip, limit)
-        result = []
-        
-        for provider in providers:
-            models = self.model_repository.get_by_provider(db, provider.id)
-            result.append(ModelProviderWithModels(
-                id=provider.id,
-                name=provider.name,
-                display_name=provider.display_name,
-                description=provider.description,
-                api_base_url=provider.api_base_url,
-                api_key_env_var=provider.api_key_env_var,
-                is_active=provider.is_active,
-                created_at=provider.created_at,
-                updated_at=provider.updated_at,
-                models=models
-            ))
-        
-        return result
+    def export(
+        self, db: AsyncSession, active_only: bool = False
+    ) -> AsyncIterator[Sequence[Mapping]]:
+        # Exports read straight from the database in batches and bypass the cache
+        return self.repository.export(db, active_only=active_only)
+
+    async def create(self, db: AsyncSession, obj_in: ModelProviderCreate) -> ModelProvider:
+        db_obj = await self.repository.create(db, obj_in)
+        await self.cache.invalidate()
+        return db_obj
+
+    async def update(
+        self, db: AsyncSession, id: UUID, obj_in: ModelProviderUpdate
+    ) -> Optional[ModelProvider]:
+        db_obj = await self.repository.update(db, id, obj_in)
+        if db_obj is not None:
+            await self.cache.invalidate()
+        return db_obj
+
+    async def delete(self, db: AsyncSession, id: UUID) -> Optional[ModelProvider]:
+        db_obj = await self.repository.delete(db, id)
+        if db_obj is not None:
+            await self.cache.invalidate()
+        return db_obj
+
+    async def bulk_deactivate(
+        self,
+        db: AsyncSession,
+        ids: Optional[Sequence[UUID]] = None,
+        query: Optional[ListQuery] = None,
+    ) -> int:
+        count = await self.repository.bulk_deactivate(db, ids, query)
+        if count:
+            await self.cache.invalidate()
+        return count
+
+    async def bulk_delete(
+        self,
+        db: AsyncSession,
+        ids: Optional[Sequence[UUID]] = None,
+        query: Optional[ListQuery] = None,
+    ) -> int:
+        count = await self.repository.bulk_delete(db, ids, query)
+        if count:
+            await self.cache.invalidate()
+        return count
+
+    async def get_with_models(
+        self, db: AsyncSession, id: UUID
+    ) -> Optional[ModelProviderWithModels]:
+        return await self.cache.get_or_load(
+            f"providers:with-models:{id}",
+            ModelProviderWithModels,
+            lambda session: self.repository.get_with_models(session, id),
+            session_factory_of(db)
+        )
+
+    async def get_all_with_models(
+        self,
+        db: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        include_total: bool = False,
+        query: Optional[ListQuery] = None
+    ) -> Page[ModelProviderWithModels]:
+        return await self.cache.get_or_load(
+            f"providers:all-with-models:{cursor}:{limit}:{include_total}:{list_query_key(query)}",
+            Page[ModelProviderWithModels],
+            lambda session: self.repository.get_all_with_models(
+                session, cursor, limit, include_total, query
+            ),
+            session_factory_of(db)
+        )
 
 
 class ModelService:
-    def __init__(self):
+    export_fields = MODEL_EXPORT_FIELDS
+    filters = MODEL_FILTERS
+
+    def __init__(self, cache: Optional[CatalogCache] = None):
         self.repository = ModelRepository()
+        self.cache = cache if cache is not None else catalog_cache
 
-    def get(self, db: Session, id: UUID) -> Optional[Model]:
-        return self.repository.get(db, id)
+    async def get(self, db: AsyncSession, id: UUID) -> Optional[Model]:
+        return await self.cache.get_or_load(
+            f"models:{id}",
+            Model,
+            lambda session: self.repository.get(session, id),
+            session_factory_of(db)
+        )
+
+    async def get_by_name_and_provider(
+        self, db: AsyncSession, name: str, provider_id: UUID
+    ) -> Optional[Model]:
+        return await self.repository.get_by_name_and_provider(db, name, provider_id)
+
+    async def get_all(
+        self,
+        db: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        include_total: bool = False,
+        query: Optional[ListQuery] = None
+    ) -> Page[Model]:
+        return await self.cache.get_or_load(
+            f"models:all:{cursor}:{limit}:{include_total}:{list_query_key(query)}",
+            Page[Model],
+            lambda session: self.repository.get_all(session, cursor, limit, include_total, query),
+            session_factory_of(db)
+        )
+
+    async def get_by_provider(
+        self,
+        db: AsyncSession,
+        provider_id: UUID,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        include_total: bool = False,
+        query: Optional[ListQuery] = None
+    ) -> Page[Model]:
+        return await self.cache.get_or_load(
+            f"models:provider:{provider_id}:{cursor}:{limit}:{include_total}:"
+            f"{list_query_key(query)}",
+            Page[Model],
+            lambda session: self.repository.get_by_provider(
+                session, provider_id, cursor, limit, include_total, query
+            ),
+            session_factory_of(db),
+        )
+
+    async def get_active(
+        self,
+        db: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        include_total: bool = False,
+        query: Optional[ListQuery] = None
+    ) -> Page[Model]:
+        return await self.cache.get_or_load(
+            f"models:active:{cursor}:{limit}:{include_total}:{list_query_key(query)}",
+            Page[Model],
+            lambda session: self.repository.get_active(
+                session, cursor, limit, include_total, query
+            ),
+            session_factory_of(db),
+        )
+
+    def export(
+        self, db: AsyncSession, provider_id: Optional[UUID] = None, active_only: bool = False
+    ) -> AsyncIterator[Sequence[Mapping]]:
+        return self.repository.export(db, provider_id=provider_id, active_only=active_only)
+
+    async def create(self, db: AsyncSession, obj_in: ModelCreate) -> Model:
+        db_obj = await self.repository.create(db, obj_in)
+        await self.cache.invalidate()
+        return db_obj
+
+    async def update(
+        self, db: AsyncSession, provider_id: UUID, id: UUID, obj_in: ModelUpdate
+    ) -> Optional[Model]:
+        db_obj = await self.repository.update(db, provider_id, id, obj_in)
+        if db_obj is not None:
+            await self.cache.invalidate()
+        return db_obj
+
+    async def delete(self, db: AsyncSession, provider_id: UUID, id: UUID) -> Optional[Model]:
+        db_obj = await self.repository.delete(db, provider_id, id)
+        if db_obj is not None:
+            await self.cache.invalidate()
+        return db_obj
 
-    def get_by_name_and_provider(self, db: Session, name: str, provider_id: UUID) -> Optional[Model]:
-        return self.repository.get_by_name_and_provider(db, name, provider_id)
+    async def bulk_deactivate(
+        self,
+        db: AsyncSession,
+        ids: Optional[Sequence[UUID]] = None,
+        query: Optional[ListQuery] = None,
+    ) -> int:
+        count = await self.repository.bulk_deactivate(db, ids, query)
+        if count:
+            await self.cache.invalidate()
+        return count
 
-    def get_all(self, db: Session, skip: int = 0, limit: int = 100) -> List[Model]:
-        return self.repository.get_all(db, skip, limit)
+    async def bulk_delete(
+        self,
+        db: AsyncSession,
+        ids: Optional[Sequence[UUID]] = None,
+        query: Optional[ListQuery] = None,
+    ) -> int:
+        count = await self.repository.bulk_delete(db, ids, query)
+        if count:
+            await self.cache.invalidate()
+        return count
 
-    def get_by_provider(self, db: Session, provider_id: UUID, skip: int = 0, limit: int = 100) -> List[Model]:
-        return self.repository.get_by_provider(db, provider_id, skip, limit)
+    async def bulk_upsert(
+        self, db: AsyncSession, provider_id: UUID, models_in: List[ModelBase]
+    ) -> List[ModelUpsertResult]:
+        results = await self.repository.bulk_upsert(db, provider_id, models_in)
+        if any(result.status != "unchanged" for result in results):
+            await self.cache.invalidate()
+        return results
 
-    def get_active(self, db: Session, skip: int = 0, limit: int = 100) -> List[Model]:
-        return self.repository.get_active(db, skip, limit)
 
-    def create(self, db: Session, obj_in: ModelCreate) -> Model:
-        return self.repository.create(db, obj_in)
+def in_requested_order(
+    rows: Sequence[Mapping], ids: Sequence[UUID]
+) -> Tuple[List[dict], List[UUID]]:
+    by_id = {row["id"]: row for row in rows}
+    return [dict(by_id[id]) for id in ids if id in by_id], [id for id in ids if id not in by_id]
 
-    def update(self, db: Session, id: UUID, obj_in: ModelUpdate) -> Model:
-        db_obj = self.repository.get(db, id)
-        return self.repository.update(db, db_obj, obj_in)
 
-    def delete(self, db: Session, id: UUID) -> Model:
-        return self.repository.delete(db, id)
\ No newline at end of file
+class CatalogBatchService:
+    def __init__(self):
+        self.provider_repository = ModelProviderRepository()
+        self.model_repository = ModelRepository()
+
+    async def get_many(
+        self,
+        db: AsyncSession,
+        provider_ids: Sequence[UUID] = (),
+        model_ids: Sequence[UUID] = (),
+        fields: Optional[str] = None
+    ) -> CatalogBatch:
+        """
+        Providers and models by id, one ``IN`` query per kind. ``fields``
+        names the columns to return; a field that only one kind has applies
+        to that kind only.
+        """
+        selected = parse_fields(fields, PROVIDER_COLUMNS.keys() | MODEL_COLUMNS.keys())
+        provider_ids = list(dict.fromkeys(provider_ids))
+        model_ids = list(dict.fromkeys(model_ids))
+        providers, missing_provider_ids = [], []
+        models, missing_model_ids = [], []
+        if provider_ids:
+            rows = await self.provider_repository.get_many(db, provider_ids, selected)
+            providers, missing_provider_ids = in_requested_order(rows, provider_ids)
+        if model_ids:
+            rows = await self.model_repository.get_many(db, model_ids, selected)
+            models, missing_model_ids = in_requested_order(rows, model_ids)
+        return CatalogBatch(
+            providers=providers,
+            models=models,
+            missing_provider_ids=missing_provider_ids,
+            missing_model_ids=missing_model_ids
+        )
+
+
+class CatalogSearchService:
+    def __init__(self, cache: Optional[CatalogCache] = None):
+        self.repository = CatalogSearchRepository()
+        self.provider_repository = ModelProviderRepository()
+        self.cache = cache if cache is not None else catalog_cache
+
+    async def search(
+        self,
+        db: AsyncSession,
+        q: str,
+        model_type: Optional[str] = None,
+        is_active: Optional[bool] = None,
+        min_context_window: Optional[int] = None,
+        max_context_window: Optional[int] = None,
+        limit: int = 20
+    ) -> CatalogSearchResult:
+        version = await self.cache.get_or_load(
+            "catalog-version",
+            CatalogVersion,
+            self.provider_repository.get_catalog_version,
+            session_factory_of(db)
+        )
+
+        async def load(session: AsyncSession) -> CatalogSearchResult:
+            providers, models = await self.repository.search(
+                session,
+                q,
+                version,
+                model_type=model_type,
+                is_active=is_active,
+                min_context_window=min_context_window,
+                max_context_window=max_context_window,
+                limit=limit
+            )
+            return CatalogSearchResult(
+                providers=[
+                    ModelProviderSearchHit.model_validate({**row, "score": score})
+                    for row, score in providers
+                ],
+                models=[
+                    ModelSearchHit.model_validate({**row, "score": score}) for row, score in models
+                ],
+            )
+
+        return await self.cache.get_or_load(
+            f"search:{q}:{model_type}:{is_active}:"
+            f"{min_context_window}:{max_context_window}:{limit}",
+            CatalogSearchResult,
+            load,
+            session_factory_of(db),
+        )
@@ -0,0 +1,398 @@
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.model_provider import Model
+from app.schemas.routing import RoutedResult
+from app.services.model_provider_service import ModelService
+from app.services.provider_clients import (
+    ProviderClientRegistry,
+    ProviderUnavailableError,
+    provider_clients,
+)
+from app.utils.completion_cache import (
+    CompletionCache, cache_enabled, cache_ttl, completion_cache, completion_key, merge_parameters
+)
+from app.utils.filtering import ListQuery
+from app.utils.lazy import lazy_import
+
+httpx = lazy_import("httpx")
+
+# OpenAI-compatible path per model type
+ENDPOINTS = {
+    "chat": "chat/completions",
+    "completion": "completions",
+    "embedding": "embeddings",
+}
+
+# Candidates considered per routed request
+MAX_CANDIDATES = 1000
+
+
+class RoutingError(Exception):
+    pass
+
+
+class NoCandidateError(RoutingError):
+    pass
+
+
+class UpstreamRejectedError(RoutingError):
+    """
+    The provider rejected the request itself (a 4xx other than 429); trying
+    another provider would not help.
+    """
+
+    def __init__(self, status_code: int, detail: Any):
+        super().__init__(f"Provider rejected the request with {status_code}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+class UpstreamError(RoutingError):
+    pass
+
+
+class ModelStats:
+    """
+    Exponentially weighted latency and error rate of one model (i.e. one
+    model at one provider), plus a circuit breaker: after
+    ``failure_threshold`` consecutive failures the model is skipped until
+    its cooldown has passed.
+    """
+
+    __slots__ = (
+        "model_id", "provider_id", "name", "latency", "error_rate", "requests", "failures",
+        "consecutive_failures", "in_flight", "open_until", "default_parameters"
+    )
+
+    def __init__(self, model: Model):
+        self.model_id = model.id
+        self.provider_id = model.provider_id
+        self.name = model.name
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.in_flight = 0
+        self.open_until = 0.0
+        self.default_parameters: Dict[str, Any] = model.default_parameters or {}
+
+
+def estimate_prompt_tokens(payload: Dict[str, Any]) -> int:
+    """
+    Rough token count of a request: about four characters per token of the
+    messages or prompt, plus the tokens it asks to generate.
+    """
+    characters = 0
+    for message in payload.get("messages") or ():
+        content = message.get("content") if isinstance(message, dict) else None
+        if isinstance(content, str):
+            characters += len(content)
+    prompt = payload.get("prompt") or payload.get("input")
+    if isinstance(prompt, str):
+        characters += len(prompt)
+    elif isinstance(prompt, list):
+        characters += sum(len(item) for item in prompt if isinstance(item, str))
+    return characters // 4 + int(payload.get("max_tokens") or 0)
+
+
+class ModelRouter:
+    """
+    Routes a request for a model type (optionally a logical model name) to
+    the fastest healthy active model whose context window fits it.
+
+    Candidates are ranked by EWMA latency, inflated by their EWMA error
+    rate; models without samples yet are tried first so that every
+    candidate gets measured. When the chosen model takes more than
+    ``hedge_factor`` times its usual latency, a hedged request goes to the
+    next candidate and the first answer wins. Failed attempts fail over to
+    the next candidate.
+
+    Requests are sent with the model's ``default_parameters`` merged in.
+    Unless a model opts out, its completions are cached under a hash of the
+    merged request, and a request whose best candidate has its answer cached
+    is served from the cache without any provider call.
+    """
+
+    def __init__(
+        self,
+        clients: Optional[ProviderClientRegistry] = None,
+        model_service: Optional[ModelService] = None,
+        alpha: float = 0.3,
+        error_penalty: float = 4.0,
+        failure_threshold: int = 3,
+        cooldown: float = 10.0,
+        hedge_factor: float = 2.0,
+        min_hedge_delay: float = 0.01,
+        clock: Callable[[], float] = time.monotonic,
+        response_cache: Optional[CompletionCache] = None
+    ):
+        self.clients = clients if clients is not None else provider_clients
+        self.model_service = model_service if model_service is not None else ModelService()
+        self.alpha = alpha
+        self.error_penalty = error_penalty
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.hedge_factor = hedge_factor
+        self.min_hedge_delay = min_hedge_delay
+        self.clock = clock
+        self.response_cache = response_cache if response_cache is not None else completion_cache
+        self.stats: Dict[UUID, ModelStats] = {}
+
+    def healthy(self, stats: ModelStats) -> bool:
+        return stats.open_until <= self.clock()
+
+    def score(self, stats: ModelStats) -> Optional[float]:
+        if stats.latency is None:
+            return None
+        return stats.latency * (1 + self.error_penalty * stats.error_rate)
+
+    def observe(self, stats: ModelStats, seconds: float, ok: bool):
+        stats.requests += 1
+        stats.latency = (
+            seconds
+            if stats.latency is None
+            else self.alpha * seconds + (1 - self.alpha) * stats.latency
+        )
+        stats.error_rate = (1 - self.alpha) * stats.error_rate + (0.0 if ok else self.alpha)
+        if ok:
+            stats.consecutive_failures = 0
+            return
+        stats.failures += 1
+        stats.consecutive_failures += 1
+        if stats.consecutive_failures >= self.failure_threshold:
+            # Skip it for a while; afterwards it is tried again and has to
+            # fail another ``failure_threshold`` times in a row to be skipped
+            stats.open_until = self.clock() + self.cooldown
+            stats.consecutive_failures = 0
+
+    async def candidates(
+        self,
+        db: AsyncSession,
+        model_type: str,
+        name: Optional[str] = None,
+        min_context_window: Optional[int] = None
+    ) -> List[ModelStats]:
+        """
+        Active models of active providers that fit the request (or whose
+        context window is unknown), best first. Models cooling down after
+        repeated failures come last.
+        """
+        filters = [("model_type", "eq", model_type), ("provider_is_active", "eq", True)]
+        if name is not None:
+            filters.append(("name", "eq", name))
+        # The context window is checked below rather than in the query: the
+        # query is cached, and the prompt size differs with every request
+        page = await self.model_service.get_active(
+            db, limit=MAX_CANDIDATES, query=ListQuery(filters, "created_at", False)
+        )
+
+        candidates = []
+        for model in page.items:
+            # A model without a context window may fit any request
+            if (
+                min_context_window
+                and model.context_window is not None
+                and model.context_window < min_context_window
+            ):
+                continue
+            stats = self.stats.get(model.id)
+            if stats is None:
+                stats = self.stats[model.id] = ModelStats(model)
+            stats.default_parameters = model.default_parameters or {}
+            candidates.append(stats)
+
+        def rank(stats: ModelStats):
+            score = self.score(stats)
+            return (
+                not self.healthy(stats),
+                score is not None,
+                score or 0.0,
+                stats.in_flight,
+                str(stats.model_id),
+            )
+
+        return sorted(candidates, key=rank)
+
+    def hedge_delay(self, stats: ModelStats) -> Optional[float]:
+        if stats.latency is None:
+            return None
+        return max(self.min_hedge_delay, self.hedge_factor * stats.latency)
+
+    def request_body(self, stats: ModelStats, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return {**merge_parameters(stats.default_parameters, payload), "model": stats.name}
+
+    async def _cached(self, stats: ModelStats, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if not cache_enabled(stats.default_parameters):
+            self.response_cache.record_bypass()
+            return None
+        return await self.response_cache.get(
+            completion_key(stats.model_id, self.request_body(stats, payload))
+        )
+
+    async def _attempt(
+        self, stats: ModelStats, client, path: str, payload: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        started = self.clock()
+        stats.in_flight += 1
+        # An attempt cancelled after losing a hedged race is not observed:
+        # its latency is unknown and it did not fail
+        try:
+            response = await client.request("POST", path, json=self.request_body(stats, payload))
+        except httpx.HTTPError as exc:
+            self.observe(stats, self.clock() - started, ok=False)
+            raise UpstreamError(f"{stats.name} at provider {stats.provider_id}: {exc!r}") from exc
+        finally:
+            stats.in_flight -= 1
+
+        elapsed = self.clock() - started
+        if response.status_code >= 500 or response.status_code == 429:
+            self.observe(stats, elapsed, ok=False)
+            raise UpstreamError(
+                f"{stats.name} at provider {stats.provider_id}: HTTP {response.status_code}"
+            )
+        if response.status_code >= 400:
+            self.observe(stats, elapsed, ok=True)
+            try:
+                detail = response.json()
+            except ValueError:
+                detail = response.text
+            raise UpstreamRejectedError(response.status_code, detail)
+        try:
+            body = response.json()
+        except ValueError as exc:
+            self.observe(stats, elapsed, ok=False)
+            raise UpstreamError(
+                f"{stats.name} at provider {stats.provider_id}: response is not JSON"
+            ) from exc
+        self.observe(stats, elapsed, ok=True)
+        return body
+
+    async def route(
+        self,
+        db: AsyncSession,
+        model_type: str,
+        payload: Dict[str, Any],
+        name: Optional[str] = None,
+        min_context_window: Optional[int] = None,
+        hedge: bool = True,
+        cache: bool = True
+    ) -> RoutedResult:
+        path = ENDPOINTS.get(model_type)
+        if path is None:
+            raise NoCandidateError(f"Cannot route '{model_type}' models")
+        if min_context_window is None:
+            min_context_window = estimate_prompt_tokens(payload)
+        remaining = await self.candidates(db, model_type, name, min_context_window)
+        if not remaining:
+            raise NoCandidateError(
+                f"No active '{model_type}' model fits {min_context_window} tokens"
+            )
+
+        started = self.clock()
+        cacheable = cache and not payload.get("stream")
+        if cacheable:
+            # One lookup per request, for the model it would be sent to
+            stats = remaining[0]
+            response = await self._cached(stats, payload)
+            if response is not None:
+                return RoutedResult(
+                    model_id=stats.model_id,
+                    provider_id=stats.provider_id,
+                    latency_ms=(self.clock() - started) * 1000,
+                    attempts=0,
+                    hedged=False,
+                    cached=True,
+                    response=response
+                )
+
+        pending: Dict[asyncio.Task, ModelStats] = {}
+        attempts = 0
+        hedged = False
+        errors = []
+
+        async def launch() -> bool:
+            nonlocal attempts
+            # Clients are looked up here, one at a time, as the session
+            # cannot be shared by concurrent attempts
+            while remaining:
+                stats = remaining.pop(0)
+                try:
+                    client = await self.clients.get(db, stats.provider_id)
+                except ProviderUnavailableError as exc:
+                    errors.append(exc)
+                    continue
+                attempts += 1
+                pending[asyncio.create_task(self._attempt(stats, client, path, payload))] = stats
+                return True
+            return False
+
+        try:
+            await launch()
+            while pending:
+                delay = None
+                if hedge and remaining and len(pending) == 1:
+                    delay = self.hedge_delay(next(iter(pending.values())))
+                done, _ = await asyncio.wait(
+                    pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedged = await launch() or hedged
+                    continue
+                for task in done:
+                    stats = pending.pop(task)
+                    try:
+                        response = task.result()
+                    except UpstreamError as exc:
+                        errors.append(exc)
+                        continue
+                    if cacheable and cache_enabled(stats.default_parameters):
+                        await self.response_cache.set(
+                            completion_key(stats.model_id, self.request_body(stats, payload)),
+                            response,
+                            cache_ttl(stats.default_parameters)
+                        )
+                    return RoutedResult(
+                        model_id=stats.model_id,
+                        provider_id=stats.provider_id,
+                        latency_ms=(self.clock() - started) * 1000,
+                        attempts=attempts,
+                        hedged=hedged,
+                        response=response
+                    )
+                if not pending:
+                    await launch()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        raise UpstreamError(
+            f"All {attempts} attempts failed: {'; '.join(str(error) for error in errors)}"
+        )
+
+    def describe(self, stats: ModelStats) -> Dict[str, Any]:
+        score = self.score(stats)
+        return {
+            "model_id": stats.model_id,
+            "provider_id": stats.provider_id,
+            "name": stats.name,
+            "latency_ms": stats.latency * 1000 if stats.latency is not None else None,
+            "error_rate": stats.error_rate,
+            "requests": stats.requests,
+            "failures": stats.failures,
+            "in_flight": stats.in_flight,
+            "healthy": self.healthy(stats),
+            "score": score * 1000 if score is not None else None,
+        }
+
+    def scores(self) -> List[Dict[str, Any]]:
+        return [self.describe(stats) for stats in self.stats.values()]
+
+
+model_router = ModelRouter()
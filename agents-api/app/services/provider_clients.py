@@ -0,0 +1,219 @@
+import asyncio
+import importlib.util
+import logging
+import os
+from typing import Any, Dict, Optional, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories.model_provider_repository import ModelProviderRepository
+from app.utils.cache import CatalogCache, catalog_cache
+from app.utils.lazy import lazy_import
+
+httpx = lazy_import("httpx")
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderUnavailableError(Exception):
+    pass
+
+
+class ClientSettings:
+    """
+    Connection settings of every provider client. ``max_concurrency`` caps
+    the requests in flight to one provider; callers over the cap wait for a
+    slot rather than opening more connections.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        max_concurrency: int = 64,
+        http2: bool = False,
+        timeout: float = 60.0,
+        connect_timeout: float = 5.0
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.max_concurrency = max_concurrency
+        self.http2 = http2
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+
+    @classmethod
+    def from_env(cls) -> "ClientSettings":
+        http2 = os.getenv("PROVIDER_HTTP2", "false").lower() in ("true", "1", "yes")
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning(
+                "PROVIDER_HTTP2 is set but the h2 package is not installed; using HTTP/1.1"
+            )
+            http2 = False
+        return cls(
+            max_connections=int(os.getenv("PROVIDER_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("PROVIDER_MAX_KEEPALIVE_CONNECTIONS", "20")),
+            keepalive_expiry=float(os.getenv("PROVIDER_KEEPALIVE_EXPIRY", "30")),
+            max_concurrency=int(os.getenv("PROVIDER_MAX_CONCURRENCY", "64")),
+            http2=http2,
+            timeout=float(os.getenv("PROVIDER_TIMEOUT", "60")),
+            connect_timeout=float(os.getenv("PROVIDER_CONNECT_TIMEOUT", "5")),
+        )
+
+
+class ProviderClient:
+    """
+    Long-lived HTTP client for one provider. Connections are kept alive and
+    reused across requests; the provider's API key, read from the
+    environment variable named by ``api_key_env_var``, is sent as a bearer
+    token.
+    """
+
+    def __init__(
+        self,
+        provider_id: UUID,
+        base_url: str,
+        api_key_env_var: Optional[str],
+        settings: ClientSettings
+    ):
+        self.provider_id = provider_id
+        self.endpoint: Tuple[str, Optional[str]] = (base_url, api_key_env_var)
+        headers = {}
+        api_key = os.getenv(api_key_env_var) if api_key_env_var else None
+        if api_key:
+            headers["Authorization"] = f"Bearer {api_key}"
+        self.http = httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            http2=settings.http2,
+            limits=httpx.Limits(
+                max_connections=settings.max_connections,
+                max_keepalive_connections=settings.max_keepalive_connections,
+                keepalive_expiry=settings.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(settings.timeout, connect=settings.connect_timeout),
+        )
+        self.semaphore = asyncio.Semaphore(settings.max_concurrency)
+        # Requests waiting for a slot or in flight, and those in flight
+        self.pending = 0
+        self.in_flight = 0
+        self.requests = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @property
+    def waiting(self) -> int:
+        return self.pending - self.in_flight
+
+    async def request(self, method: str, url: str, **kwargs) -> "httpx.Response":
+        self.pending += 1
+        self._idle.clear()
+        try:
+            async with self.semaphore:
+                self.in_flight += 1
+                self.requests += 1
+                try:
+                    return await self.http.request(method, url, **kwargs)
+                finally:
+                    self.in_flight -= 1
+        finally:
+            self.pending -= 1
+            if not self.pending:
+                self._idle.set()
+
+    async def post_json(self, url: str, payload: Any) -> Any:
+        response = await self.request("POST", url, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    async def aclose(self):
+        # Let requests already using the client finish first
+        await self._idle.wait()
+        await self.http.aclose()
+
+
+class ProviderClientRegistry:
+    """
+    One :class:`ProviderClient` per model provider, keyed by provider id.
+
+    A client is checked against its provider row again after any catalog
+    write (i.e. whenever the catalog cache generation moves, which includes
+    invalidations published by other workers). It is replaced when the base
+    URL or API key variable changed and dropped when the provider was
+    deactivated or deleted; otherwise it and its connections are kept.
+    Replaced clients are closed once their in-flight requests finish.
+    """
+
+    def __init__(
+        self, settings: Optional[ClientSettings] = None, cache: Optional[CatalogCache] = None
+    ):
+        self.settings = settings if settings is not None else ClientSettings.from_env()
+        self.cache = cache if cache is not None else catalog_cache
+        self.repository = ModelProviderRepository()
+        self._clients: Dict[UUID, ProviderClient] = {}
+        # Catalog cache generation each client was last checked at
+        self._checked: Dict[UUID, int] = {}
+        self._locks: Dict[UUID, asyncio.Lock] = {}
+        self._closing: Set[asyncio.Task] = set()
+        self.builds = 0
+
+    async def get(self, db: AsyncSession, provider_id: UUID) -> ProviderClient:
+        client = self._clients.get(provider_id)
+        if client is not None and self._checked.get(provider_id) == self.cache.generation:
+            return client
+
+        lock = self._locks.setdefault(provider_id, asyncio.Lock())
+        async with lock:
+            generation = self.cache.generation
+            client = self._clients.get(provider_id)
+            if client is not None and self._checked.get(provider_id) == generation:
+                return client
+
+            provider = await self.repository.get_endpoint(db, provider_id)
+            if provider is None or not provider.is_active or not provider.api_base_url:
+                self.discard(provider_id)
+                raise ProviderUnavailableError(
+                    f"Model provider {provider_id} is missing, inactive or has no API URL"
+                )
+
+            endpoint = (provider.api_base_url, provider.api_key_env_var)
+            if client is None or client.endpoint != endpoint:
+                self.discard(provider_id)
+                client = self._clients[provider_id] = ProviderClient(
+                    provider_id, *endpoint, self.settings
+                )
+                self.builds += 1
+            self._checked[provider_id] = generation
+            return client
+
+    def discard(self, provider_id: UUID):
+        """
+        Drop the provider's client, closing it in the background.
+        """
+        self._checked.pop(provider_id, None)
+        client = self._clients.pop(provider_id, None)
+        if client is not None:
+            task = asyncio.create_task(client.aclose())
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    async def aclose(self):
+        for provider_id in list(self._clients):
+            self.discard(provider_id)
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+
+    def gauges(self) -> Dict[str, Any]:
+        gauges = {}
+        for provider_id, client in self._clients.items():
+            labels = f'{{provider="{provider_id}"}}'
+            gauges[f"provider_client_in_flight{labels}"] = client.in_flight
+            gauges[f"provider_client_waiting{labels}"] = client.waiting
+            gauges[f"provider_client_requests{labels}"] = client.requests
+        return gauges
+
+
+provider_clients = ProviderClientRegistry()
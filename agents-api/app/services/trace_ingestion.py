@@ -0,0 +1,247 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence
+from uuid import UUID
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.models.trace import TraceEvent, as_utc
+from app.schemas.trace import TraceEventCreate
+from app.utils.db import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Column order of COPY rows
+COPY_COLUMNS = ("trace_id", "event_id", "type", "timestamp", "data")
+
+TRANSIENT_SQLSTATE_CLASSES = ("08", "40", "53", "57")
+
+
+class IngestionError(Exception):
+    pass
+
+
+class IngestionBackpressureError(IngestionError):
+    """
+    The queue stayed full for longer than the enqueue timeout; the caller
+    should retry later.
+    """
+
+
+class IngestionClosedError(IngestionError):
+    pass
+
+
+def is_transient(exc: BaseException) -> bool:
+    """
+    Whether writing a batch again may succeed: a lost connection, a pool
+    timeout or a deadlock may, rows the database rejects will not.
+    """
+    if isinstance(exc, DBAPIError):
+        if isinstance(exc, OperationalError) or exc.connection_invalidated:
+            return True
+        exc = exc.orig
+    if isinstance(exc, (PoolTimeoutError, OSError)):
+        return True
+    # Postgres errors (e.g. of the raw asyncpg COPY), by SQLSTATE class:
+    # connection exception, transaction rollback, insufficient resources
+    # and operator intervention (e.g. the server shutting down)
+    return str(getattr(exc, "sqlstate", None) or "")[:2] in TRANSIENT_SQLSTATE_CLASSES
+
+
+class TraceEventIngestor:
+    """
+    Buffers trace events in a bounded in-memory queue and writes them to
+    ``trace_events`` in batches from a single background task.
+
+    A batch is flushed once ``batch_size`` events are queued or
+    ``flush_interval`` seconds after the previous flush, whichever comes
+    first, as one COPY on asyncpg and one multi-row INSERT elsewhere. The
+    events of one :meth:`submit` are admitted together: while the queue has
+    no room for them the caller waits, for at most ``enqueue_timeout``
+    seconds, before :class:`IngestionBackpressureError` is raised. Batches
+    that fail for a transient reason are retried ``max_retries`` times,
+    with exponential backoff; any other failure drops them at once.
+    """
+
+    def __init__(
+        self,
+        session_factory: Optional[async_sessionmaker] = None,
+        max_queue: int = 100_000,
+        batch_size: int = 5000,
+        flush_interval: float = 0.05,
+        enqueue_timeout: float = 1.0,
+        max_retries: int = 3,
+        retry_delay: float = 0.1
+    ):
+        self.session_factory = session_factory if session_factory is not None else AsyncSessionLocal
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        # Created by start(), in the event loop that runs the worker
+        self._ready: Optional[asyncio.Event] = None
+        self._space: Optional[asyncio.Condition] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._closing = False
+        self.accepted = 0
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        self.rejected = 0
+        self.last_flush_seconds = 0.0
+
+    @classmethod
+    def from_env(cls) -> "TraceEventIngestor":
+        return cls(
+            max_queue=int(os.getenv("TRACE_INGEST_MAX_QUEUE", "100000")),
+            batch_size=int(os.getenv("TRACE_INGEST_BATCH_SIZE", "5000")),
+            flush_interval=float(os.getenv("TRACE_INGEST_FLUSH_INTERVAL", "0.05")),
+            enqueue_timeout=float(os.getenv("TRACE_INGEST_ENQUEUE_TIMEOUT", "1")),
+        )
+
+    def start(self):
+        if self._worker is None:
+            self._closing = False
+            self._ready = asyncio.Event()
+            self._space = asyncio.Condition()
+            self._worker = asyncio.create_task(self._run())
+
+    @property
+    def queued(self) -> int:
+        return len(self._buffer)
+
+    async def submit(self, trace_id: UUID, events: Sequence[TraceEventCreate]) -> int:
+        """
+        Queue ``events`` of a trace for writing and return how many were
+        queued. Returns once they are queued, not once they are written.
+        """
+        if self._closing:
+            raise IngestionClosedError("Trace ingestion is shutting down")
+        self.start()
+        rows = [
+            {
+                "trace_id": trace_id,
+                "event_id": event.id,
+                "type": event.type,
+                "timestamp": as_utc(event.timestamp),
+                "data": event.data,
+            }
+            for event in events
+        ]
+
+        def has_room() -> bool:
+            # A batch larger than the whole queue is let in once it is empty
+            return len(self._buffer) + len(rows) <= self.max_queue or not self._buffer
+
+        async with self._space:
+            if not has_room():
+                try:
+                    await asyncio.wait_for(self._space.wait_for(has_room), self.enqueue_timeout)
+                except asyncio.TimeoutError as exc:
+                    self.rejected += len(rows)
+                    raise IngestionBackpressureError(
+                        f"Trace event queue is full ({len(self._buffer)} events waiting)"
+                    ) from exc
+            self._buffer.extend(rows)
+        self.accepted += len(rows)
+        if len(self._buffer) >= self.batch_size:
+            self._ready.set()
+        return len(rows)
+
+    async def _run(self):
+        while True:
+            if len(self._buffer) < self.batch_size and not self._closing:
+                try:
+                    await asyncio.wait_for(self._ready.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._ready.clear()
+            if not self._buffer:
+                if self._closing:
+                    return
+                continue
+            batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            async with self._space:
+                self._space.notify_all()
+            await self._write(batch)
+
+    async def _write(self, rows: List[Dict[str, Any]]):
+        started = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.session_factory() as db:
+                    connection = await db.connection()
+                    if connection.dialect.driver == "asyncpg":
+                        raw = await connection.get_raw_connection()
+                        await raw.driver_connection.copy_records_to_table(
+                            TraceEvent.__tablename__,
+                            records=[
+                                tuple(
+                                    json.dumps(row[c]) if c == "data" else row[c]
+                                    for c in COPY_COLUMNS
+                                )
+                                for row in rows
+                            ],
+                            columns=COPY_COLUMNS,
+                        )
+                    else:
+                        await db.execute(insert(TraceEvent.__table__), rows)
+                    await db.commit()
+                break
+            except Exception as exc:
+                # Whatever went wrong, the worker has to keep running
+                if attempt == self.max_retries or not is_transient(exc):
+                    self.failed += len(rows)
+                    logger.exception("Trace ingestion: dropped a batch of %d events", len(rows))
+                    return
+                logger.warning("Trace ingestion: batch write failed, retrying", exc_info=True)
+                await asyncio.sleep(self.retry_delay * 2 ** attempt)
+        self.batches += 1
+        self.written += len(rows)
+        self.last_flush_seconds = time.perf_counter() - started
+
+    async def flush(self):
+        """
+        Wait until every event queued so far has been written (or dropped).
+        """
+        target = self.accepted
+        while self._worker is not None and self.written + self.failed < target:
+            self._ready.set()
+            await asyncio.sleep(self.flush_interval / 10)
+
+    async def aclose(self):
+        """
+        Stop accepting events, write everything still queued and stop the
+        worker.
+        """
+        if self._worker is None:
+            return
+        self._closing = True
+        self._ready.set()
+        await self._worker
+        self._worker = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queued,
+            "accepted": self.accepted,
+            "written": self.written,
+            "batches": self.batches,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "last_flush_seconds": self.last_flush_seconds,
+        }
+
+
+trace_ingestor = TraceEventIngestor.from_env()
@@ -0,0 +1,40 @@
+from datetime import datetime
+from typing import Optional, Sequence
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories.trace_repository import TraceEventRepository
+from app.schemas.trace import TraceSpan
+from app.utils.pagination import CursorPage
+
+
+class TraceEventService:
+    # Trace events are append-only and read by time window, straight from
+    # the index; they are not cached like the catalog
+
+    def __init__(self):
+        self.repository = TraceEventRepository()
+
+    async def get_range(
+        self,
+        db: AsyncSession,
+        trace_id: UUID,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        types: Optional[Sequence[str]] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        descending: bool = False
+    ) -> CursorPage:
+        return await self.repository.get_range(
+            db, trace_id, start, end, types, cursor, limit, descending
+        )
+
+    async def get_span(self, db: AsyncSession, trace_id: UUID) -> Optional[TraceSpan]:
+        span = await self.repository.get_span(db, trace_id)
+        if span is None:
+            return None
+        return TraceSpan(trace_id=trace_id, start=span[0], end=span[1])
+
+    async def create_partitions(self, db: AsyncSession, months_ahead: int = 3):
+        await self.repository.create_partitions(db, months_ahead)
@@ -0,0 +1,90 @@
+from datetime import datetime, timezone
+from typing import List, Optional
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.usage import GRANULARITIES
+from app.repositories.usage_repository import UsageRepository, bucket_start
+from app.schemas.usage import (
+    TraceMetrics,
+    TraceMetricsCreate,
+    TraceMetricsRecorded,
+    UsageBucket,
+    UsageRebuildResult,
+)
+
+
+class UsageService:
+    # Rollups change with every completed trace and are read as totals by
+    # time range, so they are not cached like the catalog
+
+    def __init__(self):
+        self.repository = UsageRepository()
+
+    async def record(
+        self,
+        db: AsyncSession,
+        trace_id: UUID,
+        metrics: TraceMetricsCreate
+    ) -> Optional[TraceMetricsRecorded]:
+        """
+        Record a completed trace and add it to the rollups of its model and
+        provider. Returns ``None`` if the model does not exist; a trace that
+        was recorded before is returned as stored, and not counted again.
+        """
+        provider_ids = await self.repository.get_provider_ids(db, [metrics.model_id])
+        if metrics.model_id not in provider_ids:
+            return None
+        usage = metrics.token_usage
+        row = {
+            "trace_id": trace_id,
+            "model_id": metrics.model_id,
+            "provider_id": provider_ids[metrics.model_id],
+            "completed_at": metrics.completed_at or datetime.now(timezone.utc),
+            "duration_ms": metrics.total_duration_ms,
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "total_tokens": (
+                usage.total_tokens if usage.total_tokens is not None
+                else usage.prompt_tokens + usage.completion_tokens
+            ),
+            "cost": metrics.cost,
+        }
+        recorded = await self.repository.record(db, [row])
+        if trace_id in recorded:
+            return TraceMetricsRecorded(**row, recorded=True)
+        stored = await self.repository.get_metrics(db, trace_id)
+        return TraceMetricsRecorded(
+            **TraceMetrics.model_validate(stored).model_dump(), recorded=False
+        )
+
+    async def get_metrics(self, db: AsyncSession, trace_id: UUID) -> Optional[TraceMetrics]:
+        metrics = await self.repository.get_metrics(db, trace_id)
+        return TraceMetrics.model_validate(metrics) if metrics is not None else None
+
+    async def get_rollups(
+        self,
+        db: AsyncSession,
+        granularity: str,
+        start: datetime,
+        end: datetime,
+        group_by: str = "model",
+        model_id: Optional[UUID] = None,
+        provider_id: Optional[UUID] = None
+    ) -> List[UsageBucket]:
+        rows = await self.repository.get_rollups(
+            db, granularity, start, end, group_by, model_id, provider_id
+        )
+        return [UsageBucket(**row) for row in rows]
+
+    async def rebuild(
+        self, db: AsyncSession, since: Optional[datetime] = None
+    ) -> UsageRebuildResult:
+        """
+        Recompute the rollups from ``since``, rounded down to the start of
+        its day (UTC), or of all of history.
+        """
+        if since is not None:
+            since = bucket_start(since, GRANULARITIES["day"])
+        traces, rollups = await self.repository.rebuild(db, since)
+        return UsageRebuildResult(since=since, traces=traces, rollups=rollups)
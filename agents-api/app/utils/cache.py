@@ -0,0 +1,312 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Type
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.utils.db import hold_reads_on_primary
+from app.utils.lazy import lazy_import
+from app.utils.serialization import type_adapter
+from app.utils.single_flight import SingleFlight
+
+# Only needed when REDIS_URL is set; importing it costs more than the rest of
+# this module
+redis_module = lazy_import("redis")
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+
+class LocalCache:
+    """
+    In-process LRU cache whose entries also expire after ``ttl`` seconds.
+
+    With ``maxbytes`` the values must be ``bytes`` and the cache also evicts
+    until their total length fits.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+        maxbytes: Optional[int] = None
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.maxbytes = maxbytes
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISSING
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            self._pop(key)
+            self.misses += 1
+            return MISSING
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        if key in self._entries:
+            self._pop(key)
+        if self.maxbytes is not None:
+            if len(value) > self.maxbytes:
+                return
+            self.bytes += len(value)
+        self._entries[key] = (self.clock() + (self.ttl if ttl is None else ttl), value)
+        while len(self._entries) > self.maxsize or (
+            self.maxbytes is not None and self.bytes > self.maxbytes
+        ):
+            self._pop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _pop(self, key: str):
+        _, value = self._entries.pop(key)
+        if self.maxbytes is not None:
+            self.bytes -= len(value)
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class CatalogCache:
+    """
+    Read-through cache for the model-provider catalog.
+
+    Values are kept in a per-process :class:`LocalCache` and, when a Redis
+    client is configured, in Redis as JSON so that other workers can reuse
+    them. Catalog writes are rare, so any write invalidates the whole catalog:
+    the local tier is cleared, the Redis keys are deleted and an invalidation
+    message is published so every other worker clears its local tier too.
+    Invalidations also bump a generation counter in Redis, and a value is
+    only stored there if the counter has not moved since its load started,
+    so a load that raced a write in another worker cannot put a stale value
+    back.
+
+    Concurrent misses of one key are coalesced into a single load, so a
+    cold cache (a new pod, or right after a write) sends each distinct
+    catalog read to the database once rather than once per request.
+    """
+
+    namespace = "catalog"
+
+    def __init__(self, local: Optional[LocalCache] = None, redis=None, ttl: float = 60.0):
+        self.local = local if local is not None else LocalCache(ttl=ttl)
+        self.redis = redis
+        self.ttl = ttl
+        self.keys_set = f"{self.namespace}:keys"
+        self.generation_key = f"{self.namespace}:generation"
+        self.channel = f"{self.namespace}:invalidate"
+        # Bumped on every invalidation; a value loaded while a write happened
+        # is returned to its caller but not stored.
+        self.generation = 0
+        self.redis_hits = 0
+        self.redis_errors = 0
+        self.invalidations = 0
+        self.flights = SingleFlight()
+
+    @classmethod
+    def from_env(cls) -> "CatalogCache":
+        ttl = float(os.getenv("CATALOG_CACHE_TTL", "60"))
+        maxsize = int(os.getenv("CATALOG_CACHE_MAXSIZE", "1024"))
+        redis = None
+        redis_url = os.getenv("REDIS_URL")
+        if redis_url:
+            from redis.asyncio import Redis
+            redis = Redis.from_url(redis_url)
+        return cls(local=LocalCache(maxsize=maxsize, ttl=ttl), redis=redis, ttl=ttl)
+
+    async def get_or_load(
+        self,
+        key: str,
+        type_: Type,
+        loader: Callable[..., Awaitable[Any]],
+        session_factory: Optional[Callable[[], AsyncSession]] = None
+    ) -> Any:
+        """
+        Return the cached value for ``key``, or await ``loader`` and cache its
+        result validated as ``type_``. ``None`` results are not cached.
+
+        With ``session_factory``, ``loader`` is called with a session opened
+        for the load alone: the load is shared with other requests and may
+        outlive the one that started it, so it must not use that request's
+        session.
+        """
+        value = self.local.get(key)
+        if value is not MISSING:
+            return value
+        # Concurrent misses of the same key share one load. The generation is
+        # part of the flight key so that a request arriving after a write
+        # never joins a load that started before it.
+        return await self.flights.do(
+            (self.generation, key), lambda: self._load(key, type_, loader, session_factory)
+        )
+
+    async def _load(
+        self,
+        key: str,
+        type_: Type,
+        loader: Callable[..., Awaitable[Any]],
+        session_factory: Optional[Callable[[], AsyncSession]]
+    ) -> Any:
+        generation = self.generation
+        # The Redis generation before the load; stays MISSING (and nothing is
+        # stored in Redis) when it could not be read
+        redis_generation = MISSING
+        if self.redis is not None:
+            try:
+                raw, redis_generation = await self.redis.mget(
+                    f"{self.namespace}:{key}", self.generation_key
+                )
+            except redis_module.RedisError:
+                self.redis_errors += 1
+                logger.warning("Catalog cache: Redis read failed", exc_info=True)
+                raw = None
+            if raw is not None:
+                self.redis_hits += 1
+                value = type_adapter(type_).validate_json(raw)
+                if generation == self.generation:
+                    self.local.set(key, value)
+                return value
+
+        if session_factory is None:
+            loaded = await loader()
+        else:
+            async with session_factory() as session:
+                loaded = await loader(session)
+        if loaded is None:
+            return None
+        value = type_adapter(type_).validate_python(loaded, from_attributes=True)
+        if generation == self.generation:
+            self.local.set(key, value)
+            if redis_generation is not MISSING:
+                await self._redis_set(key, type_adapter(type_).dump_json(value), redis_generation)
+        return value
+
+    async def _redis_set(self, key: str, payload: bytes, generation: Optional[bytes]):
+        """
+        Store ``payload`` in Redis unless the catalog was invalidated since
+        the Redis generation was ``generation``.
+        """
+        redis_key = f"{self.namespace}:{key}"
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                await pipe.watch(self.generation_key)
+                if await pipe.get(self.generation_key) != generation:
+                    return
+                pipe.multi()
+                pipe.set(redis_key, payload, ex=max(1, int(self.ttl)))
+                pipe.sadd(self.keys_set, redis_key)
+                await pipe.execute()
+        except redis_module.WatchError:
+            # Invalidated in the meantime
+            pass
+        except redis_module.RedisError:
+            self.redis_errors += 1
+            logger.warning("Catalog cache: Redis write failed", exc_info=True)
+
+    def clear_local(self):
+        self.generation += 1
+        self.local.clear()
+
+    async def invalidate(self):
+        """
+        Drop every cached catalog entry in this worker, in Redis, and (via
+        pub/sub) in every other worker.
+        """
+        self.invalidations += 1
+        self.clear_local()
+        if self.redis is None:
+            return
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                while True:
+                    # A value stored between reading the keys and deleting
+                    # them would survive; watching the key set starts over
+                    await pipe.watch(self.keys_set)
+                    keys = await pipe.smembers(self.keys_set)
+                    pipe.multi()
+                    if keys:
+                        pipe.delete(*keys)
+                    pipe.delete(self.keys_set)
+                    pipe.incr(self.generation_key)
+                    pipe.publish(self.channel, b"*")
+                    try:
+                        await pipe.execute()
+                        break
+                    except redis_module.WatchError:
+                        continue
+        except redis_module.RedisError:
+            self.redis_errors += 1
+            logger.warning("Catalog cache: Redis invalidation failed", exc_info=True)
+
+    async def listen(self):
+        """
+        Clear the local tier whenever another worker publishes an invalidation.
+        Runs until cancelled; meant to be started as a background task.
+        """
+        if self.redis is None:
+            return
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            # Replicas may not have the write yet; refill
+                            # from the primary, or a stale value would be
+                            # written back to Redis
+                            hold_reads_on_primary()
+                            self.clear_local()
+            except asyncio.CancelledError:
+                raise
+            except redis_module.RedisError:
+                self.redis_errors += 1
+                logger.warning(
+                    "Catalog cache: invalidation listener failed, retrying", exc_info=True
+                )
+                # Anything published while disconnected was missed
+                hold_reads_on_primary()
+                self.clear_local()
+                await asyncio.sleep(1)
+
+    def reset(self):
+        self.clear_local()
+        self.local.hits = self.local.misses = self.local.evictions = 0
+        self.redis_hits = self.redis_errors = self.invalidations = 0
+        self.flights.calls = self.flights.coalesced = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self.local),
+            "hits": self.local.hits,
+            "misses": self.local.misses,
+            "evictions": self.local.evictions,
+            "redis_enabled": self.redis is not None,
+            "redis_hits": self.redis_hits,
+            "redis_errors": self.redis_errors,
+            "invalidations": self.invalidations,
+            "loads": self.flights.calls,
+            "coalesced": self.flights.coalesced,
+        }
+
+
+catalog_cache = CatalogCache.from_env()
@@ -0,0 +1,363 @@
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+from app.utils.cache import MISSING, LocalCache
+from app.utils.filtering import parse_bool
+
+logger = logging.getLogger(__name__)
+
+# Keys of Model.default_parameters that control the cache rather than the
+# completion; they are never sent to providers or hashed
+CACHE_CONTROL_KEYS = ("cache", "cache_ttl")
+
+# Request fields that are not completion parameters
+NON_PARAMETER_KEYS = ("model", "messages", "tools", "stream", "user")
+
+KEY_VERSION = "v1"
+
+
+def cache_enabled(default_parameters: Optional[Mapping[str, Any]]) -> bool:
+    """
+    Whether completions of a model may be cached; set ``"cache": false`` (or
+    ``"false"``) in its ``default_parameters`` to bypass the cache.
+    """
+    enabled = (default_parameters or {}).get("cache", True)
+    if isinstance(enabled, str):
+        try:
+            return parse_bool(enabled)
+        except ValueError:
+            return True
+    return bool(enabled)
+
+
+def cache_ttl(default_parameters: Optional[Mapping[str, Any]]) -> Optional[float]:
+    """
+    Seconds to cache completions of a model, from ``"cache_ttl"`` in its
+    ``default_parameters``; ``None`` (the cache's default) when it is unset
+    or not a positive number.
+    """
+    ttl = (default_parameters or {}).get("cache_ttl")
+    if ttl is None or isinstance(ttl, bool):
+        return None
+    try:
+        ttl = float(ttl)
+    except (TypeError, ValueError):
+        return None
+    return ttl if 0 < ttl < math.inf else None
+
+
+def merge_parameters(
+    default_parameters: Optional[Mapping[str, Any]], payload: Mapping[str, Any]
+) -> Dict[str, Any]:
+    """
+    The request as sent to a provider: the model's default parameters,
+    overridden by those of the request, without the cache control keys.
+    """
+    merged = {
+        key: value
+        for key, value in (default_parameters or {}).items()
+        if key not in CACHE_CONTROL_KEYS
+    }
+    merged.update(payload)
+    return merged
+
+
+def completion_key(model_id: Any, request: Mapping[str, Any]) -> str:
+    """
+    Canonical hash of (model id, parameters, messages, tools) of a merged
+    request; equal requests hash equally whatever their key order.
+    """
+    parameters = {key: value for key, value in request.items() if key not in NON_PARAMETER_KEYS}
+    canonical = json.dumps(
+        [KEY_VERSION, str(model_id), parameters, request.get("messages"), request.get("tools")],
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+@contextmanager
+def write_transaction(db: sqlite3.Connection):
+    """
+    Run the statements of the block in one write transaction of an
+    autocommit connection, taking the database's write lock up front.
+    """
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        db.execute("ROLLBACK")
+        raise
+    db.execute("COMMIT")
+
+
+class DiskTier:
+    """
+    SQLite-backed cache tier that outlives the process. Entries past their
+    TTL are never returned; once the stored values exceed ``max_bytes`` the
+    least recently read entries are evicted. Blocking; call it from a
+    thread.
+
+    Several workers may share the file, so the total size of the values is
+    kept in the database (by triggers), not counted by each process.
+    """
+
+    def __init__(
+        self, path: str, max_bytes: int = 512 * 1024 * 1024, clock: Callable[[], float] = time.time
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.evictions = 0
+        # Total size of the values as of this process's last access, for
+        # stats that must not block on the lock or the file
+        self.last_bytes = 0
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            with write_transaction(db):
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS completions ("
+                    "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+                    "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                db.execute(
+                    "CREATE INDEX IF NOT EXISTS ix_completions_accessed_at "
+                    "ON completions (accessed_at)"
+                )
+                db.execute("CREATE TABLE IF NOT EXISTS completions_size (bytes INTEGER NOT NULL)")
+                db.execute(
+                    "CREATE TRIGGER IF NOT EXISTS completions_size_insert "
+                    "AFTER INSERT ON completions "
+                    "BEGIN UPDATE completions_size SET bytes = bytes + NEW.size; END"
+                )
+                db.execute(
+                    "CREATE TRIGGER IF NOT EXISTS completions_size_delete "
+                    "AFTER DELETE ON completions "
+                    "BEGIN UPDATE completions_size SET bytes = bytes - OLD.size; END"
+                )
+                # Files written before the size was kept start from the sum
+                if db.execute("SELECT COUNT(*) FROM completions_size").fetchone()[0] == 0:
+                    db.execute(
+                        "INSERT INTO completions_size (bytes) "
+                        "SELECT COALESCE(SUM(size), 0) FROM completions"
+                    )
+            self._db = db
+        return self._db
+
+    @property
+    def bytes(self) -> int:
+        with self._lock:
+            return self._size(self._connect())
+
+    def _size(self, db: sqlite3.Connection) -> int:
+        self.last_bytes = db.execute("SELECT bytes FROM completions_size").fetchone()[0]
+        return self.last_bytes
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        """
+        The value stored under ``key`` and the seconds it has left to live.
+        """
+        with self._lock:
+            db = self._connect()
+            now = self.clock()
+            row = db.execute(
+                "SELECT value, expires_at FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at <= now:
+                db.execute("DELETE FROM completions WHERE key = ?", (key,))
+                return None
+            db.execute("UPDATE completions SET accessed_at = ? WHERE key = ?", (now, key))
+            return value, expires_at - now
+
+    def set(self, key: str, value: bytes, ttl: float):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            db = self._connect()
+            now = self.clock()
+            with write_transaction(db):
+                db.execute("DELETE FROM completions WHERE key = ?", (key,))
+                db.execute(
+                    "INSERT INTO completions (key, value, size, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, value, len(value), now + ttl, now),
+                )
+            if self._size(db) > self.max_bytes:
+                self._evict(db, now)
+
+    def _evict(self, db: sqlite3.Connection, now: float):
+        # Expired entries go first, then the least recently read ones. The
+        # size is read again in the transaction, as another worker may have
+        # evicted in the meantime.
+        with write_transaction(db):
+            excess = self._size(db) - self.max_bytes
+            victims = []
+            for key, size, expires_at in db.execute(
+                "SELECT key, size, expires_at FROM completions "
+                "ORDER BY expires_at > ?, accessed_at",
+                (now,),
+            ).fetchall():
+                if excess <= 0 and expires_at > now:
+                    break
+                victims.append(key)
+                excess -= size
+            db.executemany("DELETE FROM completions WHERE key = ?", [(key,) for key in victims])
+        self.evictions += len(victims)
+        self.last_bytes = self.max_bytes + excess
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._connect().execute("DELETE FROM completions")
+            self.last_bytes = 0
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class CompletionCache:
+    """
+    Two-tier cache of completion responses: an in-memory LRU bounded in
+    bytes, backed by an optional :class:`DiskTier`. Responses are stored as
+    JSON bytes; every hit returns a fresh copy.
+    """
+
+    def __init__(
+        self,
+        memory: Optional[LocalCache] = None,
+        disk: Optional[DiskTier] = None,
+        ttl: float = 86400.0,
+    ):
+        self.ttl = ttl
+        self.memory = (
+            memory
+            if memory is not None
+            else LocalCache(maxsize=100_000, ttl=ttl, maxbytes=64 * 1024 * 1024)
+        )
+        self.disk = disk
+        self.reset_stats()
+
+    @classmethod
+    def from_env(cls) -> "CompletionCache":
+        ttl = float(os.getenv("COMPLETION_CACHE_TTL", "86400"))
+        memory = LocalCache(
+            maxsize=int(os.getenv("COMPLETION_CACHE_MAXSIZE", "100000")),
+            ttl=ttl,
+            maxbytes=int(os.getenv("COMPLETION_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024))),
+        )
+        disk = None
+        path = os.getenv("COMPLETION_CACHE_PATH")
+        if path:
+            disk = DiskTier(
+                path,
+                max_bytes=int(os.getenv("COMPLETION_CACHE_DISK_BYTES", str(512 * 1024 * 1024))),
+            )
+        return cls(memory=memory, disk=disk, ttl=ttl)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.memory.get(key)
+        if value is not MISSING:
+            self.memory_hits += 1
+            return self._served(value)
+        if self.disk is not None:
+            try:
+                entry = await asyncio.to_thread(self.disk.get, key)
+            except sqlite3.Error:
+                self.disk_errors += 1
+                logger.warning("Completion cache: disk read failed", exc_info=True)
+                entry = None
+            if entry is not None:
+                value, ttl = entry
+                self.disk_hits += 1
+                self.memory.set(key, value, ttl)
+                return self._served(value)
+        self.misses += 1
+        return None
+
+    def _served(self, value: bytes) -> Dict[str, Any]:
+        response = json.loads(value)
+        self.bytes_saved += len(value)
+        usage = response.get("usage") if isinstance(response, dict) else None
+        if isinstance(usage, dict):
+            self.tokens_saved += int(usage.get("total_tokens") or 0)
+        return response
+
+    async def set(self, key: str, response: Any, ttl: Optional[float] = None):
+        value = json.dumps(response, separators=(",", ":")).encode()
+        ttl = self.ttl if ttl is None else ttl
+        self.stores += 1
+        self.memory.set(key, value, ttl)
+        if self.disk is not None:
+            try:
+                await asyncio.to_thread(self.disk.set, key, value, ttl)
+            except sqlite3.Error:
+                self.disk_errors += 1
+                logger.warning("Completion cache: disk write failed", exc_info=True)
+
+    def record_bypass(self):
+        self.bypasses += 1
+
+    def reset_stats(self):
+        self.memory_hits = self.disk_hits = self.misses = self.bypasses = self.stores = 0
+        self.bytes_saved = self.tokens_saved = self.disk_errors = 0
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+        self.reset_stats()
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "bypasses": self.bypasses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "stores": self.stores,
+            "bytes_saved": self.bytes_saved,
+            "tokens_saved": self.tokens_saved,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory.bytes,
+            "memory_evictions": self.memory.evictions,
+            "disk_enabled": self.disk is not None,
+            "disk_bytes": self.disk.last_bytes if self.disk is not None else 0,
+            "disk_evictions": self.disk.evictions if self.disk is not None else 0,
+            "disk_errors": self.disk_errors,
+        }
+
+
+completion_cache = CompletionCache.from_env()
@@ -0,0 +1,77 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Mapping, Sequence
+from uuid import UUID
+
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+async def stream_rows(
+    db: AsyncSession, stmt: Select, batch_size: int
+) -> AsyncIterator[Sequence[Mapping]]:
+    """
+    Yield the rows of ``stmt`` in batches of ``batch_size`` mappings.
+
+    The statement runs on a server-side cursor, so only one batch is held in
+    memory at a time regardless of how many rows the query returns.
+    """
+    result = await db.stream(stmt.execution_options(yield_per=batch_size))
+    async for rows in result.mappings().partitions():
+        yield rows
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_ndjson(rows: Sequence[Mapping]) -> bytes:
+    return "".join(
+        json.dumps(dict(row), default=_json_default, separators=(",", ":")) + "\n" for row in rows
+    ).encode()
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"))
+    return value
+
+
+def encode_csv(rows: Sequence[Mapping], fieldnames: Sequence[str], header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(fieldnames)
+    writer.writerows([_csv_value(row[name]) for name in fieldnames] for row in rows)
+    return buffer.getvalue().encode()
+
+
+async def encode_rows(
+    batches: AsyncIterator[Sequence[Mapping]], format: str, fieldnames: Sequence[str]
+) -> AsyncIterator[bytes]:
+    """
+    Encode batches of rows as NDJSON lines or CSV records, one chunk per batch.
+    The CSV header is sent straight away so clients see bytes before the
+    first query returns.
+    """
+    if format == "csv":
+        yield encode_csv([], fieldnames, header=True)
+    async for rows in batches:
+        yield encode_ndjson(rows) if format == "ndjson" else encode_csv(rows, fieldnames)
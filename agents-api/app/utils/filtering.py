@@ -0,0 +1,166 @@
+import operator
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from sqlalchemy import Select
+
+FILTER_PREFIX = "filter_"
+
+OPERATORS: Dict[str, Callable[[Any, Any], Any]] = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "in": lambda column, values: column.in_(values),
+}
+
+
+class InvalidFilterError(ValueError):
+    pass
+
+
+def parse_bool(value: str) -> bool:
+    lowered = value.lower()
+    if lowered in ("true", "1", "yes"):
+        return True
+    if lowered in ("false", "0", "no"):
+        return False
+    raise ValueError(value)
+
+
+class Field:
+    """
+    A filterable and/or sortable column of a listing.
+
+    ``join`` is an ``(entity, onclause)`` pair the statement needs before the
+    column can be used, e.g. the provider of a model.
+    """
+
+    def __init__(
+        self,
+        column,
+        type_: Callable[[str], Any] = str,
+        operators: Sequence[str] = ("eq", "ne", "in"),
+        sortable: bool = False,
+        join: Optional[Tuple[Any, Any]] = None
+    ):
+        self.column = column
+        self.type_ = type_
+        self.operators = operators
+        self.sortable = sortable
+        self.join = join
+
+
+class ListQuery:
+    """
+    Parsed, validated filters and sort order of one list request.
+    """
+
+    def __init__(self, filters: List[Tuple[str, str, Any]], sort: str, descending: bool):
+        self.filters = filters
+        self.sort = sort
+        self.descending = descending
+
+    def key(self) -> str:
+        """
+        Canonical form, used in cache keys: equal queries give equal keys
+        however their parameters were ordered.
+        """
+        filters = ",".join(
+            f"{name}:{op}:{value}" for name, op, value in sorted(self.filters, key=str)
+        )
+        return f"{filters}|{'-' if self.descending else ''}{self.sort}"
+
+
+class FilterSet:
+    """
+    Whitelist of the fields a listing can be filtered and sorted on.
+
+    Filters come from ``filter_<field>=value`` query parameters, optionally
+    with an operator suffix (``filter_context_window__gte=8000``,
+    ``filter_model_type__in=chat,embedding``). Sorting is ``sort=<field>`` or
+    ``sort=-<field>`` for descending order. Anything not whitelisted is
+    rejected with :class:`InvalidFilterError` rather than silently ignored.
+    """
+
+    def __init__(self, fields: Dict[str, Field], default_sort: str = "created_at"):
+        self.fields = fields
+        self.default_sort = default_sort
+
+    def parse(self, params: Mapping[str, str], sort: Optional[str] = None) -> ListQuery:
+        filters = []
+        for param, raw in params.items():
+            if not param.startswith(FILTER_PREFIX):
+                continue
+            name, _, op = param[len(FILTER_PREFIX):].partition("__")
+            op = op or "eq"
+            field = self.fields.get(name)
+            if field is None:
+                raise InvalidFilterError(f"Cannot filter on '{name}'")
+            if op not in field.operators:
+                raise InvalidFilterError(f"Operator '{op}' is not supported for '{name}'")
+            try:
+                if op == "in":
+                    value = tuple(field.type_(item) for item in raw.split(","))
+                else:
+                    value = field.type_(raw)
+            except ValueError as exc:
+                raise InvalidFilterError(f"Invalid value for '{name}': {raw!r}") from exc
+            filters.append((name, op, value))
+
+        sort = sort or self.default_sort
+        descending = sort.startswith("-")
+        sort = sort.lstrip("-")
+        field = self.fields.get(sort)
+        if field is None or not field.sortable:
+            raise InvalidFilterError(f"Cannot sort on '{sort}'")
+        return ListQuery(filters, sort, descending)
+
+    def apply(self, stmt: Select, query: ListQuery) -> Select:
+        """
+        Add the WHERE clauses (and any joins they need) of ``query``.
+        """
+        joined = set()
+        for name, op, value in query.filters:
+            field = self.fields[name]
+            if field.join is not None and field.join[0] not in joined:
+                joined.add(field.join[0])
+                stmt = stmt.join(*field.join)
+            stmt = stmt.filter(OPERATORS[op](field.column, value))
+        return stmt
+
+    def sort_column(self, query: ListQuery):
+        return self.fields[query.sort].column
+
+
+def parse_datetime(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+def parse_fields(raw: Optional[str], available: Iterable[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Field names of a ``fields=name,display_name`` sparse fieldset, or
+    ``None`` (all fields) when no fieldset was given.
+    """
+    if raw is None:
+        return None
+    fields = tuple(dict.fromkeys(name.strip() for name in raw.split(",") if name.strip()))
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise InvalidFilterError(f"Cannot select fields {unknown}")
+    return fields
+
+
+def sparse_columns(
+    columns: Mapping[str, Any], fields: Optional[Sequence[str]], required: Sequence[str]
+) -> List:
+    """
+    The columns of ``columns`` named in ``fields`` (all of them when
+    ``fields`` is ``None``) plus the ``required`` ones, for a narrowed SELECT.
+    """
+    if fields is None:
+        return list(columns.values())
+    names = list(required) + [name for name in fields if name in columns and name not in required]
+    return [columns[name] for name in names]
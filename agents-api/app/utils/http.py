@@ -0,0 +1,46 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Mapping, Optional
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def as_utc(value: datetime) -> datetime:
+    # SQLite hands timestamps back naive; they are stored in UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def format_http_date(value: datetime) -> str:
+    return format_datetime(as_utc(value), usegmt=True)
+
+
+def is_not_modified(
+    headers: Mapping[str, str], etag: str, last_modified: Optional[datetime] = None
+) -> bool:
+    """
+    Evaluate ``If-None-Match`` and, only when it is absent,
+    ``If-Modified-Since`` as described in RFC 9110 section 13.2.2.
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        # If-None-Match uses the weak comparison function
+        return "*" in candidates or etag in (
+            tag[2:] if tag.startswith("W/") else tag for tag in candidates
+        )
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    # HTTP dates have whole-second resolution
+    return as_utc(last_modified).replace(microsecond=0) <= as_utc(since)
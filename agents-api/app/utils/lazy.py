@@ -0,0 +1,29 @@
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Return the top-level module ``name`` without executing it until one of
+    its attributes is first used.
+
+    Meant for heavy SDKs (openai, litellm, redis) that only some requests or
+    deployments need, so that importing the app stays fast:
+
+        openai = lazy_import("openai")
+        ...
+        client = openai.AsyncOpenAI()  # the import happens here
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,327 @@
+import logging
+import os
+import re
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+# Distinct statements remembered per request for the slow-request log
+MAX_RECORDED_STATEMENTS = 20
+
+
+class Histogram:
+    """
+    Prometheus-style histogram over fixed buckets. Observing a value is a
+    bisect and two additions; nothing is allocated.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name: str, labels: str) -> Iterable[str]:
+        prefix = labels + "," if labels else ""
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{prefix}le="+Inf"}} {self.count}'
+        yield f"{name}_sum{{{labels}}} {self.sum}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+class RouteMetrics:
+    __slots__ = ("latency", "db_time", "statements", "responses")
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.db_time = Histogram(LATENCY_BUCKETS)
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.responses: Dict[int, int] = {}
+
+
+class RequestStats:
+    """
+    Database work done on behalf of the current request.
+    """
+
+    __slots__ = ("statements", "db_time", "sql")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_time = 0.0
+        self.sql: List[str] = []
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+class Metrics:
+    def __init__(self):
+        self.reset()
+
+    def route(self, method: str, route: str) -> RouteMetrics:
+        key = (method, route)
+        route_metrics = self.routes.get(key)
+        if route_metrics is None:
+            route_metrics = self.routes[key] = RouteMetrics()
+        return route_metrics
+
+    def observe_request(
+        self, method: str, route: str, status: int, seconds: float, stats: RequestStats
+    ):
+        route_metrics = self.route(method, route)
+        route_metrics.latency.observe(seconds)
+        route_metrics.db_time.observe(stats.db_time)
+        route_metrics.statements.observe(stats.statements)
+        route_metrics.responses[status] = route_metrics.responses.get(status, 0) + 1
+
+    def observe_statement(self, seconds: float, statement: str):
+        self.statements_total += 1
+        self.db_time_total += seconds
+        stats = current_request.get()
+        if stats is None:
+            return
+        stats.statements += 1
+        stats.db_time += seconds
+        if len(stats.sql) < MAX_RECORDED_STATEMENTS and statement not in stats.sql:
+            stats.sql.append(statement)
+
+    def reset(self):
+        self.routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self.pool_wait = Histogram(LATENCY_BUCKETS)
+        self.pool_timeouts = 0
+        self.statements_total = 0
+        self.db_time_total = 0.0
+
+    def render(self, gauges: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+        ``gauges`` adds point-in-time values such as cache or pool counters.
+        """
+        lines = []
+        for name, help_text, attribute in (
+            ("http_request_duration_seconds", "Request latency by route.", "latency"),
+            ("http_request_db_seconds", "Database time per request by route.", "db_time"),
+            ("http_request_db_statements", "SQL statements per request by route.", "statements"),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (method, route), route_metrics in self.routes.items():
+                labels = f'method="{method}",route="{route}"'
+                lines.extend(getattr(route_metrics, attribute).samples(name, labels))
+
+        lines.append("# HELP http_responses_total Responses by route and status code.")
+        lines.append("# TYPE http_responses_total counter")
+        for (method, route), route_metrics in self.routes.items():
+            for status, count in route_metrics.responses.items():
+                labels = f'method="{method}",route="{route}",status="{status}"'
+                lines.append(f"http_responses_total{{{labels}}} {count}")
+
+        lines.append(
+            "# HELP db_pool_checkout_wait_seconds Time spent waiting for a pooled connection."
+        )
+        lines.append("# TYPE db_pool_checkout_wait_seconds histogram")
+        lines.extend(self.pool_wait.samples("db_pool_checkout_wait_seconds", ""))
+
+        lines.append(
+            "# HELP db_pool_checkout_timeouts_total "
+            "Checkouts that gave up waiting for a connection."
+        )
+        lines.append("# TYPE db_pool_checkout_timeouts_total counter")
+        lines.append(f"db_pool_checkout_timeouts_total {self.pool_timeouts}")
+
+        lines.append("# TYPE db_statements_total counter")
+        lines.append(f"db_statements_total {self.statements_total}")
+        lines.append("# TYPE db_statement_seconds_total counter")
+        lines.append(f"db_statement_seconds_total {self.db_time_total}")
+
+        typed = set()
+        for name, value in (gauges or {}).items():
+            if isinstance(value, bool):
+                value = int(value)
+            if isinstance(value, (int, float)):
+                base_name = name.partition("{")[0]
+                if base_name not in typed:
+                    typed.add(base_name)
+                    lines.append(f"# TYPE {base_name} gauge")
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+# Key of the start times of the statements running on a connection, kept
+# in its info dict as a stack
+STARTED_KEY = "metrics_statements_started"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(STARTED_KEY, []).append(perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    metrics.observe_statement(perf_counter() - conn.info[STARTED_KEY].pop(), statement)
+
+
+def _handle_error(exception_context):
+    # A failed statement gets no after_cursor_execute; drop its start time
+    started = (
+        exception_context.connection.info.get(STARTED_KEY)
+        if exception_context.connection is not None
+        else None
+    )
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine: AsyncEngine):
+    """
+    Count statements and database time of ``engine`` towards the current
+    request and the process-wide totals.
+    """
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", _handle_error)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long each checkout took, i.e. the wait for a
+    free connection plus connecting when the pool opens a new one.
+    """
+
+    def _do_get(self):
+        started = perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            metrics.pool_timeouts += 1
+            raise
+        finally:
+            metrics.pool_wait.observe(perf_counter() - started)
+
+
+def pool_gauges(pool: Pool, engine: str = "primary") -> Dict[str, Any]:
+    """
+    Current size, checked-out, overflow and idle connection counts of a
+    queue pool; ``checkedout`` reaching ``size`` plus the overflow limit
+    means the pool is saturated.
+    """
+    gauges = {}
+    for name in ("size", "checkedout", "overflow", "checkedin"):
+        method = getattr(pool, name, None)
+        if method is not None:
+            gauges[f'db_pool_{name}{{engine="{engine}"}}'] = method()
+    return gauges
+
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PARAMETER_LISTS = re.compile(
+    r"\((?:\s*(?:\?|\$\d+|%\(\w+\)s|%s)\s*,)+\s*(?:\?|\$\d+|%\(\w+\)s|%s)\s*\)"
+)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """
+    Normalize a SQL statement so that executions differing only in literals,
+    placeholder counts or whitespace share one fingerprint.
+    """
+    statement = _PARAMETER_LISTS.sub("(...)", statement)
+    statement = _LITERALS.sub("?", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+def route_template(scope) -> str:
+    """
+    Path template of the route that handled the request, e.g.
+    ``/api/v1/model-providers/{id}``, so that metrics get one label per route
+    rather than one per URL.
+    """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    # Newer FastAPI versions keep the routes of included routers as they
+    # were declared, relative to the router's prefix: the prefix is then the
+    # part of the URL in front of what the route matches
+    path = scope["path"]
+    for i, char in enumerate(path):
+        if char == "/" and route.path_regex.match(path[i:]):
+            return path[:i] + route.path
+    return route.path
+
+
+class InstrumentationMiddleware:
+    """
+    ASGI middleware that times each request, attaches a ``Server-Timing``
+    header with its database time and statement count, records per-route
+    histograms and logs requests slower than ``slow_request_seconds``.
+    """
+
+    def __init__(self, app, slow_request_seconds: Optional[float] = None):
+        self.app = app
+        if slow_request_seconds is None:
+            slow_request_seconds = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))
+        self.slow_request_seconds = slow_request_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started = perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = perf_counter() - started
+                MutableHeaders(scope=message).append(
+                    "Server-Timing",
+                    f'db;dur={stats.db_time * 1000:.1f};desc="{stats.statements} queries", '
+                    f"app;dur={elapsed * 1000:.1f}"
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = perf_counter() - started
+            current_request.reset(token)
+            route_path = route_template(scope)
+            metrics.observe_request(scope["method"], route_path, status, elapsed, stats)
+            if elapsed >= self.slow_request_seconds:
+                logger.warning(
+                    "Slow request %s %s: %.1f ms, %d statements, %.1f ms in the database; SQL: %s",
+                    scope["method"],
+                    route_path,
+                    elapsed * 1000,
+                    stats.statements,
+                    stats.db_time * 1000,
+                    [fingerprint(sql) for sql in stats.sql],
+                )
@@ -0,0 +1,91 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import Select, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+class CursorPage:
+    def __init__(
+        self, items: List[Any], next_cursor: Optional[str] = None, total: Optional[int] = None
+    ):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.total = total
+
+
+def encode_cursor(value: Any, id: Any) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([value, str(id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(
+    cursor: str, value_type: type = datetime, id_type: type = UUID
+) -> Tuple[Any, Any]:
+    """
+    Decode a cursor whose sort value is a ``value_type`` and id an
+    ``id_type``; a cursor issued for a different sort order is rejected.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if value_type is datetime:
+            value = datetime.fromisoformat(value)
+        elif not isinstance(value, value_type):
+            raise TypeError(value)
+        return value, id_type(id)
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursorError("Invalid pagination cursor") from exc
+
+
+async def paginate(
+    db: AsyncSession,
+    stmt: Select,
+    entity,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    include_total: bool = False,
+    sort_column=None,
+    descending: bool = False
+) -> CursorPage:
+    """
+    Keyset-paginate ``stmt`` on ``(sort_column, entity.id)``, where
+    ``sort_column`` is a non-nullable column of ``entity`` and defaults to
+    ``entity.created_at``. Ids may be UUIDs or integers.
+
+    The cursor marks the last row of the previous page, so each page is a
+    range scan on a ``(sort_column, id)`` index instead of an OFFSET that
+    walks every skipped row. The total count is a separate query and only
+    runs when asked for.
+    """
+    if sort_column is None:
+        sort_column = entity.created_at
+    total = None
+    if include_total:
+        total = await db.scalar(select(func.count()).select_from(stmt.order_by(None).subquery()))
+
+    if cursor is not None:
+        position = decode_cursor(cursor, sort_column.type.python_type, entity.id.type.python_type)
+        key = tuple_(sort_column, entity.id)
+        stmt = stmt.filter(key < position if descending else key > position)
+    if descending:
+        stmt = stmt.order_by(sort_column.desc(), entity.id.desc())
+    else:
+        stmt = stmt.order_by(sort_column, entity.id)
+    stmt = stmt.limit(limit + 1)
+
+    items = (await db.execute(stmt)).scalars().all()
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(getattr(items[-1], sort_column.key), items[-1].id)
+    return CursorPage(items, next_cursor, total)
@@ -0,0 +1,121 @@
+import heapq
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+_TOKENS = re.compile(r"[a-z0-9]+")
+
+# Minimum trigram (Jaccard) similarity for a fuzzy token match, as pg_trgm's
+# default similarity_threshold
+FUZZY_THRESHOLD = 0.3
+
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.9
+FUZZY_WEIGHT = 0.8
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKENS.findall(text.lower()) if text else []
+
+
+def trigrams(token: str) -> Set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class InvertedIndex:
+    """
+    In-memory token index with prefix and trigram fuzzy matching, used where
+    the database has no text search (SQLite).
+
+    Documents are added with weighted text fields and an arbitrary payload;
+    :meth:`search` ranks documents by, for every query token, the best
+    (match score x field weight) among their tokens. Every query token has to
+    match something.
+    """
+
+    def __init__(self, weights: Dict[str, float]):
+        self.weights = weights
+        self.payloads: List[Any] = []
+        # token -> {document: best field weight}
+        self.postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self.token_trigrams: Dict[str, Set[str]] = {}
+        self.trigram_tokens: Dict[str, Set[str]] = defaultdict(set)
+        self._vocabulary: Optional[List[str]] = None
+
+    def add(self, fields: Dict[str, Optional[str]], payload: Any):
+        document = len(self.payloads)
+        self.payloads.append(payload)
+        for field, text in fields.items():
+            weight = self.weights[field]
+            for token in tokenize(text):
+                postings = self.postings[token]
+                if postings.get(document, 0) < weight:
+                    postings[document] = weight
+                if token not in self.token_trigrams:
+                    grams = self.token_trigrams[token] = trigrams(token)
+                    for gram in grams:
+                        self.trigram_tokens[gram].add(token)
+        self._vocabulary = None
+
+    def __len__(self) -> int:
+        return len(self.payloads)
+
+    @property
+    def vocabulary(self) -> List[str]:
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        return self._vocabulary
+
+    def _matching_tokens(self, query_token: str) -> Dict[str, float]:
+        matches: Dict[str, float] = {}
+        vocabulary = self.vocabulary
+        for i in range(bisect_left(vocabulary, query_token), len(vocabulary)):
+            token = vocabulary[i]
+            if not token.startswith(query_token):
+                break
+            matches[token] = EXACT_SCORE if token == query_token else PREFIX_SCORE
+
+        grams = trigrams(query_token)
+        overlaps: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for token in self.trigram_tokens.get(gram, ()):
+                overlaps[token] += 1
+        for token, overlap in overlaps.items():
+            similarity = overlap / (len(grams) + len(self.token_trigrams[token]) - overlap)
+            if similarity >= FUZZY_THRESHOLD:
+                score = similarity * FUZZY_WEIGHT
+                if score > matches.get(token, 0):
+                    matches[token] = score
+        return matches
+
+    def search(
+        self, query: str, limit: int, predicate: Optional[Callable[[Any], bool]] = None
+    ) -> List[Tuple[Any, float]]:
+        """
+        Return up to ``limit`` ``(payload, score)`` pairs, best first, for
+        documents matching every token of ``query`` and ``predicate``.
+        """
+        scores: Optional[Dict[int, float]] = None
+        for query_token in dict.fromkeys(tokenize(query)):
+            token_scores: Dict[int, float] = {}
+            for token, match in self._matching_tokens(query_token).items():
+                for document, weight in self.postings[token].items():
+                    score = match * weight
+                    if score > token_scores.get(document, 0):
+                        token_scores[document] = score
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {d: s + token_scores[d] for d, s in scores.items() if d in token_scores}
+            if not scores:
+                return []
+        if not scores:
+            return []
+        candidates = scores.items()
+        if predicate is not None:
+            candidates = [(d, s) for d, s in candidates if predicate(self.payloads[d])]
+        # Best score first; ties keep insertion order
+        best = heapq.nlargest(limit, candidates, key=lambda item: (item[1], -item[0]))
+        return [(self.payloads[document], round(score, 4)) for document, score in best]
@@ -0,0 +1,37 @@
+from functools import lru_cache
+from typing import Any, Type
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def type_adapter(type_: Type) -> TypeAdapter:
+    """
+    Shared ``TypeAdapter`` per type; building one compiles a validator and a
+    serializer, which is far more expensive than using it.
+    """
+    return TypeAdapter(type_)
+
+
+def to_json(value: Any, type_: Type) -> bytes:
+    """
+    Serialize ``value`` as ``type_`` straight to JSON bytes.
+
+    ORM rows are validated once through ``from_attributes``; instances that
+    already are ``type_`` (e.g. from the catalog cache) are passed through
+    without being validated again.
+    """
+    adapter = type_adapter(type_)
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+def json_response(value: Any, type_: Type, response: Response) -> Response:
+    """
+    Build the JSON response for ``value`` directly, skipping FastAPI's
+    ``response_model`` validation and its dict-then-``json.dumps`` encoding.
+    Headers set on the injected ``response`` (e.g. by dependencies) are kept.
+    """
+    result = Response(content=to_json(value, type_), media_type="application/json")
+    result.headers.raw.extend(response.headers.raw)
+    return result
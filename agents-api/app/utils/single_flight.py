@@ -0,0 +1,39 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Collapses concurrent identical async calls: while a call for a key is in
+    flight, further callers with the same key wait for it and share its
+    result (or exception) instead of starting their own.
+
+    The call runs in a task of its own, so a caller that is cancelled (e.g.
+    a client that disconnected) does not cancel it for the other waiters.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is not None:
+            self.coalesced += 1
+        else:
+            self.calls += 1
+            call = self._calls[key] = asyncio.ensure_future(fn())
+            call.add_done_callback(lambda _, key=key, call=call: self._forget(key, call))
+        return await asyncio.shield(call)
+
+    def _forget(self, key: Hashable, call: asyncio.Future):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Retrieve the exception so that a call nobody waits for any more
+        # does not log "exception was never retrieved"
+        if not call.cancelled():
+            call.exception()
+
+    def __len__(self) -> int:
+        return len(self._calls)
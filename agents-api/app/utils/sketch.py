@@ -0,0 +1,82 @@
+import math
+from typing import Dict, Iterable, Mapping, Optional
+
+from app.utils.lazy import lazy_import
+
+# Only the vectorized backfill needs it
+numpy = lazy_import("numpy")
+
+# Quantiles are estimated within 1% of the true value
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+
+# Latencies are in milliseconds; anything outside [MIN_VALUE, MAX_VALUE] is
+# counted in the first or last bucket
+MIN_VALUE = 0.01
+MAX_VALUE = 1e8
+MIN_INDEX = math.ceil(math.log(MIN_VALUE) / LOG_GAMMA)
+MAX_INDEX = math.ceil(math.log(MAX_VALUE) / LOG_GAMMA)
+
+
+def bucket_index(value: float) -> int:
+    """
+    Bucket of ``value``: bucket ``i`` holds values in
+    ``(GAMMA ** (i - 1), GAMMA ** i]``.
+    """
+    if value <= MIN_VALUE:
+        return MIN_INDEX
+    return min(MAX_INDEX, math.ceil(math.log(value) / LOG_GAMMA))
+
+
+def bucket_indices(values):
+    """
+    :func:`bucket_index` of every value of a NumPy array.
+    """
+    clipped = numpy.clip(numpy.asarray(values, dtype=numpy.float64), MIN_VALUE, MAX_VALUE)
+    return numpy.ceil(numpy.log(clipped) / LOG_GAMMA).astype(numpy.int64)
+
+
+def bucket_value(index: int) -> float:
+    # The point of the bucket with the least relative error to any value in it
+    return 2 * GAMMA ** index / (GAMMA + 1)
+
+
+class LatencySketch:
+    """
+    Mergeable latency distribution (a DDSketch with log-spaced buckets):
+    counts per bucket, so sketches of different models or time buckets merge
+    by adding counts and quantiles come out within ``RELATIVE_ACCURACY``.
+    """
+
+    def __init__(self, counts: Optional[Mapping[int, int]] = None):
+        self.counts: Dict[int, int] = dict(counts or {})
+
+    def add(self, value: float, count: int = 1):
+        self.add_count(bucket_index(value), count)
+
+    def add_count(self, index: int, count: int):
+        self.counts[index] = self.counts.get(index, 0) + count
+
+    def merge(self, other: "LatencySketch"):
+        for index, count in other.counts.items():
+            self.add_count(index, count)
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts.values())
+
+    def quantile(self, q: float) -> Optional[float]:
+        total = self.count
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen > rank:
+                return bucket_value(index)
+        return bucket_value(max(self.counts))
+
+    def quantiles(self, qs: Iterable[float]) -> Dict[float, Optional[float]]:
+        return {q: self.quantile(q) for q in qs}
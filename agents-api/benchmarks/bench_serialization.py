@@ -0,0 +1,108 @@
+"""Compare the generic and the fast serialization paths for catalog pages.
+
+Builds a ``Page[ModelProviderWithModels]`` of in-memory ORM rows (10,000
+models by default) and times turning it into a JSON body both ways:
+
+* ``generic``: what a ``response_model`` endpoint does without the fast path;
+  the service validates the rows, FastAPI dumps them to dicts, validates them
+  again against the response model, runs ``jsonable_encoder`` and
+  ``json.dumps``.
+* ``fast``: ``app.utils.serialization.to_json``; one ``from_attributes``
+  validation through a cached ``TypeAdapter`` and ``dump_json`` to bytes.
+
+    python -m benchmarks.bench_serialization --providers 100 --models-per-provider 100
+"""
+import argparse
+import json
+import statistics
+import time
+import uuid
+
+from fastapi.encoders import jsonable_encoder
+
+from app.models.model_provider import Model, ModelProvider, utcnow
+from app.schemas.model_provider import ModelProviderWithModels
+from app.schemas.pagination import Page
+from app.utils.pagination import CursorPage
+from app.utils.serialization import to_json
+
+PAGE_TYPE = Page[ModelProviderWithModels]
+
+
+def build_page(providers: int, models_per_provider: int) -> CursorPage:
+    now = utcnow()
+    items = []
+    for i in range(providers):
+        provider = ModelProvider(
+            id=uuid.uuid4(),
+            name=f"provider-{i}",
+            display_name=f"Provider {i}",
+            is_active=True,
+            created_at=now,
+            updated_at=now,
+        )
+        provider.models = [
+            Model(
+                id=uuid.uuid4(),
+                provider_id=provider.id,
+                name=f"model-{j}",
+                display_name=f"Model {j}",
+                model_type="chat",
+                context_window=128000,
+                is_active=True,
+                default_parameters={"temperature": 0.7, "top_p": 1.0},
+                created_at=now,
+                updated_at=now,
+            )
+            for j in range(models_per_provider)
+        ]
+        items.append(provider)
+    return CursorPage(items)
+
+
+def generic(page: CursorPage) -> bytes:
+    validated = PAGE_TYPE.model_validate(page, from_attributes=True)
+    revalidated = PAGE_TYPE.model_validate(validated.model_dump())
+    return json.dumps(jsonable_encoder(revalidated)).encode()
+
+
+def fast(page: CursorPage) -> bytes:
+    return to_json(page, PAGE_TYPE)
+
+
+def measure(serialize, page: CursorPage, rounds: int) -> dict:
+    serialize(page)  # warm up validators and adapters
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        body = serialize(page)
+        timings.append(time.perf_counter() - started)
+    return {
+        "rounds": rounds,
+        "bytes": len(body),
+        "median_ms": round(statistics.median(timings) * 1000, 2),
+        "min_ms": round(min(timings) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--providers", type=int, default=100)
+    parser.add_argument("--models-per-provider", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    page = build_page(args.providers, args.models_per_provider)
+    assert json.loads(generic(page)) == json.loads(fast(page))
+
+    results = {
+        "models": args.providers * args.models_per_provider,
+        "generic": measure(generic, page, args.rounds),
+        "fast": measure(fast, page, args.rounds),
+    }
+    results["speedup"] = round(results["generic"]["median_ms"] / results["fast"]["median_ms"], 2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
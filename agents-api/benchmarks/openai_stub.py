@@ -0,0 +1,178 @@
+"""Minimal OpenAI-compatible HTTP server for tests and benchmarks.
+
+Serves ``GET /v1/models``, ``POST /v1/chat/completions`` and
+``POST /v1/embeddings`` over plain HTTP/1.1 with keep-alive, after an
+artificial ``--latency-ms`` (plus up to ``--jitter-ms``) per request. It
+counts TCP connections, requests and the peak number of concurrent
+requests, so that client connection reuse and concurrency limits can be
+checked.
+
+    python -m benchmarks.openai_stub --port 8900 --latency-ms 50 --jitter-ms 20
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from http import HTTPStatus
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class OpenAIStub:
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        models: Tuple[str, ...] = ("stub-chat", "stub-embedding"),
+        seed: Optional[int] = None
+    ):
+        # Latency, jitter and status may be changed while the server runs
+        self.latency = latency
+        self.jitter = jitter
+        self.status = HTTPStatus.OK
+        self.host = host
+        self.port = port
+        self.models = models
+        self.rng = random.Random(seed)
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.connections = 0
+        self.requests = 0
+        self.concurrent = 0
+        self.max_concurrent = 0
+        self.authorization: List[Optional[str]] = []
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    async def start(self) -> "OpenAIStub":
+        self.server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def __aenter__(self) -> "OpenAIStub":
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                status, payload = await self._respond(method, target.split("?")[0], headers, body)
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(
+        self, method: str, path: str, headers: Dict[str, str], body: bytes
+    ) -> Tuple[HTTPStatus, Any]:
+        self.requests += 1
+        self.authorization.append(headers.get("authorization"))
+        self.concurrent += 1
+        self.max_concurrent = max(self.max_concurrent, self.concurrent)
+        try:
+            delay = self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            if delay:
+                await asyncio.sleep(delay)
+            if self.status != HTTPStatus.OK:
+                return self.status, {"error": {"message": self.status.phrase, "type": "stub_error"}}
+            request = json.loads(body) if body else {}
+
+            if method == "GET" and path == "/v1/models":
+                return HTTPStatus.OK, {
+                    "object": "list",
+                    "data": [
+                        {"id": model, "object": "model", "owned_by": "stub"}
+                        for model in self.models
+                    ],
+                }
+            if method == "POST" and path == "/v1/chat/completions":
+                messages = request.get("messages") or [{}]
+                content = messages[-1].get("content") or ""
+                return HTTPStatus.OK, {
+                    "id": f"chatcmpl-stub-{self.requests}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {
+                        "prompt_tokens": len(content.split()),
+                        "completion_tokens": len(content.split()),
+                        "total_tokens": 2 * len(content.split()),
+                    },
+                }
+            if method == "POST" and path == "/v1/embeddings":
+                inputs = request.get("input") or []
+                if isinstance(inputs, str):
+                    inputs = [inputs]
+                return HTTPStatus.OK, {
+                    "object": "list",
+                    "model": request.get("model"),
+                    "data": [
+                        {"object": "embedding", "index": i, "embedding": [float(len(text))] * 8}
+                        for i, text in enumerate(inputs)
+                    ],
+                }
+            return HTTPStatus.NOT_FOUND, {
+                "error": {"message": f"No route for {method} {path}", "type": "stub_error"}
+            }
+        finally:
+            self.concurrent -= 1
+
+
+async def serve(args):
+    stub = OpenAIStub(args.latency_ms / 1000, args.jitter_ms / 1000, args.host, args.port)
+    async with stub:
+        print(f"OpenAI-compatible stub listening on {stub.base_url}")
+        await stub.server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    asyncio.run(serve(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+import argparse
+
+import pytest
+
+from benchmarks.bench_routes import ROUTES, run
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_every_route_runs_against_a_seeded_catalog(tmp_path):
+    args = argparse.Namespace(
+        providers=6,
+        models_per_provider=2,
+        concurrency=2,
+        requests=3,
+        routes=None,
+        seed=0,
+        no_cache=False,
+    )
+
+    report = await run(f"sqlite:///{tmp_path / 'bench.db'}", args)
+
+    assert report["dialect"] == "sqlite"
+    assert set(report["routes"]) == {route.name for route in ROUTES}
+    for name, result in report["routes"].items():
+        assert result["errors"] == 0, name
+        assert result["p50_ms"] <= result["p99_ms"]
+        assert result["queries_per_request"] is not None, name
@@ -0,0 +1,85 @@
+import pytest
+
+from tests.test_model_provider_service import count_statements
+
+pytestmark = pytest.mark.anyio
+
+PROVIDERS_URL = "/api/v1/model-providers"
+BATCH_URL = f"{PROVIDERS_URL}/batch"
+UNKNOWN_ID = "00000000-0000-0000-0000-000000000000"
+
+
+async def seed(client):
+    response = await client.post(
+        f"{PROVIDERS_URL}/", json={"name": "openai", "display_name": "OpenAI"}
+    )
+    provider = response.json()
+    response = await client.post(
+        f"{PROVIDERS_URL}/{provider['id']}/models/bulk",
+        json={"models": [
+            {
+                "name": f"model-{i}",
+                "display_name": f"Model {i}",
+                "model_type": "chat",
+                "description": "A long description " * 50,
+                "default_parameters": {"temperature": 0.7},
+            }
+            for i in range(5)
+        ]},
+    )
+    return provider, [result["id"] for result in response.json()["results"]]
+
+
+async def test_batch_get_returns_models_and_providers_in_requested_order(client, db_session):
+    provider, model_ids = await seed(client)
+    requested = [model_ids[3], UNKNOWN_ID, model_ids[0], model_ids[3]]
+
+    with count_statements(db_session) as statements:
+        response = await client.get(
+            BATCH_URL, params={"model_ids": requested, "provider_ids": [provider["id"], UNKNOWN_ID]}
+        )
+    assert response.status_code == 200
+    batch = response.json()
+    assert [m["id"] for m in batch["models"]] == [model_ids[3], model_ids[0]]
+    assert batch["models"][0]["default_parameters"] == {"temperature": 0.7}
+    assert [p["name"] for p in batch["providers"]] == ["openai"]
+    assert batch["missing_model_ids"] == [UNKNOWN_ID]
+    assert batch["missing_provider_ids"] == [UNKNOWN_ID]
+    # The catalog version plus one IN query per kind
+    assert len(statements) == 3
+
+
+async def test_batch_get_sparse_fieldset_narrows_select_and_payload(client, db_session):
+    provider, model_ids = await seed(client)
+
+    with count_statements(db_session) as statements:
+        response = await client.get(
+            BATCH_URL,
+            params={
+                "model_ids": model_ids,
+                "provider_ids": provider["id"],
+                "fields": "name,context_window",
+            },
+        )
+    batch = response.json()
+    assert batch["models"][0].keys() == {"id", "provider_id", "name", "context_window"}
+    assert batch["providers"][0].keys() == {"id", "name"}
+    [models_select] = [sql for sql in statements if "FROM models" in sql and "IN" in sql]
+    assert "description" not in models_select
+    assert "default_parameters" not in models_select
+
+
+async def test_batch_get_rejects_bad_requests(client):
+    response = await client.get(BATCH_URL)
+    assert response.status_code == 400
+
+    response = await client.get(
+        BATCH_URL, params={"model_ids": UNKNOWN_ID, "fields": "name,api_key"}
+    )
+    assert response.status_code == 400
+
+    response = await client.get(BATCH_URL, params={"model_ids": "not-a-uuid"})
+    assert response.status_code == 422
+
+    response = await client.get(BATCH_URL, params={"model_ids": [UNKNOWN_ID] * 501})
+    assert response.status_code == 422
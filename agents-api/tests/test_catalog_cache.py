@@ -0,0 +1,164 @@
+import asyncio
+import time
+
+import fakeredis
+import pytest
+
+from app.schemas.model_provider import Model
+from app.utils.cache import MISSING, CatalogCache, LocalCache
+from app.utils.db import READ_AFTER_WRITE_SECONDS, RoutingSession
+
+pytestmark = pytest.mark.anyio
+
+PROVIDERS_URL = "/api/v1/model-providers"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def model_payload(name="gpt-4o"):
+    return {
+        "id": "00000000-0000-0000-0000-000000000001",
+        "provider_id": "00000000-0000-0000-0000-000000000002",
+        "name": name,
+        "display_name": name,
+        "model_type": "chat",
+        "created_at": "2026-01-01T00:00:00",
+        "updated_at": "2026-01-01T00:00:00",
+    }
+
+
+class CountingLoader:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+async def wait_for(condition, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not await condition():
+        assert asyncio.get_running_loop().time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+
+async def test_local_cache_evicts_least_recently_used_and_expired_entries():
+    clock = FakeClock()
+    cache = LocalCache(maxsize=2, ttl=10, clock=clock)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # evicts "b", the least recently used
+
+    assert cache.get("b") is MISSING
+    assert cache.evictions == 1
+
+    clock.now = 11
+    assert cache.get("a") is MISSING
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+async def test_catalog_cache_loads_once_and_shares_through_redis():
+    server = fakeredis.FakeServer()
+    worker_a = CatalogCache(redis=fakeredis.FakeAsyncRedis(server=server))
+    worker_b = CatalogCache(redis=fakeredis.FakeAsyncRedis(server=server))
+    loader = CountingLoader(model_payload())
+
+    first = await worker_a.get_or_load("models:1", Model, loader)
+    again = await worker_a.get_or_load("models:1", Model, loader)
+    shared = await worker_b.get_or_load("models:1", Model, loader)
+
+    assert loader.calls == 1
+    assert first is again
+    assert shared == first
+    assert worker_a.stats()["hits"] == 1
+    assert worker_b.stats()["redis_hits"] == 1
+
+
+async def test_catalog_cache_invalidation_reaches_other_workers(monkeypatch):
+    monkeypatch.setattr(RoutingSession, "last_write", float("-inf"))
+    server = fakeredis.FakeServer()
+    worker_a = CatalogCache(redis=fakeredis.FakeAsyncRedis(server=server))
+    worker_b = CatalogCache(redis=fakeredis.FakeAsyncRedis(server=server))
+    listener = asyncio.create_task(worker_b.listen())
+    try:
+        async def subscribed():
+            channels = await worker_a.redis.pubsub_numsub(worker_a.channel)
+            return channels[0][1] == 1
+
+        await wait_for(subscribed)
+        await worker_b.get_or_load("models:1", Model, CountingLoader(model_payload()))
+        assert len(worker_b.local) == 1
+
+        await worker_a.invalidate()
+
+        async def cleared():
+            return len(worker_b.local) == 0
+
+        await wait_for(cleared)
+        # The refill reads the primary, which has the other worker's write
+        assert time.monotonic() - RoutingSession.last_write < READ_AFTER_WRITE_SECONDS
+        loader = CountingLoader(model_payload("gpt-4o-mini"))
+        model = await worker_b.get_or_load("models:1", Model, loader)
+        assert loader.calls == 1
+        assert model.name == "gpt-4o-mini"
+    finally:
+        listener.cancel()
+
+
+async def test_catalog_cache_does_not_store_values_loaded_during_a_write():
+    cache = CatalogCache()
+
+    async def loader():
+        await cache.invalidate()
+        return model_payload()
+
+    await cache.get_or_load("models:1", Model, loader)
+
+    assert len(cache.local) == 0
+
+
+async def test_loads_racing_another_workers_write_are_not_stored_in_redis():
+    server = fakeredis.FakeServer()
+    worker_a = CatalogCache(redis=fakeredis.FakeAsyncRedis(server=server))
+    worker_b = CatalogCache(redis=fakeredis.FakeAsyncRedis(server=server))
+
+    async def stale_loader():
+        # Another worker writes (and invalidates) while this load runs; its
+        # message has not reached this worker yet
+        await worker_b.invalidate()
+        return model_payload()
+
+    await worker_a.get_or_load("models:1", Model, stale_loader)
+
+    assert await worker_a.redis.get("catalog:models:1") is None
+    loader = CountingLoader(model_payload("gpt-4o-mini"))
+    model = await worker_b.get_or_load("models:1", Model, loader)
+    assert (loader.calls, model.name) == (1, "gpt-4o-mini")
+    # Loads that did not race a write are stored as before
+    assert await worker_a.redis.get("catalog:models:1") is not None
+
+
+async def test_model_provider_reads_are_cached_until_a_write(client):
+    response = await client.post(
+        f"{PROVIDERS_URL}/", json={"name": "openai", "display_name": "OpenAI"}
+    )
+    provider_url = f"{PROVIDERS_URL}/{response.json()['id']}"
+
+    await client.get(provider_url)
+    await client.get(provider_url)
+    stats = (await client.get(f"{PROVIDERS_URL}/cache-stats")).json()
+    assert stats["hits"] == 2  # the catalog version and the provider
+
+    await client.put(provider_url, json={"display_name": "Open AI"})
+    response = await client.get(provider_url)
+    assert response.json()["display_name"] == "Open AI"
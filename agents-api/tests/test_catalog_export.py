@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+
+import pytest
+
+from app.repositories.model_provider_repository import ModelProviderRepository
+from app.services.model_provider_service import ModelService
+from tests.test_model_provider_service import seed_catalog
+
+pytestmark = pytest.mark.anyio
+
+EXPORT_URL = "/api/v1/model-providers/export"
+
+
+async def test_export_model_providers_as_ndjson(client, db_session):
+    await seed_catalog(db_session, providers=3, models_per_provider=1)
+
+    response = await client.get(f"{EXPORT_URL}/providers")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert 'filename="model-providers.ndjson"' in response.headers["content-disposition"]
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["name"] for row in rows] == ["provider-0", "provider-1", "provider-2"]
+    assert "models" not in rows[0]
+
+
+async def test_export_models_as_csv(client, db_session):
+    await seed_catalog(db_session, providers=2, models_per_provider=2)
+
+    response = await client.get(f"{EXPORT_URL}/models", params={"format": "csv"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert list(rows[0]) == list(ModelService.export_fields)
+    assert len(rows) == 4
+    assert {row["provider_name"] for row in rows} == {"provider-0", "provider-1"}
+    assert rows[0]["is_active"] == "true"
+    assert rows[0]["context_window"] == ""
+
+
+async def test_export_models_of_one_provider(client):
+    provider = (await client.post(
+        "/api/v1/model-providers/", json={"name": "openai", "display_name": "OpenAI"}
+    )).json()
+    await client.post(
+        f"/api/v1/model-providers/{provider['id']}/models",
+        json={
+            "provider_id": provider["id"],
+            "name": "gpt-4o",
+            "display_name": "GPT-4o",
+            "model_type": "chat",
+            "default_parameters": {"temperature": 0.2},
+        },
+    )
+    other = (await client.post(
+        "/api/v1/model-providers/", json={"name": "anthropic", "display_name": "Anthropic"}
+    )).json()
+
+    response = await client.get(f"{EXPORT_URL}/models", params={"provider_id": provider["id"]})
+    [row] = [json.loads(line) for line in response.text.splitlines()]
+    assert row["default_parameters"] == {"temperature": 0.2}
+
+    response = await client.get(
+        f"{EXPORT_URL}/models", params={"provider_id": other["id"], "format": "csv"}
+    )
+    assert response.text.splitlines() == [",".join(ModelService.export_fields)]
+
+
+async def test_export_rejects_unknown_format(client):
+    response = await client.get(f"{EXPORT_URL}/providers", params={"format": "xml"})
+    assert response.status_code == 422
+
+
+async def test_export_fetches_rows_in_batches(db_session):
+    await seed_catalog(db_session, providers=5, models_per_provider=0)
+
+    batches = [
+        len(rows) async for rows in ModelProviderRepository().export(db_session, batch_size=2)
+    ]
+
+    assert batches == [2, 2, 1]
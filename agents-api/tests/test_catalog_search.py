@@ -0,0 +1,103 @@
+import pytest
+
+from app.utils.search import InvertedIndex
+
+pytestmark = pytest.mark.anyio
+
+PROVIDERS_URL = "/api/v1/model-providers"
+SEARCH_URL = f"{PROVIDERS_URL}/search"
+
+
+async def test_inverted_index_ranks_exact_prefix_and_fuzzy_matches():
+    index = InvertedIndex({"name": 1.0, "description": 0.4})
+    index.add({"name": "gpt-4o", "description": "Flagship chat model"}, "gpt-4o")
+    index.add({"name": "gpt-4o-mini", "description": None}, "gpt-4o-mini")
+    index.add({"name": "claude-sonnet", "description": "Anthropic model, not gpt"}, "claude-sonnet")
+
+    assert [payload for payload, _ in index.search("gpt 4o", 10)] == ["gpt-4o", "gpt-4o-mini"]
+    assert [payload for payload, _ in index.search("clau", 10)] == ["claude-sonnet"]
+    assert [payload for payload, _ in index.search("sonet", 10)] == ["claude-sonnet"]
+    assert [payload for payload, _ in index.search("gpt", 10, lambda p: p != "gpt-4o")] == [
+        "gpt-4o-mini", "claude-sonnet"
+    ]
+    assert index.search("gpt llama", 10) == []
+
+
+async def seed(client):
+    providers = {}
+    for name, display_name in (("openai", "OpenAI"), ("anthropic", "Anthropic")):
+        response = await client.post(
+            f"{PROVIDERS_URL}/", json={"name": name, "display_name": display_name}
+        )
+        providers[name] = response.json()["id"]
+    for provider, name, model_type, context_window, description in (
+        ("openai", "gpt-4o", "chat", 128000, "Flagship multimodal model"),
+        ("openai", "text-embedding-3-small", "embedding", 8191, "Small embedding model"),
+        ("anthropic", "claude-sonnet-4", "chat", 200000, "Balanced model"),
+    ):
+        await client.post(
+            f"{PROVIDERS_URL}/{providers[provider]}/models",
+            json={
+                "provider_id": providers[provider],
+                "name": name,
+                "display_name": name.upper(),
+                "model_type": model_type,
+                "context_window": context_window,
+                "description": description,
+            },
+        )
+    return providers
+
+
+async def test_search_matches_models_and_providers(client):
+    await seed(client)
+
+    response = await client.get(SEARCH_URL, params={"q": "gpt"})
+    assert response.status_code == 200
+    [hit] = response.json()["models"]
+    assert (hit["name"], hit["provider_name"]) == ("gpt-4o", "openai")
+    assert hit["score"] > 0
+
+    response = await client.get(SEARCH_URL, params={"q": "antropic"})
+    assert [p["name"] for p in response.json()["providers"]] == ["anthropic"]
+
+    response = await client.get(SEARCH_URL, params={"q": "model"})
+    assert len(response.json()["models"]) == 3
+
+
+async def test_search_filters_models(client):
+    await seed(client)
+
+    response = await client.get(SEARCH_URL, params={"q": "model", "model_type": "chat"})
+    assert sorted(m["name"] for m in response.json()["models"]) == ["claude-sonnet-4", "gpt-4o"]
+
+    response = await client.get(SEARCH_URL, params={"q": "model", "min_context_window": 150000})
+    assert [m["name"] for m in response.json()["models"]] == ["claude-sonnet-4"]
+
+    response = await client.get(
+        SEARCH_URL, params={"q": "model", "max_context_window": 10000, "limit": 1}
+    )
+    assert [m["name"] for m in response.json()["models"]] == ["text-embedding-3-small"]
+
+
+async def test_search_sees_catalog_writes(client):
+    providers = await seed(client)
+    assert (await client.get(SEARCH_URL, params={"q": "o3"})).json()["models"] == []
+
+    await client.post(
+        f"{PROVIDERS_URL}/{providers['openai']}/models",
+        json={
+            "provider_id": providers["openai"],
+            "name": "o3",
+            "display_name": "o3",
+            "model_type": "chat",
+        },
+    )
+
+    response = await client.get(SEARCH_URL, params={"q": "o3"})
+    assert [m["name"] for m in response.json()["models"]] == ["o3"]
+
+
+async def test_search_requires_a_query(client):
+    response = await client.get(SEARCH_URL)
+    assert response.status_code == 422
@@ -0,0 +1,249 @@
+import pytest
+
+from app.api.v1.endpoints import routing
+from app.schemas.model_provider import ModelCreate, ModelProviderCreate
+from app.services.model_provider_service import ModelProviderService, ModelService
+from app.services.model_router import ModelRouter
+from app.services.provider_clients import ClientSettings, ProviderClientRegistry
+from app.utils.cache import MISSING, LocalCache
+from app.utils.completion_cache import (
+    CompletionCache,
+    DiskTier,
+    cache_enabled,
+    cache_ttl,
+    completion_key,
+    merge_parameters,
+)
+from benchmarks.openai_stub import OpenAIStub
+
+pytestmark = pytest.mark.anyio
+
+ROUTING_URL = "/api/v1/routing"
+PAYLOAD = {"messages": [{"role": "user", "content": "the same prompt again"}]}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_completion_key_is_canonical():
+    model_id = "0b6c2f6e-8b1b-4d8e-9a51-5f0f3a3c2e10"
+    request = merge_parameters(
+        {"temperature": 0.2, "cache": True}, {"messages": [{"role": "user", "content": "hi"}]}
+    )
+    assert "cache" not in request
+
+    reordered = {"messages": [{"content": "hi", "role": "user"}], "temperature": 0.2}
+    assert completion_key(model_id, request) == completion_key(model_id, reordered)
+    # The model name sent upstream does not matter, the model id does
+    assert completion_key(model_id, {**request, "model": "llama-3"}) == completion_key(
+        model_id, request
+    )
+    assert completion_key("another-model", request) != completion_key(model_id, request)
+    assert completion_key(model_id, {**request, "temperature": 0.3}) != completion_key(
+        model_id, request
+    )
+    assert completion_key(model_id, {**request, "tools": [{"type": "function"}]}) != completion_key(
+        model_id, request
+    )
+    # Request parameters override the model's defaults
+    assert merge_parameters({"temperature": 0.2}, {"temperature": 0.9})["temperature"] == 0.9
+
+
+def test_local_cache_evicts_by_size():
+    cache = LocalCache(maxsize=100, ttl=60, maxbytes=10)
+    cache.set("a", b"1234")
+    cache.set("b", b"1234")
+    cache.get("a")
+    cache.set("c", b"1234")
+
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == b"1234"
+    assert cache.bytes == 8
+    # Larger than the whole cache: not stored at all
+    cache.set("d", b"x" * 11)
+    assert cache.get("d") is MISSING
+    assert cache.bytes == 8
+
+
+def test_disk_tier_expires_evicts_and_persists(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "completions.db")
+    disk = DiskTier(path, max_bytes=10, clock=clock)
+    disk.set("a", b"1234", ttl=60)
+    disk.set("b", b"1234", ttl=5)
+
+    value, ttl = disk.get("a")
+    assert (value, ttl) == (b"1234", 60)
+    clock.now += 10
+    assert disk.get("b") is None
+    assert disk.bytes == 4
+
+    disk.set("c", b"1234", ttl=60)
+    clock.now += 1
+    disk.get("a")
+    disk.set("d", b"1234", ttl=60)
+    # "c" was read least recently
+    assert disk.get("c") is None
+    assert disk.evictions == 1
+    assert disk.count() == 2
+    disk.close()
+
+    reopened = DiskTier(path, max_bytes=10, clock=clock)
+    assert reopened.get("d")[0] == b"1234"
+    assert reopened.bytes == 8
+    reopened.close()
+
+
+def test_disk_tier_size_is_shared_by_the_processes_using_the_file(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "completions.db")
+    first = DiskTier(path, max_bytes=10, clock=clock)
+    second = DiskTier(path, max_bytes=10, clock=clock)
+    first.set("a", b"1234", ttl=60)
+    clock.now += 1
+    second.set("b", b"1234", ttl=60)
+    assert first.bytes == second.bytes == 8
+
+    # Over the limit only counting both workers' entries
+    clock.now += 1
+    first.set("c", b"1234", ttl=60)
+    assert first.get("a") is None
+    assert (first.evictions, first.count(), second.bytes) == (1, 2, 8)
+    # What stats report without touching the file
+    assert first.last_bytes == 8
+    first.close()
+    second.close()
+
+
+async def test_disk_hits_are_promoted_to_memory(tmp_path):
+    disk = DiskTier(str(tmp_path / "completions.db"))
+    cache = CompletionCache(disk=disk)
+    response = {"choices": [], "usage": {"total_tokens": 12}}
+    await cache.set("key", response)
+    cache.memory.clear()
+
+    assert await cache.get("key") == response
+    assert await cache.get("key") == response
+    assert await cache.get("other") is None
+    stats = cache.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 1)
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
+    assert stats["tokens_saved"] == 24
+    assert stats["bytes_saved"] > 0
+    assert stats["disk_bytes"] == disk.bytes > 0
+    cache.close()
+
+
+@pytest.fixture
+async def stub():
+    async with OpenAIStub() as stub:
+        yield stub
+
+
+@pytest.fixture
+async def router():
+    registry = ProviderClientRegistry(ClientSettings())
+    yield ModelRouter(clients=registry, response_cache=CompletionCache())
+    await registry.aclose()
+
+
+async def create_model(db, stub, name, default_parameters):
+    provider = await ModelProviderService().create(
+        db,
+        ModelProviderCreate(name=f"provider-{name}", display_name=name, api_base_url=stub.base_url),
+    )
+    return await ModelService().create(
+        db,
+        ModelCreate(
+            provider_id=provider.id,
+            name=name,
+            display_name=name,
+            model_type="chat",
+            context_window=8192,
+            default_parameters=default_parameters,
+        ),
+    )
+
+
+async def test_router_serves_repeated_requests_from_the_cache(
+    client, db_session, stub, router, monkeypatch
+):
+    monkeypatch.setattr(routing, "model_router", router)
+    monkeypatch.setattr(routing, "completion_cache", router.response_cache)
+    await create_model(db_session, stub, "llama-3", {"temperature": 0.2})
+
+    first = await router.route(db_session, "chat", PAYLOAD, name="llama-3")
+    second = await router.route(db_session, "chat", PAYLOAD, name="llama-3")
+
+    assert stub.requests == 1
+    assert (first.cached, second.cached) == (False, True)
+    assert second.attempts == 0
+    assert second.response == first.response
+    # Defaults are merged into the request, and into its key
+    await router.route(db_session, "chat", {**PAYLOAD, "temperature": 0.9}, name="llama-3")
+    await router.route(db_session, "chat", PAYLOAD, name="llama-3", cache=False)
+    await router.route(db_session, "chat", {**PAYLOAD, "stream": False, "n": 1}, name="llama-3")
+    assert stub.requests == 4
+
+    response = await client.get(f"{ROUTING_URL}/cache-stats")
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["hits"] == 1
+    assert stats["bytes_saved"] > 0
+    assert stats["tokens_saved"] == 8
+
+
+async def test_models_can_bypass_the_cache(db_session, stub, router):
+    await create_model(db_session, stub, "uncached", {"cache": False})
+
+    for _ in range(3):
+        result = await router.route(db_session, "chat", PAYLOAD, name="uncached")
+        assert result.cached is False
+
+    assert stub.requests == 3
+    stats = router.response_cache.stats()
+    assert (stats["hits"], stats["stores"], stats["bypasses"]) == (0, 0, 3)
+
+    assert cache_enabled({"cache": "false"}) is False
+    assert cache_enabled({"cache": "True"}) is True
+    assert cache_enabled({}) is True
+
+
+def test_invalid_cache_ttls_fall_back_to_the_default():
+    assert cache_ttl({"cache_ttl": 60}) == cache_ttl({"cache_ttl": "60"}) == 60.0
+    for ttl in (None, "1h", [60], True, 0, -5, "inf", "nan"):
+        assert cache_ttl({"cache_ttl": ttl}) is None
+    assert cache_ttl(None) is None
+
+
+async def test_cache_lookups_count_once_per_request(db_session, stub, router):
+    for i in range(5):
+        provider = await ModelProviderService().create(
+            db_session,
+            ModelProviderCreate(
+                name=f"provider-{i}", display_name=f"{i}", api_base_url=stub.base_url
+            ),
+        )
+        await ModelService().create(
+            db_session,
+            ModelCreate(
+                provider_id=provider.id,
+                name="shared",
+                display_name="Shared",
+                model_type="chat",
+                context_window=8192,
+            ),
+        )
+
+    for _ in range(3):
+        await router.route(db_session, "chat", PAYLOAD, name="shared", hedge=False)
+
+    # One lookup per request, not one per candidate
+    stats = router.response_cache.stats()
+    assert stats["hits"] + stats["misses"] == 3
+    assert stats["stores"] == stats["misses"]
@@ -0,0 +1,73 @@
+import pytest
+
+from tests.test_model_provider_service import count_statements
+
+pytestmark = pytest.mark.anyio
+
+PROVIDERS_URL = "/api/v1/model-providers"
+
+
+async def create_provider(client, name="openai"):
+    response = await client.post(f"{PROVIDERS_URL}/", json={"name": name, "display_name": name})
+    return response.json()
+
+
+@pytest.mark.parametrize(
+    "path", ["/", "/with-models", "/{id}", "/{id}/with-models", "/{id}/models"]
+)
+async def test_catalog_reads_answer_304_for_matching_etag(client, db_session, path):
+    provider = await create_provider(client)
+    url = PROVIDERS_URL + path.format(id=provider["id"])
+
+    response = await client.get(url)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert response.headers["last-modified"]
+
+    with count_statements(db_session) as statements:
+        response = await client.get(url, headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert statements == []
+
+
+async def test_etag_changes_when_catalog_changes(client):
+    provider = await create_provider(client)
+    url = f"{PROVIDERS_URL}/{provider['id']}/with-models"
+    etag = (await client.get(url)).headers["etag"]
+
+    await client.put(f"{PROVIDERS_URL}/{provider['id']}", json={"display_name": "Open AI"})
+
+    response = await client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["display_name"] == "Open AI"
+
+
+async def test_etag_differs_between_pages(client):
+    await create_provider(client, "a")
+    await create_provider(client, "b")
+
+    first = await client.get(f"{PROVIDERS_URL}/", params={"limit": 1})
+    response = await client.get(
+        f"{PROVIDERS_URL}/",
+        params={"limit": 1, "cursor": first.json()["next_cursor"]},
+        headers={"If-None-Match": first.headers["etag"]}
+    )
+    assert response.status_code == 200
+
+
+async def test_if_modified_since(client):
+    await create_provider(client)
+    response = await client.get(f"{PROVIDERS_URL}/")
+    last_modified = response.headers["last-modified"]
+
+    response = await client.get(f"{PROVIDERS_URL}/", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+
+    response = await client.get(
+        f"{PROVIDERS_URL}/", headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"}
+    )
+    assert response.status_code == 200
@@ -0,0 +1,222 @@
+import asyncio
+import re
+import uuid
+
+import fakeredis
+import pytest
+
+from app.api.v1.endpoints import executions
+from app.services.execution_stream import (
+    ExecutionStreamHub,
+    LocalBridge,
+    ProducerConflictError,
+    RedisBridge,
+)
+
+pytestmark = pytest.mark.anyio
+
+EXECUTIONS_URL = "/api/v1/executions"
+
+
+def event_ids(body: bytes):
+    return [int(seq) for seq in re.findall(rb"^id: (\d+)$", body, re.MULTILINE)]
+
+
+async def read_all(hub, execution_id, last_event_id=None):
+    chunks = []
+    async for chunk in hub.stream(execution_id, last_event_id):
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def viewers(hub, execution_id, count):
+    return [asyncio.ensure_future(read_all(hub, execution_id)) for _ in range(count)]
+
+
+async def test_one_producer_fans_out_to_every_viewer():
+    hub = ExecutionStreamHub()
+    tasks = viewers(hub, "run-1", 3)
+    await asyncio.sleep(0)
+
+    async with await hub.open("run-1") as publisher:
+        for i in range(5):
+            await publisher.send("message_stream", {"chunk": i})
+    bodies = await asyncio.gather(*tasks)
+
+    for body in bodies:
+        assert body.startswith(b"retry: 1000\n\n")
+        assert event_ids(body) == [1, 2, 3, 4, 5]
+    assert b'id: 2\nevent: message_stream\ndata: {"chunk":1}\n\n' in bodies[0]
+    # Each event is encoded once and queued for every viewer
+    assert hub.stats() == {
+        "executions": 1, "producers": 0, "subscribers": 0,
+        "published": 6, "delivered": 15, "dropped": 0, "replayed": 0,
+    }
+
+
+async def test_reconnecting_viewers_replay_from_the_ring_buffer():
+    hub = ExecutionStreamHub(buffer_size=4)
+    publisher = await hub.open("run-1")
+    for i in range(6):
+        await publisher.send("message", {"i": i})
+
+    subscriber, replay = await hub.subscribe("run-1", last_event_id=4)
+    assert event_ids(b"".join(replay)) == [5, 6]
+    # Only the latest events are kept
+    _, replay = await hub.subscribe("run-1")
+    assert event_ids(b"".join(replay)) == [3, 4, 5, 6]
+
+    await publisher.send("message", {"i": 6})
+    assert event_ids(b"".join(subscriber.pending)) == [7]
+    await publisher.close()
+    assert subscriber.finished
+
+    # A viewer joining a finished execution gets what is left and the end
+    assert event_ids(await read_all(hub, "run-1", last_event_id=5)) == [6, 7]
+
+
+async def test_a_stalled_viewer_is_dropped_without_blocking_the_others():
+    hub = ExecutionStreamHub(max_pending=2)
+    stalled, _ = await hub.subscribe("run-1")
+    reader = asyncio.ensure_future(read_all(hub, "run-1"))
+    await asyncio.sleep(0)
+
+    publisher = await hub.open("run-1")
+    for i in range(5):
+        await publisher.send("message", {"i": i})
+        await asyncio.sleep(0.01)
+    await publisher.close()
+
+    assert event_ids(await reader) == [1, 2, 3, 4, 5]
+    assert stalled.dropped
+    assert event_ids(b"".join(stalled.pending)) == [1, 2]
+    assert hub.dropped == 1
+    # It reconnects and resumes after the last event it got
+    _, replay = await hub.subscribe("run-1", last_event_id=2)
+    assert event_ids(b"".join(replay)) == [3, 4, 5]
+
+
+async def test_an_execution_has_one_producer_at_a_time():
+    hub = ExecutionStreamHub()
+    publisher = await hub.open("run-1")
+    await publisher.send("message")
+    with pytest.raises(ProducerConflictError):
+        await hub.open("run-1")
+    await publisher.close()
+
+    # A new producer continues the numbering
+    async with await hub.open("run-1") as publisher:
+        assert await publisher.send("message") == 3
+
+
+async def test_finished_executions_are_forgotten_after_the_retention():
+    hub = ExecutionStreamHub(retention=0)
+    async with await hub.open("run-1") as publisher:
+        await publisher.send("message")
+    tasks = viewers(hub, "run-2", 1)
+    await asyncio.sleep(0)
+    assert set(hub.channels) == {"run-2"}
+    tasks[0].cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    assert hub.channels == {}
+
+
+async def bridged_workers(bridges):
+    hubs = [ExecutionStreamHub(bridge=bridge) for bridge in bridges]
+    listeners = [asyncio.ensure_future(hub.listen()) for hub in hubs]
+    await asyncio.sleep(0.05)
+    return hubs, listeners
+
+
+async def check_bridged_workers(bridges):
+    (worker_a, worker_b), listeners = await bridged_workers(bridges)
+    try:
+        live = viewers(worker_b, "run-1", 2)
+        await asyncio.sleep(0.05)
+
+        publisher = await worker_a.open("run-1")
+        with pytest.raises(ProducerConflictError):
+            await worker_b.open("run-1")
+        for i in range(3):
+            await publisher.send("message", {"i": i})
+        await publisher.close()
+
+        for body in await asyncio.wait_for(asyncio.gather(*live), 5):
+            assert event_ids(body) == [1, 2, 3]
+        # Late viewers on another worker replay the shared history
+        assert event_ids(await read_all(worker_b, "run-1", last_event_id=1)) == [2, 3]
+        # Workers keep no state for executions nobody there watches
+        assert worker_a.channels == worker_b.channels == {}
+    finally:
+        for listener in listeners:
+            listener.cancel()
+        await asyncio.gather(*listeners, return_exceptions=True)
+
+
+async def test_events_cross_workers_through_the_local_bridge():
+    bridge = LocalBridge()
+    await check_bridged_workers([bridge, bridge])
+
+
+async def test_events_cross_workers_through_redis():
+    server = fakeredis.FakeServer()
+    await check_bridged_workers(
+        [RedisBridge(fakeredis.FakeAsyncRedis(server=server)) for _ in range(2)]
+    )
+
+
+async def test_sse_endpoint(client, monkeypatch):
+    hub = ExecutionStreamHub()
+    monkeypatch.setattr(executions, "execution_hub", hub)
+    execution_id = uuid.uuid4()
+    url = f"{EXECUTIONS_URL}/{execution_id}/events"
+
+    assert (await client.get(url)).status_code == 404
+
+    publisher = await hub.open(str(execution_id))
+    live = asyncio.ensure_future(client.get(url))
+    await asyncio.sleep(0.05)
+    async with publisher:
+        await publisher.send("message", {"content": "hi"})
+        await publisher.send("execution_complete", {})
+    response = await asyncio.wait_for(live, 5)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["cache-control"] == "no-cache"
+    assert event_ids(response.content) == [1, 2]
+
+    response = await client.get(url, headers={"Last-Event-ID": "1"})
+    assert event_ids(response.content) == [2]
+    assert b"event: execution_complete" in response.content
+    assert (await client.get(url, headers={"Last-Event-ID": "abc"})).status_code == 422
+
+    stats = (await client.get(f"{EXECUTIONS_URL}/stream-stats")).json()
+    assert stats["published"] == 3
+
+
+async def test_idle_viewers_are_disconnected():
+    hub = ExecutionStreamHub(keep_alive_interval=0.01, idle_timeout=0.05)
+    publisher = await hub.open("run-1")
+
+    body = await asyncio.wait_for(read_all(hub, "run-1"), 5)
+
+    assert body.startswith(b"retry: 1000\n\n")
+    assert b": keep-alive" in body
+    assert hub.stats()["subscribers"] == 0
+    await publisher.close()
+
+
+async def test_only_known_executions_exist():
+    bridge = LocalBridge()
+    worker_a, worker_b = ExecutionStreamHub(bridge=bridge), ExecutionStreamHub(bridge=bridge)
+    assert not await worker_b.exists("run-1")
+    await worker_a.open("run-1")
+    assert await worker_b.exists("run-1")
+
+    server = fakeredis.FakeServer()
+    redis_hub = ExecutionStreamHub(bridge=RedisBridge(fakeredis.FakeAsyncRedis(server=server)))
+    assert not await redis_hub.exists("run-1")
+    await redis_hub.open("run-1")
+    assert await ExecutionStreamHub(
+        bridge=RedisBridge(fakeredis.FakeAsyncRedis(server=server))
+    ).exists("run-1")
@@ -0,0 +1,165 @@
+import pytest
+from sqlalchemy import select, text
+
+from app.models.model_provider import Model
+from app.repositories.model_provider_repository import MODEL_FILTERS
+from app.utils.filtering import InvalidFilterError
+
+pytestmark = pytest.mark.anyio
+
+PROVIDERS_URL = "/api/v1/model-providers"
+MODELS_URL = f"{PROVIDERS_URL}/models"
+
+
+async def seed(client):
+    providers = {}
+    for name, display_name in (("openai", "OpenAI"), ("anthropic", "Anthropic")):
+        response = await client.post(
+            f"{PROVIDERS_URL}/", json={"name": name, "display_name": display_name}
+        )
+        providers[name] = response.json()["id"]
+    for provider, name, model_type, context_window, is_active in (
+        ("openai", "gpt-4o", "chat", 128000, True),
+        ("openai", "gpt-3.5-turbo", "chat", 16385, False),
+        ("openai", "text-embedding-3-small", "embedding", 8191, True),
+        ("anthropic", "claude-sonnet-4", "chat", 200000, True),
+        ("anthropic", "claude-haiku-3", "chat", 200000, True),
+    ):
+        await client.post(
+            f"{PROVIDERS_URL}/{providers[provider]}/models",
+            json={
+                "provider_id": providers[provider],
+                "name": name,
+                "display_name": name.upper(),
+                "model_type": model_type,
+                "context_window": context_window,
+                "is_active": is_active,
+            },
+        )
+    return providers
+
+
+def names(response):
+    assert response.status_code == 200, response.text
+    return [item["name"] for item in response.json()["items"]]
+
+
+async def test_filter_set_parses_operators_and_rejects_unknown_fields():
+    query = MODEL_FILTERS.parse(
+        {
+            "filter_context_window__gte": "8000",
+            "filter_model_type__in": "chat,embedding",
+            "limit": "10",
+        },
+        "-name",
+    )
+    assert query.filters == [
+        ("context_window", "gte", 8000),
+        ("model_type", "in", ("chat", "embedding")),
+    ]
+    assert (query.sort, query.descending) == ("name", True)
+    assert query.key() == MODEL_FILTERS.parse(
+        {"filter_model_type__in": "chat,embedding", "filter_context_window__gte": "8000"}, "-name"
+    ).key()
+
+    for params, sort in (
+        ({"filter_api_key_env_var": "X"}, None),
+        ({"filter_name__gt": "a"}, None),
+        ({"filter_context_window": "lots"}, None),
+        ({}, "description"),
+        ({}, "provider_name"),
+    ):
+        with pytest.raises(InvalidFilterError):
+            MODEL_FILTERS.parse(params, sort)
+
+
+async def test_list_models_filters_in_sql(client):
+    await seed(client)
+
+    response = await client.get(
+        MODELS_URL, params={"filter_model_type": "chat", "filter_is_active": "true"}
+    )
+    assert sorted(names(response)) == ["claude-haiku-3", "claude-sonnet-4", "gpt-4o"]
+
+    response = await client.get(MODELS_URL, params={"filter_context_window__lt": "20000"})
+    assert sorted(names(response)) == ["gpt-3.5-turbo", "text-embedding-3-small"]
+
+    response = await client.get(
+        MODELS_URL, params={"filter_provider_name": "openai", "filter_model_type__ne": "embedding"}
+    )
+    assert sorted(names(response)) == ["gpt-3.5-turbo", "gpt-4o"]
+
+    response = await client.get(
+        MODELS_URL, params={"filter_name__in": "gpt-4o,claude-haiku-3", "sort": "name"}
+    )
+    assert names(response) == ["claude-haiku-3", "gpt-4o"]
+
+
+async def test_list_models_sorts_descending_across_cursor_pages(client):
+    await seed(client)
+
+    response = await client.get(
+        MODELS_URL, params={"sort": "-name", "limit": 2, "include_total": True}
+    )
+    first = response.json()
+    assert names(response) == ["text-embedding-3-small", "gpt-4o"]
+    assert first["total"] == 5
+
+    seen = names(response)
+    cursor = first["next_cursor"]
+    while cursor:
+        response = await client.get(
+            MODELS_URL, params={"sort": "-name", "limit": 2, "cursor": cursor}
+        )
+        seen += names(response)
+        cursor = response.json()["next_cursor"]
+    assert seen == sorted(seen, reverse=True)
+    assert len(seen) == 5
+
+
+async def test_list_models_by_provider_and_providers_accept_filters(client):
+    providers = await seed(client)
+
+    response = await client.get(
+        f"{PROVIDERS_URL}/{providers['openai']}/models",
+        params={"filter_model_type": "chat", "sort": "-created_at"},
+    )
+    assert names(response) == ["gpt-3.5-turbo", "gpt-4o"]
+
+    response = await client.get(f"{PROVIDERS_URL}/", params={"sort": "display_name"})
+    assert names(response) == ["anthropic", "openai"]
+
+    response = await client.get(f"{PROVIDERS_URL}/with-models", params={"filter_name": "anthropic"})
+    assert names(response) == ["anthropic"]
+    assert len(response.json()["items"][0]["models"]) == 2
+
+
+async def test_list_rejects_unknown_filters_and_sorts(client):
+    await seed(client)
+
+    for params in (
+        {"filter_default_parameters": "x"},
+        {"filter_context_window__gte": "many"},
+        {"sort": "-description"},
+    ):
+        response = await client.get(MODELS_URL, params=params)
+        assert response.status_code == 400, params
+
+    response = await client.get(MODELS_URL, params={"sort": "name"})
+    cursor = response.json()["next_cursor"]
+    assert cursor is None
+    first = await client.get(MODELS_URL, params={"sort": "name", "limit": 1})
+    # A name cursor cannot be reused with the default created_at order
+    response = await client.get(
+        MODELS_URL, params={"limit": 1, "cursor": first.json()["next_cursor"]}
+    )
+    assert response.status_code == 400
+
+
+async def test_active_listing_uses_partial_index(db_session):
+    stmt = (
+        select(Model).filter(Model.is_active == True).order_by(Model.created_at, Model.id).limit(10)
+    )
+    sql = str(stmt.compile(db_session.bind, compile_kwargs={"literal_binds": True}))
+    plan = (await db_session.execute(text(f"EXPLAIN QUERY PLAN {sql}"))).all()
+    assert any("ix_models_active_created_at_id" in row[-1] for row in plan), plan
@@ -0,0 +1,131 @@
+import logging
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import select, text
+from sqlalchemy.exc import DBAPIError
+
+from app.models.model_provider import ModelProvider
+
+from app.utils.metrics import (
+    STARTED_KEY,
+    Histogram,
+    InstrumentationMiddleware,
+    fingerprint,
+    metrics,
+)
+
+pytestmark = pytest.mark.anyio
+
+PROVIDERS_URL = "/api/v1/model-providers"
+
+
+async def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+
+    samples = list(histogram.samples("latency", 'route="/"'))
+
+    assert samples[:3] == [
+        'latency_bucket{route="/",le="0.1"} 2',
+        'latency_bucket{route="/",le="1.0"} 3',
+        'latency_bucket{route="/",le="+Inf"} 4',
+    ]
+    assert samples[4] == 'latency_count{route="/"} 4'
+
+
+async def test_fingerprint_ignores_literals_and_parameter_counts():
+    assert fingerprint("SELECT * FROM models WHERE id IN (?, ?, ?) AND  name = 'x'") == (
+        "SELECT * FROM models WHERE id IN (...) AND name = ?"
+    )
+    assert fingerprint("SELECT * FROM models WHERE id IN ($1, $2) LIMIT 10") == (
+        "SELECT * FROM models WHERE id IN (...) LIMIT ?"
+    )
+
+
+async def test_requests_report_database_work_in_server_timing(client):
+    response = await client.post(
+        f"{PROVIDERS_URL}/", json={"name": "openai", "display_name": "OpenAI"}
+    )
+
+    assert response.headers["server-timing"].startswith("db;dur=")
+    assert 'desc="1 queries"' in response.headers["server-timing"]
+
+    response = await client.get(f"{PROVIDERS_URL}/{response.json()['id']}")
+    # catalog version, provider, its models
+    assert 'desc="3 queries"' in response.headers["server-timing"]
+
+
+async def test_metrics_endpoint_exposes_route_histograms(client):
+    await client.get(f"{PROVIDERS_URL}/")
+    await client.get(f"{PROVIDERS_URL}/00000000-0000-0000-0000-000000000000")
+
+    response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="/api/v1/model-providers/"} 1'
+        in body
+    )
+    assert (
+        'http_responses_total{method="GET",route="/api/v1/model-providers/{id}",status="404"} 1'
+        in body
+    )
+    assert "db_pool_checkout_wait_seconds_count" in body
+    assert "catalog_cache_misses" in body
+
+
+async def test_slow_requests_are_logged_with_sql_fingerprints(db_session, caplog):
+    app = FastAPI()
+
+    @app.get("/providers/{name}")
+    async def get_provider(name: str):
+        await db_session.execute(select(ModelProvider).filter(ModelProvider.name == name))
+        return {}
+
+    transport = ASGITransport(app=InstrumentationMiddleware(app, slow_request_seconds=0))
+    with caplog.at_level(logging.WARNING, logger="app.utils.metrics"):
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.get("/providers/openai")
+
+    [record] = caplog.records
+    message = record.getMessage()
+    assert "Slow request GET /providers/{name}" in message
+    assert "1 statements" in message
+    assert "FROM model_providers WHERE model_providers.name = ?" in message
+
+
+async def test_statement_timing_survives_failed_statements(db_session):
+    connection = await db_session.connection()
+    with pytest.raises(DBAPIError):
+        await connection.execute(text("SELECT * FROM no_such_table"))
+    await db_session.rollback()
+    connection = await db_session.connection()
+    assert not connection.info.get(STARTED_KEY)
+
+    statements = metrics.statements_total
+    await connection.execute(select(ModelProvider))
+    assert metrics.statements_total == statements + 1
+    assert not connection.info.get(STARTED_KEY)
+
+
+async def test_route_labels_are_the_route_templates():
+    app = FastAPI()
+
+    @app.get("/teams/{team}/members/{member}")
+    async def get_member(team: str, member: str):
+        return {}
+
+    transport = ASGITransport(app=InstrumentationMiddleware(app))
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        # Parameter values that are also literal segments of the path
+        await client.get("/teams/members/members/teams")
+        await client.get("/unknown")
+
+    body = metrics.render()
+    assert 'route="/teams/{team}/members/{member}",status="200"' in body
+    assert 'route="unmatched",status="404"' in body
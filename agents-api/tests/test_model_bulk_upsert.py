@@ -0,0 +1,75 @@
+import pytest
+
+from tests.test_model_provider_service import count_statements
+
+pytestmark = pytest.mark.anyio
+
+PROVIDERS_URL = "/api/v1/model-providers"
+
+
+def model_body(name, **overrides):
+    return {"name": name, "display_name": name.upper(), "model_type": "chat", **overrides}
+
+
+async def create_provider(client):
+    response = await client.post(
+        f"{PROVIDERS_URL}/", json={"name": "openai", "display_name": "OpenAI"}
+    )
+    return response.json()["id"]
+
+
+async def test_bulk_upsert_reports_created_updated_and_unchanged(client):
+    provider_id = await create_provider(client)
+    url = f"{PROVIDERS_URL}/{provider_id}/models/bulk"
+
+    response = await client.post(url, json={"models": [model_body("a"), model_body("b")]})
+    assert response.status_code == 200
+    first = response.json()
+    assert (first["created"], first["updated"], first["unchanged"]) == (2, 0, 0)
+
+    response = await client.post(url, json={"models": [
+        model_body("a"),
+        model_body("b", context_window=8192),
+        model_body("c"),
+    ]})
+    second = response.json()
+    assert [(r["name"], r["status"]) for r in second["results"]] == [
+        ("a", "unchanged"), ("b", "updated"), ("c", "created")
+    ]
+    assert second["results"][1]["id"] == first["results"][1]["id"]
+
+    response = await client.get(f"{PROVIDERS_URL}/{provider_id}/models")
+    models = {m["name"]: m for m in response.json()["items"]}
+    assert sorted(models) == ["a", "b", "c"]
+    assert models["b"]["context_window"] == 8192
+
+
+async def test_bulk_upsert_uses_a_fixed_number_of_statements(client, db_session):
+    provider_id = await create_provider(client)
+    url = f"{PROVIDERS_URL}/{provider_id}/models/bulk"
+    models = [model_body(f"model-{i}") for i in range(1000)]
+
+    with count_statements(db_session) as statements:
+        response = await client.post(url, json={"models": models})
+
+    assert response.json()["created"] == 1000
+    # provider lookup, existing-row SELECT and one INSERT per 500 rows
+    assert len(statements) <= 5
+
+
+async def test_bulk_upsert_rejects_duplicate_names(client):
+    provider_id = await create_provider(client)
+
+    response = await client.post(
+        f"{PROVIDERS_URL}/{provider_id}/models/bulk",
+        json={"models": [model_body("a"), model_body("a")]}
+    )
+    assert response.status_code == 400
+
+
+async def test_bulk_upsert_unknown_provider(client):
+    response = await client.post(
+        f"{PROVIDERS_URL}/00000000-0000-0000-0000-000000000000/models/bulk",
+        json={"models": [model_body("a")]}
+    )
+    assert response.status_code == 404
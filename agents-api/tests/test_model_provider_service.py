@@ -0,0 +1,103 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event, select
+
+from app.models.model_provider import ModelProvider, Model
+from app.repositories.model_provider_repository import ModelProviderRepository
+from app.services.model_provider_service import ModelProviderService
+
+pytestmark = pytest.mark.anyio
+
+
+async def seed_catalog(db, providers: int, models_per_provider: int, start: int = 0):
+    for i in range(start, start + providers):
+        provider = ModelProvider(name=f"provider-{i}", display_name=f"Provider {i}")
+        provider.models = [
+            Model(name=f"model-{j}", display_name=f"Model {j}", model_type="chat")
+            for j in range(models_per_provider)
+        ]
+        db.add(provider)
+    await db.commit()
+    db.expunge_all()
+
+
+@contextmanager
+def count_statements(db):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def test_get_all_with_models_uses_constant_number_of_queries(db_session):
+    repository = ModelProviderRepository()
+
+    await seed_catalog(db_session, providers=2, models_per_provider=2)
+    with count_statements(db_session) as small:
+        await repository.get_all_with_models(db_session)
+
+    await seed_catalog(db_session, providers=48, models_per_provider=20, start=2)
+    with count_statements(db_session) as large:
+        page = await repository.get_all_with_models(db_session)
+        assert sum(len(p.models) for p in page.items) == 2 * 2 + 48 * 20
+
+    assert len(large) == len(small) == 2
+
+
+async def test_get_all_with_models_does_not_cap_models_per_provider(db_session):
+    await seed_catalog(db_session, providers=1, models_per_provider=150)
+
+    page = await ModelProviderService().get_all_with_models(db_session)
+
+    assert len(page.items) == 1
+    assert len(page.items[0].models) == 150
+
+
+async def test_get_with_models_loads_models_eagerly(db_session):
+    await seed_catalog(db_session, providers=1, models_per_provider=3)
+    provider_id = await db_session.scalar(select(ModelProvider.id))
+    db_session.expunge_all()
+
+    with count_statements(db_session) as statements:
+        provider = await ModelProviderRepository().get_with_models(db_session, provider_id)
+        assert len(provider.models) == 3
+
+    assert len(statements) == 2
+
+
+async def test_get_all_pages_through_every_provider_once(db_session):
+    await seed_catalog(db_session, providers=25, models_per_provider=0)
+    service = ModelProviderService()
+
+    seen, cursor = [], None
+    while True:
+        page = await service.get_all(db_session, cursor=cursor, limit=10)
+        seen.extend(p.name for p in page.items)
+        if page.next_cursor is None:
+            break
+        cursor = page.next_cursor
+        # Rows inserted while paging must not make later pages repeat rows
+        await seed_catalog(db_session, providers=1, models_per_provider=0, start=100 + len(seen))
+
+    assert len(seen) == len(set(seen))
+    assert {f"provider-{i}" for i in range(25)} <= set(seen)
+    assert page.total is None
+
+
+async def test_get_all_counts_total_only_when_asked(db_session):
+    await seed_catalog(db_session, providers=3, models_per_provider=0)
+
+    with count_statements(db_session) as statements:
+        page = await ModelProviderService().get_all(db_session, limit=2, include_total=True)
+
+    assert page.total == 3
+    assert len(page.items) == 2
+    assert len(statements) == 3
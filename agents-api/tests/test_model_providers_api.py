@@ -0,0 +1,140 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+PROVIDERS_URL = "/api/v1/model-providers"
+
+
+async def create_provider(client, name="openai"):
+    response = await client.post(
+        f"{PROVIDERS_URL}/", json={"name": name, "display_name": name.title()}
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+async def create_model(client, provider_id, name="gpt-4o"):
+    response = await client.post(
+        f"{PROVIDERS_URL}/{provider_id}/models",
+        json={
+            "provider_id": provider_id,
+            "name": name,
+            "display_name": name.upper(),
+            "model_type": "chat",
+            "context_window": 128000,
+        },
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+async def test_create_and_get_model_provider(client):
+    provider = await create_provider(client)
+    assert provider["models"] == []
+
+    response = await client.get(f"{PROVIDERS_URL}/{provider['id']}")
+    assert response.status_code == 200
+    assert response.json()["name"] == "openai"
+
+
+async def test_create_duplicate_model_provider(client):
+    await create_provider(client)
+
+    response = await client.post(
+        f"{PROVIDERS_URL}/", json={"name": "openai", "display_name": "OpenAI"}
+    )
+    assert response.status_code == 400
+
+
+async def test_get_model_providers_with_models(client):
+    provider = await create_provider(client)
+    await create_model(client, provider["id"], "gpt-4o")
+    await create_model(client, provider["id"], "gpt-4o-mini")
+
+    response = await client.get(f"{PROVIDERS_URL}/with-models")
+    assert response.status_code == 200
+    [body] = response.json()["items"]
+    assert sorted(m["name"] for m in body["models"]) == ["gpt-4o", "gpt-4o-mini"]
+
+    response = await client.get(f"{PROVIDERS_URL}/{provider['id']}/with-models")
+    assert response.status_code == 200
+    assert len(response.json()["models"]) == 2
+
+
+async def test_get_model_providers_paginates_with_cursor(client):
+    for i in range(5):
+        await create_provider(client, f"provider-{i}")
+
+    response = await client.get(f"{PROVIDERS_URL}/", params={"limit": 3, "include_total": True})
+    assert response.status_code == 200
+    first = response.json()
+    assert [p["name"] for p in first["items"]] == ["provider-0", "provider-1", "provider-2"]
+    assert first["total"] == 5
+
+    response = await client.get(
+        f"{PROVIDERS_URL}/", params={"limit": 3, "cursor": first["next_cursor"]}
+    )
+    second = response.json()
+    assert [p["name"] for p in second["items"]] == ["provider-3", "provider-4"]
+    assert second["next_cursor"] is None
+    assert second["total"] is None
+
+
+async def test_get_model_providers_rejects_invalid_cursor(client):
+    response = await client.get(f"{PROVIDERS_URL}/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+async def test_get_models_by_provider_paginates_with_cursor(client):
+    provider = await create_provider(client)
+    for name in ["a", "b", "c"]:
+        await create_model(client, provider["id"], name)
+
+    response = await client.get(f"{PROVIDERS_URL}/{provider['id']}/models", params={"limit": 2})
+    first = response.json()
+    assert [m["name"] for m in first["items"]] == ["a", "b"]
+
+    response = await client.get(
+        f"{PROVIDERS_URL}/{provider['id']}/models",
+        params={"limit": 2, "cursor": first["next_cursor"]},
+    )
+    assert [m["name"] for m in response.json()["items"]] == ["c"]
+
+
+async def test_update_model_provider(client):
+    provider = await create_provider(client)
+    await create_model(client, provider["id"])
+
+    response = await client.put(
+        f"{PROVIDERS_URL}/{provider['id']}", json={"display_name": "Open AI"}
+    )
+    assert response.status_code == 200
+    assert response.json()["display_name"] == "Open AI"
+    assert len(response.json()["models"]) == 1
+
+
+async def test_update_and_delete_model(client):
+    provider = await create_provider(client)
+    model = await create_model(client, provider["id"])
+    model_url = f"{PROVIDERS_URL}/{provider['id']}/models/{model['id']}"
+
+    response = await client.put(model_url, json={"context_window": 8192})
+    assert response.status_code == 200
+    assert response.json()["context_window"] == 8192
+
+    response = await client.delete(model_url)
+    assert response.status_code == 200
+
+    response = await client.get(model_url)
+    assert response.status_code == 404
+
+
+async def test_delete_model_provider(client):
+    provider = await create_provider(client)
+    await create_model(client, provider["id"])
+
+    response = await client.delete(f"{PROVIDERS_URL}/{provider['id']}")
+    assert response.status_code == 200
+
+    response = await client.get(f"{PROVIDERS_URL}/{provider['id']}")
+    assert response.status_code == 404
@@ -0,0 +1,235 @@
+import asyncio
+from collections import Counter
+from http import HTTPStatus
+from uuid import UUID
+
+import httpx
+import pytest
+
+from app.api.v1.endpoints import routing
+from app.schemas.model_provider import ModelCreate, ModelProviderCreate, ModelProviderUpdate
+from app.services.model_provider_service import ModelProviderService, ModelService
+from app.services.model_router import ModelRouter, estimate_prompt_tokens
+from app.services.provider_clients import ClientSettings, ProviderClientRegistry
+from app.utils.completion_cache import CompletionCache
+from benchmarks.openai_stub import OpenAIStub
+
+pytestmark = pytest.mark.anyio
+
+ROUTING_URL = "/api/v1/routing"
+PAYLOAD = {"messages": [{"role": "user", "content": "hello"}]}
+
+
+@pytest.fixture
+async def stubs():
+    # The same logical model behind three providers of skewed latency
+    stubs = [OpenAIStub(latency=latency) for latency in (0.005, 0.03, 0.1)]
+    for stub in stubs:
+        await stub.start()
+    yield stubs
+    for stub in stubs:
+        await stub.stop()
+
+
+@pytest.fixture
+async def providers(db_session, stubs):
+    providers = []
+    for i, stub in enumerate(stubs):
+        provider = await ModelProviderService().create(
+            db_session,
+            ModelProviderCreate(
+                name=f"provider-{i}", display_name=f"Provider {i}", api_base_url=stub.base_url
+            ),
+        )
+        await ModelService().create(
+            db_session,
+            ModelCreate(
+                provider_id=provider.id,
+                name="llama-3",
+                display_name="Llama 3",
+                model_type="chat",
+                context_window=8192,
+            ),
+        )
+        providers.append(provider.id)
+    return providers
+
+
+@pytest.fixture
+async def router():
+    registry = ProviderClientRegistry(ClientSettings())
+    yield ModelRouter(clients=registry, cooldown=60.0, response_cache=CompletionCache())
+    await registry.aclose()
+
+
+async def route_many(router, db, count, **kwargs):
+    chosen = Counter()
+    for _ in range(count):
+        result = await router.route(db, "chat", PAYLOAD, name="llama-3", cache=False, **kwargs)
+        chosen[result.provider_id] += 1
+    return chosen
+
+
+async def warm_up(router, db):
+    """
+    Open a connection to every provider, then forget what was measured: a
+    first request also pays for connecting, which can make the fastest
+    provider look slower than the others for good.
+    """
+    await route_many(router, db, 3, hedge=False)
+    router.stats.clear()
+
+
+async def test_router_prefers_the_fastest_provider_and_fails_over(
+    db_session, stubs, providers, router
+):
+    fast, medium, slow = providers
+    await warm_up(router, db_session)
+
+    chosen = await route_many(router, db_session, 40, hedge=False)
+    # Every candidate is measured once, then the fastest one takes the traffic
+    assert set(chosen) == set(providers)
+    assert chosen[fast] >= 36
+
+    stubs[0].status = HTTPStatus.SERVICE_UNAVAILABLE
+    for _ in range(3):
+        result = await router.route(
+            db_session, "chat", PAYLOAD, name="llama-3", hedge=False, cache=False
+        )
+        assert (result.provider_id, result.attempts) == (medium, 2)
+
+    # Three failures in a row: the fast provider is skipped until its cooldown ends
+    result = await router.route(
+        db_session, "chat", PAYLOAD, name="llama-3", hedge=False, cache=False
+    )
+    assert (result.provider_id, result.attempts) == (medium, 1)
+    scores = {score["provider_id"]: score for score in router.scores()}
+    assert scores[fast]["healthy"] is False
+    assert scores[fast]["failures"] == 3
+    assert scores[medium]["latency_ms"] < scores[slow]["latency_ms"]
+
+
+async def test_router_hedges_slow_requests(db_session, stubs, providers, router):
+    fast, medium, _ = providers
+    await warm_up(router, db_session)
+    await route_many(router, db_session, 10, hedge=False)
+
+    [fast_stats] = [stats for stats in router.stats.values() if stats.provider_id == fast]
+    requests, failures = fast_stats.requests, fast_stats.failures
+
+    stubs[0].latency = 0.5
+    result = await router.route(db_session, "chat", PAYLOAD, name="llama-3", cache=False)
+
+    assert result.hedged is True
+    assert result.provider_id == medium
+    assert result.latency_ms < 300
+    assert result.response["choices"][0]["message"]["content"] == "hello"
+    # The abandoned attempt is neither a sample nor a failure
+    assert fast_stats.in_flight == 0
+    assert (fast_stats.requests, fast_stats.failures) == (requests, failures)
+
+
+async def test_non_json_answers_fail_over(db_session, stubs, providers, router, monkeypatch):
+    fast = providers[0]
+    get_client = router.clients.get
+    broken = httpx.AsyncClient(
+        transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, text="<html>maintenance</html>")
+        ),
+        base_url="http://broken",
+    )
+
+    async def get(db, provider_id):
+        return broken if provider_id == fast else await get_client(db, provider_id)
+
+    monkeypatch.setattr(router.clients, "get", get)
+    for _ in range(4):
+        result = await router.route(
+            db_session, "chat", PAYLOAD, name="llama-3", hedge=False, cache=False
+        )
+        assert result.provider_id != fast
+
+    [fast_stats] = [stats for stats in router.stats.values() if stats.provider_id == fast]
+    assert fast_stats.failures >= 1
+    await broken.aclose()
+
+
+async def test_router_only_considers_active_models_that_fit(
+    client, db_session, stubs, providers, router, monkeypatch
+):
+    monkeypatch.setattr(routing, "model_router", router)
+    small = await ModelProviderService().create(
+        db_session,
+        ModelProviderCreate(name="small", display_name="Small", api_base_url=stubs[0].base_url),
+    )
+    await ModelService().create(
+        db_session,
+        ModelCreate(
+            provider_id=small.id,
+            name="llama-3",
+            display_name="Llama 3",
+            model_type="chat",
+            context_window=2048,
+        ),
+    )
+    await ModelProviderService().update(
+        db_session, providers[2], ModelProviderUpdate(is_active=False)
+    )
+
+    response = await client.get(
+        f"{ROUTING_URL}/candidates",
+        params={"model_type": "chat", "name": "llama-3", "min_context_window": 4000},
+    )
+    assert response.status_code == 200
+    assert {c["provider_id"] for c in response.json()} == {str(providers[0]), str(providers[1])}
+
+    long_prompt = {"messages": [{"role": "user", "content": "x" * 16000}], "max_tokens": 500}
+    assert estimate_prompt_tokens(long_prompt) == 4500
+    response = await client.post(
+        f"{ROUTING_URL}/chat", json={"name": "llama-3", "payload": long_prompt}
+    )
+    assert response.status_code == 200
+    assert response.json()["provider_id"] in {str(providers[0]), str(providers[1])}
+
+    response = await client.post(
+        f"{ROUTING_URL}/chat",
+        json={"name": "llama-3", "payload": PAYLOAD, "min_context_window": 100000},
+    )
+    assert response.status_code == 404
+
+    # An unknown context window does not rule a model out
+    unknown = await ModelProviderService().create(
+        db_session,
+        ModelProviderCreate(name="unknown", display_name="Unknown", api_base_url=stubs[0].base_url),
+    )
+    await ModelService().create(
+        db_session,
+        ModelCreate(
+            provider_id=unknown.id, name="llama-3", display_name="Llama 3", model_type="chat"
+        ),
+    )
+    response = await client.get(
+        f"{ROUTING_URL}/candidates",
+        params={"model_type": "chat", "name": "llama-3", "min_context_window": 4000},
+    )
+    assert unknown.id in {UUID(c["provider_id"]) for c in response.json()}
+
+    response = await client.get(f"{ROUTING_URL}/scores")
+    assert response.status_code == 200
+    assert all(score["requests"] <= 1 for score in response.json())
+
+
+async def test_candidates_share_one_catalog_load_across_prompt_sizes(
+    db_session, providers, router
+):
+    cache = router.model_service.cache
+    await router.candidates(db_session, "chat", name="llama-3")
+    loads = cache.stats()["loads"]
+
+    for min_context_window in (100, 4000, 8192, 100000):
+        candidates = await router.candidates(
+            db_session, "chat", name="llama-3", min_context_window=min_context_window
+        )
+        assert len(candidates) == (3 if min_context_window <= 8192 else 0)
+
+    assert cache.stats()["loads"] == loads
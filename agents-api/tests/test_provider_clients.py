@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from app.schemas.model_provider import ModelCreate, ModelProviderCreate, ModelProviderUpdate
+from app.services.model_provider_service import ModelProviderService, ModelService
+from app.services.provider_clients import (
+    ClientSettings,
+    ProviderClientRegistry,
+    ProviderUnavailableError,
+)
+from benchmarks.openai_stub import OpenAIStub
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def stub():
+    async with OpenAIStub() as stub:
+        yield stub
+
+
+@pytest.fixture
+async def registry():
+    registry = ProviderClientRegistry(ClientSettings(max_concurrency=2))
+    yield registry
+    await registry.aclose()
+
+
+async def create_provider(db, base_url, name="local"):
+    return await ModelProviderService().create(
+        db,
+        ModelProviderCreate(
+            name=name, display_name=name, api_base_url=base_url, api_key_env_var="STUB_API_KEY"
+        ),
+    )
+
+
+async def test_client_keeps_connections_alive_and_sends_api_key(
+    db_session, stub, registry, monkeypatch
+):
+    monkeypatch.setenv("STUB_API_KEY", "sk-test")
+    provider = await create_provider(db_session, stub.base_url)
+
+    for i in range(10):
+        client = await registry.get(db_session, provider.id)
+        completion = await client.post_json(
+            "chat/completions",
+            {"model": "stub-chat", "messages": [{"role": "user", "content": f"hi {i}"}]},
+        )
+        assert completion["choices"][0]["message"]["content"] == f"hi {i}"
+
+    assert stub.requests == 10
+    assert stub.connections == 1
+    assert set(stub.authorization) == {"Bearer sk-test"}
+    assert registry.builds == 1
+
+
+async def test_client_caps_concurrent_requests_per_provider(db_session, stub, registry):
+    stub.latency = 0.05
+    provider = await create_provider(db_session, stub.base_url)
+    client = await registry.get(db_session, provider.id)
+
+    responses = await asyncio.gather(*(client.request("GET", "models") for _ in range(6)))
+
+    assert [response.status_code for response in responses] == [200] * 6
+    assert stub.max_concurrent == 2
+    assert stub.connections == 2
+    assert client.pending == client.in_flight == 0
+
+
+async def test_registry_rebuilds_clients_when_the_provider_changes(db_session, stub, registry):
+    service = ModelProviderService()
+    provider = await create_provider(db_session, stub.base_url)
+    client = await registry.get(db_session, provider.id)
+
+    # Unrelated catalog writes keep the client and its connections
+    await ModelService().create(
+        db_session,
+        ModelCreate(
+            provider_id=provider.id, name="stub-chat", display_name="Stub", model_type="chat"
+        ),
+    )
+    assert await registry.get(db_session, provider.id) is client
+
+    async with OpenAIStub() as moved:
+        await service.update(
+            db_session, provider.id, ModelProviderUpdate(api_base_url=moved.base_url)
+        )
+        rebuilt = await registry.get(db_session, provider.id)
+        assert rebuilt is not client
+        await rebuilt.request("GET", "models")
+        assert (moved.requests, stub.requests) == (1, 0)
+
+    await service.update(db_session, provider.id, ModelProviderUpdate(is_active=False))
+    with pytest.raises(ProviderUnavailableError):
+        await registry.get(db_session, provider.id)
+    await asyncio.sleep(0)
+    assert rebuilt.http.is_closed
+    assert registry.gauges() == {}
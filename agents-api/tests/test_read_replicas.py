@@ -0,0 +1,96 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import exc, select
+
+from app.api import deps
+from app.main import app
+from app.models.base import Base
+from app.models.model_provider import ModelProvider
+from app.utils import db as db_module
+from app.utils.db import RoutingSession, create_db_engine, routing_sessionmaker
+from app.utils.metrics import TimedQueuePool, metrics
+
+pytestmark = pytest.mark.anyio
+
+PROVIDERS_URL = "/api/v1/model-providers"
+
+
+@pytest.fixture
+async def engines(tmp_path, monkeypatch):
+    # Two SQLite files stand in for the primary and a replica; the replica is
+    # seeded with its own row so that tests can tell where a read went
+    primary = create_db_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_db_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for engine, name in ((primary, "on-primary"), (replica, "on-replica")):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with routing_sessionmaker(engine)() as session:
+            session.add(ModelProvider(name=name, display_name=name))
+            await session.commit()
+    monkeypatch.setattr(RoutingSession, "last_write", float("-inf"))
+    yield primary, replica
+    await primary.dispose()
+    await replica.dispose()
+
+
+async def provider_names(session):
+    return (await session.scalars(select(ModelProvider.name))).all()
+
+
+async def test_reads_go_to_the_replica_only_when_allowed(engines):
+    SessionLocal = routing_sessionmaker(*engines[:1], engines[1:])
+
+    async with SessionLocal(info={"use_replica": True}) as session:
+        assert await provider_names(session) == ["on-replica"]
+    async with SessionLocal() as session:
+        assert await provider_names(session) == ["on-primary"]
+
+
+async def test_reads_after_a_write_go_to_the_primary(engines, monkeypatch):
+    SessionLocal = routing_sessionmaker(*engines[:1], engines[1:])
+
+    async with SessionLocal(info={"use_replica": True}) as session:
+        session.add(ModelProvider(name="written", display_name="Written"))
+        await session.commit()
+        assert sorted(await provider_names(session)) == ["on-primary", "written"]
+
+    # Other sessions stay on the primary until replicas had time to catch up
+    async with SessionLocal(info={"use_replica": True}) as session:
+        assert "written" in await provider_names(session)
+
+    monkeypatch.setattr(RoutingSession, "last_write", float("-inf"))
+    async with SessionLocal(info={"use_replica": True}) as session:
+        assert await provider_names(session) == ["on-replica"]
+
+
+async def test_get_requests_read_from_the_replica(engines, monkeypatch):
+    monkeypatch.setattr(deps, "AsyncSessionLocal", routing_sessionmaker(engines[0], engines[1:]))
+    monkeypatch.setattr(db_module, "READ_AFTER_WRITE_SECONDS", 0)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get(f"{PROVIDERS_URL}/")
+        assert [p["name"] for p in response.json()["items"]] == ["on-replica"]
+
+        response = await client.post(
+            f"{PROVIDERS_URL}/", json={"name": "on-replica", "display_name": "x"}
+        )
+        assert response.status_code == 200  # the name is only taken on the replica
+
+
+async def test_pool_settings_and_checkout_timeouts(tmp_path):
+    engine = create_db_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", pool_size=1, max_overflow=0, pool_timeout=0.01
+    )
+    pool = engine.sync_engine.pool
+    assert isinstance(pool, TimedQueuePool)
+    assert pool.size() == 1
+
+    try:
+        async with engine.connect():
+            with pytest.raises(exc.TimeoutError):
+                async with engine.connect():
+                    pass
+        assert metrics.pool_timeouts == 1
+        assert metrics.pool_wait.count == 2
+    finally:
+        await engine.dispose()
@@ -0,0 +1,46 @@
+import json
+
+import pytest
+from fastapi import Response
+
+from app.utils.serialization import json_response, to_json, type_adapter
+from benchmarks.bench_serialization import PAGE_TYPE, build_page, generic
+
+pytestmark = pytest.mark.anyio
+
+PROVIDERS_URL = "/api/v1/model-providers"
+
+
+async def test_to_json_matches_the_generic_response_path():
+    page = build_page(providers=3, models_per_provider=4)
+
+    assert json.loads(to_json(page, PAGE_TYPE)) == json.loads(generic(page))
+
+
+async def test_schema_instances_are_not_validated_again():
+    adapter = type_adapter(PAGE_TYPE)
+    page = adapter.validate_python(build_page(1, 2), from_attributes=True)
+
+    assert adapter is type_adapter(PAGE_TYPE)
+    assert adapter.validate_python(page, from_attributes=True) is page
+
+
+async def test_json_response_keeps_headers_set_by_dependencies():
+    response = Response()
+    response.headers["ETag"] = '"abc"'
+
+    result = json_response(build_page(1, 1), PAGE_TYPE, response)
+
+    assert result.headers["etag"] == '"abc"'
+    assert result.headers["content-type"] == "application/json"
+    assert int(result.headers["content-length"]) == len(result.body)
+
+
+async def test_catalog_reads_serialize_like_the_response_model(client):
+    provider = (
+        await client.post(f"{PROVIDERS_URL}/", json={"name": "openai", "display_name": "OpenAI"})
+    ).json()
+
+    response = await client.get(f"{PROVIDERS_URL}/{provider['id']}")
+
+    assert response.json() == provider
@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.schemas.model_provider import Model
+from app.utils.cache import CatalogCache, catalog_cache
+from app.utils.single_flight import SingleFlight
+from tests.test_catalog_cache import model_payload
+from tests.test_model_provider_service import count_statements
+
+pytestmark = pytest.mark.anyio
+
+PROVIDERS_URL = "/api/v1/model-providers"
+CONCURRENCY = 50
+
+
+class SlowLoader:
+    def __init__(self, value, delay=0.05):
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if isinstance(self.value, Exception):
+            raise self.value
+        return self.value
+
+
+async def test_concurrent_identical_loads_share_one_call():
+    cache = CatalogCache()
+    loader = SlowLoader(model_payload())
+
+    models = await asyncio.gather(
+        *(cache.get_or_load("models:1", Model, loader) for _ in range(CONCURRENCY))
+    )
+
+    assert loader.calls == 1
+    assert all(model == models[0] for model in models)
+    assert (cache.flights.calls, cache.flights.coalesced) == (1, CONCURRENCY - 1)
+    assert len(cache.flights) == 0
+
+
+async def test_failed_loads_fail_every_waiter_and_are_retried():
+    cache = CatalogCache()
+    failing = SlowLoader(RuntimeError("database went away"))
+
+    results = await asyncio.gather(
+        *(cache.get_or_load("models:1", Model, failing) for _ in range(10)), return_exceptions=True
+    )
+    assert failing.calls == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    loader = SlowLoader(model_payload())
+    assert (await cache.get_or_load("models:1", Model, loader)).name == "gpt-4o"
+    assert loader.calls == 1
+
+
+async def test_loads_started_before_a_write_are_not_joined():
+    cache = CatalogCache()
+    stale = SlowLoader(model_payload("gpt-4o"))
+    before = asyncio.ensure_future(cache.get_or_load("models:1", Model, stale))
+    await asyncio.sleep(0)
+
+    await cache.invalidate()
+    fresh = SlowLoader(model_payload("gpt-4o-mini"))
+    after = await cache.get_or_load("models:1", Model, fresh)
+
+    assert (await before).name == "gpt-4o"
+    assert after.name == "gpt-4o-mini"
+    assert (stale.calls, fresh.calls) == (1, 1)
+
+
+async def test_a_cancelled_caller_does_not_cancel_the_shared_call():
+    flights = SingleFlight()
+    loader = SlowLoader("value")
+    first = asyncio.ensure_future(flights.do("key", loader))
+    second = asyncio.ensure_future(flights.do("key", loader))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    assert await second == "value"
+    assert loader.calls == 1
+
+
+async def test_loads_run_in_a_session_of_their_own(db_session):
+    cache = CatalogCache()
+    sessions = []
+
+    async def load(session):
+        sessions.append(session)
+        await asyncio.sleep(0.05)
+        return (await session.execute(text("SELECT 1"))).scalar()
+
+    session_factory = async_sessionmaker(bind=db_session.bind)
+    leader = asyncio.ensure_future(cache.get_or_load("one", int, load, session_factory))
+    follower = asyncio.ensure_future(cache.get_or_load("one", int, load, session_factory))
+    await asyncio.sleep(0)
+
+    # The leader's own session may be closed now; the load does not use it
+    leader.cancel()
+    assert await follower == 1
+    assert len(sessions) == 1 and sessions[0] is not db_session
+
+
+@pytest.mark.parametrize("path", ["/{id}/with-models", "/with-models?limit=100"])
+async def test_concurrent_identical_requests_run_one_query(client, db_session, path):
+    response = await client.post(
+        f"{PROVIDERS_URL}/", json={"name": "openai", "display_name": "OpenAI"}
+    )
+    provider_id = response.json()["id"]
+    await client.post(
+        f"{PROVIDERS_URL}/{provider_id}/models",
+        json={
+            "provider_id": provider_id,
+            "name": "gpt-4o",
+            "display_name": "GPT-4o",
+            "model_type": "chat",
+        },
+    )
+    url = PROVIDERS_URL + path.format(id=provider_id)
+
+    catalog_cache.reset()
+    with count_statements(db_session) as single:
+        assert (await client.get(url)).status_code == 200
+
+    catalog_cache.reset()
+    with count_statements(db_session) as concurrent:
+        responses = await asyncio.gather(*(client.get(url) for _ in range(CONCURRENCY)))
+
+    assert {response.status_code for response in responses} == {200}
+    assert len({response.content for response in responses}) == 1
+    # As many statements as one request on its own
+    assert len(concurrent) == len(single) > 0
+    stats = (await client.get(f"{PROVIDERS_URL}/cache-stats")).json()
+    assert stats["coalesced"] > 0
@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+API_ROOT = Path(__file__).resolve().parents[1]
+
+# Cumulative `python -X importtime` budget for `import app.main`, i.e. what
+# a worker pays before it can serve /health
+IMPORT_TIME_BUDGET_SECONDS = float(os.getenv("IMPORT_TIME_BUDGET_SECONDS", "1.5"))
+
+# SDKs that must only be imported on first use
+LAZY_MODULES = ("openai", "litellm", "redis", "numpy")
+
+
+def import_app(**env):
+    """
+    Import ``app.main`` in a fresh interpreter; return the cumulative import
+    time per module (in microseconds) and the names of all loaded modules.
+    """
+    environ = {
+        key: value for key, value in os.environ.items() if key not in ("REDIS_URL", "API_ROUTERS")
+    }
+    environ.update(env)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import sys, app.main; print(*sys.modules)"],
+        cwd=API_ROOT,
+        env=environ,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                timings[name.strip()] = int(cumulative)
+    return timings, set(result.stdout.split())
+
+
+def test_app_import_stays_within_budget_and_skips_heavy_sdks():
+    timings, modules = import_app()
+
+    # Lazily imported modules are registered but never executed
+    assert [name for name in timings if name.split(".")[0] in LAZY_MODULES] == []
+    assert "redis.exceptions" not in modules
+    assert timings["app.main"] / 1e6 < IMPORT_TIME_BUDGET_SECONDS
+
+
+def test_api_routers_limits_the_endpoint_modules_imported():
+    _, modules = import_app(API_ROUTERS="model-providers")
+
+    endpoints = {name for name in modules if name.startswith("app.api.v1.endpoints.")}
+    assert endpoints == {"app.api.v1.endpoints.model_providers"}
@@ -0,0 +1,188 @@
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import main
+from app.models.trace import TraceEvent
+from app.repositories.trace_repository import TraceEventRepository
+
+pytestmark = pytest.mark.anyio
+
+TRACES_URL = "/api/v1/traces"
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+TYPES = ("message", "tool_call", "handoff", "error")
+
+
+async def seed_trace(db, count, step=timedelta(milliseconds=1)):
+    trace_id = uuid.uuid4()
+    rows = [
+        {
+            "trace_id": trace_id,
+            "event_id": f"evt-{i}",
+            "type": TYPES[i % len(TYPES)],
+            "timestamp": START + i * step,
+            "data": {"i": i},
+        }
+        for i in range(count)
+    ]
+    for i in range(0, count, 20000):
+        await db.execute(insert(TraceEvent.__table__), rows[i:i + 20000])
+    await db.commit()
+    return trace_id
+
+
+@contextmanager
+def capture_selects(db):
+    selects = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            selects.append((statement, parameters))
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield selects
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def query_plan(db, statement, parameters):
+    connection = await db.connection()
+    raw = await connection.get_raw_connection()
+    cursor = await raw.driver_connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+    return " | ".join(row[-1] for row in await cursor.fetchall())
+
+
+async def test_time_windows_are_index_range_scans(client, db_session):
+    long_trace = await seed_trace(db_session, 100_000)
+    short_trace = await seed_trace(db_session, 100)
+    window = {
+        "start": (START + timedelta(seconds=50)).isoformat(),
+        "end": (START + timedelta(seconds=51)).isoformat(),
+    }
+
+    plans = []
+    for trace_id, expected in ((long_trace, 1000), (short_trace, 0)):
+        with capture_selects(db_session) as selects:
+            response = await client.get(
+                f"{TRACES_URL}/{trace_id}/events", params={**window, "limit": 1000}
+            )
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page["items"]) == expected
+        assert page["next_cursor"] is None
+        [(statement, parameters)] = selects
+        plans.append(await query_plan(db_session, statement, parameters))
+
+    # Both are one seek plus a range scan of the window, already in order
+    assert plans[0] == plans[1]
+    assert (
+        "USING INDEX ix_trace_events_trace_id_timestamp_id "
+        "(trace_id=? AND timestamp>? AND timestamp<?)" in plans[0]
+    )
+    assert "TEMP B-TREE" not in plans[0]
+
+    items = (
+        await client.get(f"{TRACES_URL}/{long_trace}/events", params={**window, "limit": 1000})
+    ).json()["items"]
+    assert items[0]["id"] == "evt-50000"
+    assert items[-1]["id"] == "evt-50999"
+    assert [item["seq"] for item in items] == sorted(item["seq"] for item in items)
+
+
+async def test_event_type_slices_use_the_type_index(client, db_session):
+    trace_id = await seed_trace(db_session, 20_000)
+
+    with capture_selects(db_session) as selects:
+        response = await client.get(
+            f"{TRACES_URL}/{trace_id}/events",
+            params={
+                "type": "tool_call",
+                "start": (START + timedelta(seconds=1)).isoformat(),
+                "limit": 10,
+            },
+        )
+    items = response.json()["items"]
+    assert [item["id"] for item in items] == [f"evt-{i}" for i in range(1001, 1041, 4)]
+    assert {item["type"] for item in items} == {"tool_call"}
+    [(statement, parameters)] = selects
+    plan = await query_plan(db_session, statement, parameters)
+    assert "USING INDEX ix_trace_events_trace_id_type_timestamp_id" in plan
+    assert "TEMP B-TREE" not in plan
+
+    response = await client.get(
+        f"{TRACES_URL}/{trace_id}/events", params=[("type", "error"), ("type", "handoff")]
+    )
+    assert {item["type"] for item in response.json()["items"]} == {"error", "handoff"}
+
+
+async def test_cursor_paging_walks_a_window_in_order(client, db_session):
+    trace_id = await seed_trace(db_session, 1000, step=timedelta(milliseconds=0.5))
+    window = {
+        "start": (START + timedelta(milliseconds=100)).isoformat(),
+        "end": (START + timedelta(milliseconds=300)).isoformat(),
+    }
+
+    for descending in (False, True):
+        seen, cursor = [], None
+        while True:
+            params = {**window, "limit": 120, "descending": descending}
+            if cursor:
+                params["cursor"] = cursor
+            page = (await client.get(f"{TRACES_URL}/{trace_id}/events", params=params)).json()
+            seen.extend(item["id"] for item in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        expected = [f"evt-{i}" for i in range(200, 600)]
+        assert seen == (expected[::-1] if descending else expected)
+
+    response = await client.get(
+        f"{TRACES_URL}/{trace_id}/events", params={"cursor": "not-a-cursor"}
+    )
+    assert response.status_code == 400
+
+
+async def test_timestamps_are_compared_in_utc(db_session):
+    trace_id = await seed_trace(db_session, 10, step=timedelta(hours=1))
+    plus_two = timezone(timedelta(hours=2))
+
+    page = await TraceEventRepository().get_range(
+        db_session,
+        trace_id,
+        start=datetime(2026, 1, 1, 5, tzinfo=plus_two),
+        end=datetime(2026, 1, 1, 6, tzinfo=plus_two),
+    )
+
+    assert [event.event_id for event in page.items] == ["evt-3"]
+
+
+async def test_trace_span(client, db_session):
+    trace_id = await seed_trace(db_session, 500, step=timedelta(seconds=1))
+
+    response = await client.get(f"{TRACES_URL}/{trace_id}/span")
+    assert response.status_code == 200
+    span = response.json()
+    assert datetime.fromisoformat(span["start"]).replace(tzinfo=timezone.utc) == START
+    assert datetime.fromisoformat(span["end"]).replace(tzinfo=timezone.utc) == START + timedelta(
+        seconds=499
+    )
+
+    assert (await client.get(f"{TRACES_URL}/{uuid.uuid4()}/span")).status_code == 404
+
+
+async def test_failing_to_create_partitions_does_not_abort_startup(db_session, monkeypatch, caplog):
+    # SQLite has no create_trace_event_partitions(), like a database the
+    # partitioning migration did not run on
+    monkeypatch.setenv("TRACE_EVENTS_PARTITIONED", "true")
+    monkeypatch.setattr(main, "AsyncSessionLocal", async_sessionmaker(bind=db_session.bind))
+
+    async with main.lifespan(main.app):
+        pass
+
+    assert "Could not create trace_events partitions" in caplog.text
@@ -0,0 +1,207 @@
+import argparse
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.api.v1.endpoints import traces
+from app.models.trace import TraceEvent
+from app.schemas.trace import TraceEventCreate
+from app.services.trace_ingestion import (
+    IngestionBackpressureError,
+    IngestionClosedError,
+    TraceEventIngestor,
+)
+from benchmarks.bench_trace_ingestion import run
+
+pytestmark = pytest.mark.anyio
+
+TRACES_URL = "/api/v1/traces"
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def events(count, type_="message"):
+    return [
+        TraceEventCreate(
+            id=f"evt-{i}", type=type_, timestamp=START + timedelta(milliseconds=i), data={"i": i}
+        )
+        for i in range(count)
+    ]
+
+
+async def stored(db):
+    return (await db.execute(select(func.count()).select_from(TraceEvent))).scalar_one()
+
+
+@pytest.fixture
+def session_factory(db_session):
+    return async_sessionmaker(bind=db_session.bind, expire_on_commit=False)
+
+
+class BlockedIngestor(TraceEventIngestor):
+    """
+    Ingestor whose writes wait until ``release`` is set.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.release = asyncio.Event()
+
+    async def _write(self, rows):
+        await self.release.wait()
+        await super()._write(rows)
+
+
+async def test_events_are_written_in_batches_by_size(db_session, session_factory):
+    ingestor = TraceEventIngestor(session_factory, batch_size=100, flush_interval=60)
+    await ingestor.submit(uuid.uuid4(), events(250))
+    await asyncio.sleep(0.1)
+
+    # Two full batches; the rest waits for the interval (or for shutdown)
+    assert (ingestor.batches, ingestor.written, ingestor.queued) == (2, 200, 50)
+    await ingestor.aclose()
+    assert (ingestor.batches, ingestor.written, ingestor.queued) == (3, 250, 0)
+    assert await stored(db_session) == 250
+
+
+async def test_partial_batches_are_written_after_the_flush_interval(db_session, session_factory):
+    ingestor = TraceEventIngestor(session_factory, batch_size=1000, flush_interval=0.02)
+    trace_id = uuid.uuid4()
+    await ingestor.submit(trace_id, events(10, "tool_call"))
+    await asyncio.sleep(0.2)
+
+    assert ingestor.written == 10
+    rows = (await db_session.execute(select(TraceEvent).order_by(TraceEvent.id))).scalars().all()
+    assert [row.event_id for row in rows] == [f"evt-{i}" for i in range(10)]
+    assert {(row.trace_id, row.type) for row in rows} == {(trace_id, "tool_call")}
+    assert rows[3].data == {"i": 3}
+    await ingestor.aclose()
+
+
+async def test_a_full_queue_pushes_back(db_session, session_factory):
+    ingestor = BlockedIngestor(
+        session_factory, max_queue=100, batch_size=50, flush_interval=0.01, enqueue_timeout=0.05
+    )
+    await ingestor.submit(uuid.uuid4(), events(50))
+    await asyncio.sleep(0.05)  # the first batch is taken and blocks
+    await ingestor.submit(uuid.uuid4(), events(100))
+
+    with pytest.raises(IngestionBackpressureError):
+        await ingestor.submit(uuid.uuid4(), events(1))
+    assert ingestor.rejected == 1
+
+    # Producers waiting for room get in as soon as the writer catches up
+    waiting = asyncio.ensure_future(ingestor.submit(uuid.uuid4(), events(20)))
+    ingestor.enqueue_timeout = 5
+    await asyncio.sleep(0)
+    ingestor.release.set()
+    assert await waiting == 20
+
+    await ingestor.aclose()
+    assert await stored(db_session) == 170
+    with pytest.raises(IngestionClosedError):
+        await ingestor.submit(uuid.uuid4(), events(1))
+
+
+async def test_failed_batches_are_retried(db_session, session_factory):
+    ingestor = TraceEventIngestor(
+        session_factory, batch_size=10, flush_interval=0.01, max_retries=2, retry_delay=0
+    )
+    failures = []
+
+    def flaky_session_factory():
+        if len(failures) < 2:
+            failures.append(True)
+            raise ConnectionError("database restarting")
+        return session_factory()
+
+    ingestor.session_factory = flaky_session_factory
+    await ingestor.submit(uuid.uuid4(), events(10))
+    await ingestor.aclose()
+
+    assert (ingestor.written, ingestor.failed) == (10, 0)
+    assert await stored(db_session) == 10
+
+
+async def test_rejected_batches_are_dropped_without_retrying(db_session, session_factory):
+    ingestor = TraceEventIngestor(
+        session_factory, batch_size=10, flush_interval=0.01, max_retries=2, retry_delay=0
+    )
+    attempts = []
+
+    def rejecting_session_factory():
+        attempts.append(True)
+        raise IntegrityError("INSERT INTO trace_events", {}, Exception("constraint violated"))
+
+    ingestor.session_factory = rejecting_session_factory
+    await ingestor.submit(uuid.uuid4(), events(10))
+    await ingestor.aclose()
+
+    assert len(attempts) == 1
+    assert (ingestor.written, ingestor.failed) == (0, 10)
+    assert await stored(db_session) == 0
+
+
+async def test_ingestion_endpoint(client, db_session, session_factory, monkeypatch):
+    ingestor = TraceEventIngestor(session_factory, flush_interval=0.01)
+    monkeypatch.setattr(traces, "trace_ingestor", ingestor)
+    trace_id = uuid.uuid4()
+    body = [
+        {
+            "id": "evt-1",
+            "type": "message",
+            "timestamp": START.isoformat(),
+            "data": {"role": "user"},
+        },
+        {"type": "tool_call", "timestamp": (START + timedelta(seconds=1)).isoformat()},
+    ]
+
+    response = await client.post(f"{TRACES_URL}/{trace_id}/events", json={"events": body})
+    assert response.status_code == 202
+    assert response.json() == {"accepted": 2}
+    assert (
+        await client.post(f"{TRACES_URL}/{trace_id}/events", json={"events": []})
+    ).status_code == 422
+
+    await ingestor.flush()
+    stats = (await client.get(f"{TRACES_URL}/ingestion-stats")).json()
+    assert (stats["accepted"], stats["written"], stats["queued"]) == (2, 2, 0)
+    assert await stored(db_session) == 2
+    await ingestor.aclose()
+
+
+async def test_full_queue_answers_503(client, db_session, session_factory, monkeypatch):
+    ingestor = BlockedIngestor(
+        session_factory, max_queue=1, batch_size=1, flush_interval=0.01, enqueue_timeout=0.01
+    )
+    monkeypatch.setattr(traces, "trace_ingestor", ingestor)
+    url = f"{TRACES_URL}/{uuid.uuid4()}/events"
+    body = {"events": [{"type": "message", "timestamp": START.isoformat()}]}
+
+    for _ in range(2):
+        assert (await client.post(url, json=body)).status_code == 202
+        await asyncio.sleep(0.05)
+    response = await client.post(url, json=body)
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    ingestor.release.set()
+    await ingestor.aclose()
+
+
+async def test_ingestion_benchmark_runs(tmp_path):
+    args = argparse.Namespace(
+        events=2000, producers=4, events_per_request=100, batch_size=500, flush_interval=0.01,
+        max_queue=1000, direct=False
+    )
+
+    report = await run(f"sqlite:///{tmp_path / 'bench.db'}", args)
+
+    assert report["dialect"] == "sqlite"
+    assert report["rows"] == report["events"] == 2000
+    assert report["failed"] == 0
+    assert report["events_per_second"] > 0
@@ -0,0 +1,252 @@
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+
+from app.models.model_provider import Model
+from app.models.trace import as_utc
+from app.models.usage import TraceMetrics, UsageLatencyBucket, UsageRollup
+from app.repositories.usage_repository import UsageRepository
+from app.utils.sketch import RELATIVE_ACCURACY, LatencySketch
+from tests.test_model_provider_service import seed_catalog
+
+pytestmark = pytest.mark.anyio
+
+TRACES_URL = "/api/v1/traces"
+USAGE_URL = "/api/v1/usage"
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+async def catalog(db):
+    await seed_catalog(db, providers=2, models_per_provider=2)
+    rows = await db.execute(
+        select(Model.id, Model.provider_id).order_by(Model.provider_id, Model.name)
+    )
+    return [tuple(row) for row in rows]
+
+
+def completion(
+    model_id, completed_at, duration_ms, prompt_tokens=10, completion_tokens=5, cost=0.25
+):
+    return {
+        "model_id": str(model_id),
+        "completed_at": completed_at.isoformat(),
+        "total_duration_ms": duration_ms,
+        "token_usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens},
+        "cost": cost,
+    }
+
+
+async def rollups(db):
+    counters = (
+        (
+            await db.execute(
+                select(UsageRollup).order_by(
+                    UsageRollup.model_id, UsageRollup.granularity, UsageRollup.bucket_start
+                )
+            )
+        )
+        .scalars()
+        .all()
+    )
+    latencies = (await db.execute(
+        select(UsageLatencyBucket).order_by(
+            UsageLatencyBucket.model_id,
+            UsageLatencyBucket.granularity,
+            UsageLatencyBucket.bucket_start,
+            UsageLatencyBucket.bucket,
+        )
+    )).scalars().all()
+    return (
+        [
+            (
+                row.model_id,
+                row.granularity,
+                row.bucket_start,
+                row.requests,
+                row.total_tokens,
+                round(row.cost, 6),
+                round(row.duration_ms, 6),
+            )
+            for row in counters
+        ],
+        [
+            (row.model_id, row.granularity, row.bucket_start, row.bucket, row.count)
+            for row in latencies
+        ],
+    )
+
+
+def test_sketch_quantiles_are_within_the_relative_accuracy():
+    values = [random.lognormvariate(5, 1.5) for _ in range(20000)]
+    halves = LatencySketch(), LatencySketch()
+    for i, value in enumerate(values):
+        halves[i % 2].add(value)
+    sketch = LatencySketch()
+    for half in halves:
+        sketch.merge(half)
+
+    values.sort()
+    assert sketch.count == len(values)
+    for q in (0.5, 0.95, 0.99):
+        exact = values[int(q * (len(values) - 1))]
+        assert abs(sketch.quantile(q) - exact) <= RELATIVE_ACCURACY * exact
+    assert LatencySketch().quantile(0.5) is None
+
+
+async def test_completed_traces_update_the_rollups(client, db_session):
+    (model_a, provider_1), (model_b, _), *_ = await catalog(db_session)
+    traces = [uuid.uuid4() for _ in range(3)]
+    for trace_id, model_id, offset, duration in (
+        (traces[0], model_a, timedelta(seconds=10), 100),
+        (traces[1], model_a, timedelta(seconds=50), 300),
+        (traces[2], model_b, timedelta(minutes=2), 200),
+    ):
+        response = await client.post(
+            f"{TRACES_URL}/{trace_id}/complete", json=completion(model_id, START + offset, duration)
+        )
+        assert response.status_code == 200
+        assert response.json()["recorded"] is True
+
+    # A completion delivered twice is counted once
+    response = await client.post(
+        f"{TRACES_URL}/{traces[0]}/complete", json=completion(model_a, START, 999, cost=9)
+    )
+    assert response.json()["recorded"] is False
+    assert response.json()["duration_ms"] == 100
+
+    metrics = (await client.get(f"{TRACES_URL}/{traces[2]}/metrics")).json()
+    assert (metrics["total_tokens"], metrics["model_id"]) == (15, str(model_b))
+
+    params = {
+        "granularity": "minute",
+        "start": START.isoformat(),
+        "end": (START + timedelta(hours=1)).isoformat(),
+    }
+    buckets = (await client.get(f"{USAGE_URL}/rollups", params=params)).json()
+    assert [
+        (bucket["model_id"], bucket["requests"], bucket["total_tokens"]) for bucket in buckets
+    ] == [
+        (str(model_a), 2, 30),
+        (str(model_b), 1, 15),
+    ]
+    assert buckets[0]["cost"] == pytest.approx(0.5)
+    assert buckets[0]["avg_duration_ms"] == pytest.approx(200)
+    assert buckets[0]["p50_ms"] == pytest.approx(100, rel=RELATIVE_ACCURACY)
+
+    [total] = (
+        await client.get(
+            f"{USAGE_URL}/rollups", params={**params, "granularity": "day", "group_by": "total"}
+        )
+    ).json()
+    assert (total["model_id"], total["provider_id"], total["requests"]) == (None, None, 3)
+    assert total["p50_ms"] == pytest.approx(200, rel=RELATIVE_ACCURACY)
+
+    # Naive bounds are taken as UTC
+    naive = {**params, "start": "2026-01-01T00:00:00", "end": "2026-01-01T00:01:00"}
+    buckets = (await client.get(f"{USAGE_URL}/rollups", params=naive)).json()
+    assert [bucket["requests"] for bucket in buckets] == [2]
+
+    [provider] = (
+        await client.get(
+            f"{USAGE_URL}/rollups",
+            params={
+                **params,
+                "group_by": "provider",
+                "provider_id": str(provider_1),
+                "granularity": "hour",
+            },
+        )
+    ).json()
+    assert (provider["provider_id"], provider["model_id"], provider["requests"]) == (
+        str(provider_1),
+        None,
+        3,
+    )
+
+
+async def test_rollup_requests_are_validated(client, db_session):
+    unknown = await client.post(
+        f"{TRACES_URL}/{uuid.uuid4()}/complete", json=completion(uuid.uuid4(), START, 1)
+    )
+    assert unknown.status_code == 404
+    assert (await client.get(f"{TRACES_URL}/{uuid.uuid4()}/metrics")).status_code == 404
+
+    too_long = {
+        "granularity": "minute",
+        "start": START.isoformat(),
+        "end": (START + timedelta(days=30)).isoformat(),
+    }
+    assert (await client.get(f"{USAGE_URL}/rollups", params=too_long)).status_code == 400
+    recent = {
+        "granularity": "hour",
+        "start": (datetime.utcnow() - timedelta(hours=2)).replace(microsecond=0).isoformat(),
+    }
+    assert (await client.get(f"{USAGE_URL}/rollups", params=recent)).status_code == 200
+    assert (
+        await client.get(f"{USAGE_URL}/rollups", params={**too_long, "granularity": "week"})
+    ).status_code == 422
+
+
+async def test_rebuild_matches_the_incremental_rollups(client, db_session):
+    models = await catalog(db_session)
+    rng = random.Random(7)
+    for _ in range(300):
+        model_id, _ = rng.choice(models)
+        body = completion(
+            model_id,
+            START + timedelta(seconds=rng.uniform(0, 3 * 86400)),
+            rng.lognormvariate(6, 1),
+            prompt_tokens=rng.randrange(1000),
+            completion_tokens=rng.randrange(500),
+            cost=rng.uniform(0, 0.1),
+        )
+        assert (
+            await client.post(f"{TRACES_URL}/{uuid.uuid4()}/complete", json=body)
+        ).status_code == 200
+    incremental = await rollups(db_session)
+
+    traces, _ = await UsageRepository().rebuild(db_session)
+    assert traces == 300
+    assert await rollups(db_session) == incremental
+
+    # A partial rebuild replaces the rollups from the start of that day on
+    day = START + timedelta(days=1)
+    await db_session.execute(UsageRollup.__table__.update().values(requests=0))
+    await db_session.commit()
+    traces, _ = await UsageRepository().rebuild(db_session, day + timedelta(hours=12))
+    counters, latencies = await rollups(db_session)
+
+    recent = (
+        await db_session.execute(
+            select(TraceMetrics.trace_id).filter(TraceMetrics.completed_at >= day)
+        )
+    ).all()
+    assert traces == len(recent)
+    assert latencies == incremental[1]
+    assert {row[3] for row in counters if as_utc(row[2]) < day} == {0}
+    assert [row for row in counters if as_utc(row[2]) >= day] == [
+        row for row in incremental[0] if as_utc(row[2]) >= day
+    ]
+
+
+async def test_rebuild_endpoint_window_is_capped(client, db_session):
+    models = await catalog(db_session)
+    recent = datetime.now(timezone.utc) - timedelta(days=1)
+    body = completion(models[0][0], recent, 120)
+    assert (
+        await client.post(f"{TRACES_URL}/{uuid.uuid4()}/complete", json=body)
+    ).status_code == 200
+    incremental = await rollups(db_session)
+
+    assert (await client.post(f"{USAGE_URL}/rebuild")).status_code == 422
+    too_old = {"since": (recent - timedelta(days=30)).replace(tzinfo=None).isoformat()}
+    assert (await client.post(f"{USAGE_URL}/rebuild", params=too_old)).status_code == 400
+
+    since = {"since": recent.replace(tzinfo=None).isoformat()}
+    response = await client.post(f"{USAGE_URL}/rebuild", params=since)
+    assert response.status_code == 200
+    assert response.json()["traces"] == 1
+    assert await rollups(db_session) == incremental
@@ -0,0 +1,254 @@
+import pytest
+
+from tests.test_model_provider_service import count_statements
+
+pytestmark = pytest.mark.anyio
+
+PROVIDERS_URL = "/api/v1/model-providers"
+UNKNOWN_ID = "00000000-0000-0000-0000-000000000000"
+
+
+def model_body(provider_id, name="gpt-4o"):
+    return {"provider_id": provider_id, "name": name, "display_name": name, "model_type": "chat"}
+
+
+@pytest.fixture
+async def provider(client):
+    response = await client.post(
+        f"{PROVIDERS_URL}/", json={"name": "openai", "display_name": "OpenAI"}
+    )
+    return response.json()
+
+
+@pytest.fixture
+async def model(client, provider):
+    response = await client.post(
+        f"{PROVIDERS_URL}/{provider['id']}/models", json=model_body(provider["id"])
+    )
+    return response.json()
+
+
+async def request_counting_statements(client, db_session, method, url, **kwargs):
+    with count_statements(db_session) as statements:
+        response = await client.request(method, url, **kwargs)
+    return response, len(statements)
+
+
+async def test_create_model_provider_statements(client, db_session):
+    body = {"name": "anthropic", "display_name": "Anthropic"}
+    response, statements = await request_counting_statements(
+        client, db_session, "POST", f"{PROVIDERS_URL}/", json=body
+    )
+    assert response.status_code == 200
+    assert statements == 1
+
+    response, statements = await request_counting_statements(
+        client, db_session, "POST", f"{PROVIDERS_URL}/", json=body
+    )
+    assert response.status_code == 400
+    assert statements == 1
+
+
+async def test_update_model_provider_statements(client, db_session, model):
+    url = f"{PROVIDERS_URL}/{model['provider_id']}"
+    response, statements = await request_counting_statements(
+        client, db_session, "PUT", url, json={"display_name": "Open AI"}
+    )
+    assert response.status_code == 200
+    assert response.json()["display_name"] == "Open AI"
+    assert [m["id"] for m in response.json()["models"]] == [model["id"]]
+    assert statements == 2
+
+    response, statements = await request_counting_statements(
+        client, db_session, "PUT", f"{PROVIDERS_URL}/{UNKNOWN_ID}", json={"display_name": "x"}
+    )
+    assert response.status_code == 404
+    assert statements <= 2
+
+
+async def test_update_model_provider_to_taken_name(client, provider):
+    await client.post(f"{PROVIDERS_URL}/", json={"name": "anthropic", "display_name": "Anthropic"})
+
+    response = await client.put(f"{PROVIDERS_URL}/{provider['id']}", json={"name": "anthropic"})
+    assert response.status_code == 400
+
+
+async def test_delete_model_provider_statements(client, db_session, provider):
+    url = f"{PROVIDERS_URL}/{provider['id']}"
+    await client.post(
+        f"{url}/models/bulk",
+        json={"models": [model_body(provider["id"], f"model-{i}") for i in range(1000)]},
+    )
+
+    response, statements = await request_counting_statements(client, db_session, "DELETE", url)
+    assert response.status_code == 200
+    assert response.json()["id"] == provider["id"]
+    assert "models" not in response.json()
+    assert statements == 1
+
+    # The database cascade removed the models
+    response = await client.get(f"{PROVIDERS_URL}/models", params={"include_total": True})
+    assert response.json()["total"] == 0
+
+    response, statements = await request_counting_statements(client, db_session, "DELETE", url)
+    assert response.status_code == 404
+    assert statements == 1
+
+
+async def test_create_model_statements(client, db_session, provider):
+    url = f"{PROVIDERS_URL}/{provider['id']}/models"
+    body = model_body(provider["id"], "o3")
+    response, statements = await request_counting_statements(
+        client, db_session, "POST", url, json=body
+    )
+    assert response.status_code == 200
+    assert statements == 1
+
+    response, statements = await request_counting_statements(
+        client, db_session, "POST", url, json=body
+    )
+    assert response.status_code == 400
+    assert statements == 1
+
+
+async def test_create_model_for_unknown_provider(client):
+    response = await client.post(
+        f"{PROVIDERS_URL}/{UNKNOWN_ID}/models", json=model_body(UNKNOWN_ID)
+    )
+    assert response.status_code == 404
+
+
+async def test_update_model_statements(client, db_session, model):
+    url = f"{PROVIDERS_URL}/{model['provider_id']}/models/{model['id']}"
+    response, statements = await request_counting_statements(
+        client, db_session, "PUT", url, json={"context_window": 4096}
+    )
+    assert response.status_code == 200
+    assert response.json()["context_window"] == 4096
+    assert statements == 1
+
+
+async def test_update_model_of_other_provider(client, model):
+    url = f"{PROVIDERS_URL}/{UNKNOWN_ID}/models/{model['id']}"
+    response = await client.put(url, json={"context_window": 4096})
+    assert response.status_code == 404
+
+
+async def test_updates_reject_null_for_required_fields(client, model):
+    url = f"{PROVIDERS_URL}/{model['provider_id']}/models/{model['id']}"
+    for field in ("name", "display_name", "model_type", "is_active"):
+        response = await client.put(url, json={field: None})
+        assert response.status_code == 422
+    # Nullable columns can still be cleared
+    response = await client.put(url, json={"description": None, "context_window": None})
+    assert response.status_code == 200
+
+    url = f"{PROVIDERS_URL}/{model['provider_id']}"
+    for field in ("name", "display_name", "is_active"):
+        response = await client.put(url, json={field: None})
+        assert response.status_code == 422
+    response = await client.put(url, json={"api_base_url": None})
+    assert response.status_code == 200
+
+
+async def test_delete_model_statements(client, db_session, model):
+    url = f"{PROVIDERS_URL}/{model['provider_id']}/models/{model['id']}"
+    response, statements = await request_counting_statements(client, db_session, "DELETE", url)
+    assert response.status_code == 200
+    assert statements == 1
+
+    response, statements = await request_counting_statements(client, db_session, "DELETE", url)
+    assert response.status_code == 404
+    assert statements == 1
+
+
+async def test_bulk_upsert_models_statements(client, db_session, provider):
+    url = f"{PROVIDERS_URL}/{provider['id']}/models/bulk"
+    body = {"models": [model_body(provider["id"], f"model-{i}") for i in range(100)]}
+    response, statements = await request_counting_statements(
+        client, db_session, "POST", url, json=body
+    )
+    assert response.status_code == 200
+    assert statements == 2
+
+
+async def test_bulk_deactivate_and_delete_models(client, db_session, provider):
+    other = (
+        await client.post(
+            f"{PROVIDERS_URL}/", json={"name": "anthropic", "display_name": "Anthropic"}
+        )
+    ).json()
+    for owner, count in ((provider, 3), (other, 2)):
+        await client.post(
+            f"{PROVIDERS_URL}/{owner['id']}/models/bulk",
+            json={"models": [model_body(owner["id"], f"model-{i}") for i in range(count)]},
+        )
+
+    response, statements = await request_counting_statements(
+        client,
+        db_session,
+        "POST",
+        f"{PROVIDERS_URL}/models/bulk-deactivate?filter_provider_name=openai",
+        json={},
+    )
+    assert response.json() == {"count": 3}
+    assert statements == 1
+    response = await client.get(f"{PROVIDERS_URL}/models", params={"filter_is_active": "false"})
+    assert {m["provider_id"] for m in response.json()["items"]} == {provider["id"]}
+
+    # Already inactive rows are not counted again
+    response = await client.post(
+        f"{PROVIDERS_URL}/models/bulk-deactivate?filter_provider_name=openai", json={}
+    )
+    assert response.json() == {"count": 0}
+
+    ids = [
+        m["id"] for m in (await client.get(f"{PROVIDERS_URL}/{other['id']}/models")).json()["items"]
+    ]
+    response, statements = await request_counting_statements(
+        client,
+        db_session,
+        "POST",
+        f"{PROVIDERS_URL}/models/bulk-delete",
+        json={"ids": ids[:1] + [UNKNOWN_ID]},
+    )
+    assert response.json() == {"count": 1}
+    assert statements == 1
+
+    response = await client.post(
+        f"{PROVIDERS_URL}/models/bulk-delete?filter_is_active=false", json={"ids": ids}
+    )
+    assert response.json() == {"count": 0}
+
+
+async def test_bulk_delete_model_providers_cascades(client, db_session, model):
+    await client.post(f"{PROVIDERS_URL}/", json={"name": "anthropic", "display_name": "Anthropic"})
+
+    response = await client.post(f"{PROVIDERS_URL}/bulk-deactivate?filter_name=anthropic", json={})
+    assert response.json() == {"count": 1}
+
+    response, statements = await request_counting_statements(
+        client,
+        db_session,
+        "POST",
+        f"{PROVIDERS_URL}/bulk-delete?filter_name__in=openai,mistral",
+        json={},
+    )
+    assert response.json() == {"count": 1}
+    assert statements == 1
+
+    providers = (await client.get(f"{PROVIDERS_URL}/")).json()["items"]
+    assert [(p["name"], p["is_active"]) for p in providers] == [("anthropic", False)]
+    response = await client.get(f"{PROVIDERS_URL}/models", params={"include_total": True})
+    assert response.json()["total"] == 0
+
+
+async def test_bulk_operations_need_ids_or_filters(client, model):
+    for url in (f"{PROVIDERS_URL}/bulk-delete", f"{PROVIDERS_URL}/models/bulk-delete"):
+        response = await client.post(url, json={})
+        assert response.status_code == 400
+
+    response = await client.post(f"{PROVIDERS_URL}/models/bulk-delete?filter_nmae=gpt-4o", json={})
+    assert response.status_code == 400
+    response = await client.get(f"{PROVIDERS_URL}/models", params={"include_total": True})
+    assert response.json()["total"] == 1
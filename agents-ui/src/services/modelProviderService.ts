@@ -1,16 +1,16 @@
-import { ModelProvider, ModelProviderCreate, ModelProviderUpdate } from '../types/modelProvider';
+import { ModelProvider, ModelProviderCreate, ModelProviderUpdate, Page } from '../types/modelProvider';
 import { api } from './api';
 
 const BASE_URL = '/api/v1/model-providers';
 
 export const fetchModelProviders = async (): Promise<ModelProvider[]> => {
-  const response = await api.get(BASE_URL);
-  return response.data;
+  const response = await api.get<Page<ModelProvider>>(BASE_URL);
+  return response.data.items;
 };
 
 export const fetchModelProvidersWithModels = async (): Promise<ModelProvider[]> => {
-  const response = await api.get(`${BASE_URL}/with-models`);
-  return response.data;
+  const response = await api.get<Page<ModelProvider>>(`${BASE_URL}/with-models`);
+  return response.data.items;
 };
 
 export const fetchModelProvider = async (id: string): Promise<ModelProvider> => {
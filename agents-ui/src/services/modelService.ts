@@ -1,11 +1,20 @@
-import { Model, ModelCreate, ModelUpdate } from '../types/modelProvider';
+import {
+  CatalogBatch,
+  CatalogBatchParams,
+  CatalogSearchParams,
+  CatalogSearchResult,
+  Model,
+  ModelCreate,
+  ModelUpdate,
+  Page,
+} from '../types/modelProvider';
 import { api } from './api';
 
 const BASE_URL = '/api/v1/model-providers';
 
 export const fetchModelsByProvider = async (providerId: string): Promise<Model[]> => {
-  const response = await api.get(`${BASE_URL}/${providerId}/models`);
-  return response.data;
+  const response = await api.get<Page<Model>>(`${BASE_URL}/${providerId}/models`);
+  return response.data.items;
 };
 
 export const fetchModel = async (providerId: string, modelId: string): Promise<Model> => {
@@ -25,4 +34,18 @@ export const updateModel = async (providerId: string, modelId: string, data: Mod
 
 export const deleteModel = async (providerId: string, modelId: string): Promise<void> => {
   await api.delete(`${BASE_URL}/${providerId}/models/${modelId}`);
-};
\ No newline at end of file
+};
+
+export const batchGetCatalog = async ({ fields, ...ids }: CatalogBatchParams): Promise<CatalogBatch> => {
+  const response = await api.get<CatalogBatch>(`${BASE_URL}/batch`, {
+    params: { ...ids, fields: fields?.join(',') },
+    // Repeat array params as model_ids=a&model_ids=b
+    paramsSerializer: { indexes: null },
+  });
+  return response.data;
+};
+
+export const searchCatalog = async (params: CatalogSearchParams): Promise<CatalogSearchResult> => {
+  const response = await api.get<CatalogSearchResult>(`${BASE_URL}/search`, { params });
+  return response.data;
+};
@@ -62,4 +62,47 @@ export interface ModelProviderUpdate {
   api_base_url?: string;
   api_key_env_var?: string;
   is_active?: boolean;
-}
\ No newline at end of file
+}
+
+export interface Page<T> {
+  items: T[];
+  next_cursor: string | null;
+  total: number | null;
+}
+
+export interface ModelSearchHit extends Model {
+  provider_name: string;
+  score: number;
+}
+
+export interface ModelProviderSearchHit extends Omit<ModelProvider, 'models'> {
+  score: number;
+}
+
+export interface CatalogSearchResult {
+  providers: ModelProviderSearchHit[];
+  models: ModelSearchHit[];
+}
+
+export interface CatalogBatch {
+  // Rows only carry the requested fields (plus ids)
+  providers: Partial<Omit<ModelProvider, 'models'>>[];
+  models: Partial<Model>[];
+  missing_provider_ids: string[];
+  missing_model_ids: string[];
+}
+
+export interface CatalogBatchParams {
+  provider_ids?: string[];
+  model_ids?: string[];
+  fields?: string[];
+}
+
+export interface CatalogSearchParams {
+  q: string;
+  model_type?: string;
+  is_active?: boolean;
+  min_context_window?: number;
+  max_context_window?: number;
+  limit?: number;
+}